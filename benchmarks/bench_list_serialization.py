@@ -0,0 +1,76 @@
+"""
+Micro-benchmark: GET /cryptocurrencies/ serialization paths for one page of rows.
+
+    python benchmarks/bench_list_serialization.py [--rows 200] [--repeat 200]
+
+"orm+pydantic" is the previous path (ORM instances validated through crypto_schemas.Crypto with
+from_attributes, then encoded by the stock JSON encoder); "tuples+orjson" is the current one.
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "crypto_api"))
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from typing import List
+
+from app.api import responses
+from app.crud import crud_crypto
+from app.db import models
+from app.db.base import Base
+from app.schemas import crypto as crypto_schemas
+
+
+def build_session(rows: int):
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    now = datetime.now(timezone.utc)
+    db.add_all(
+        models.Cryptocurrency(
+            symbol=f"C{i}", name=f"Coin {i}", coingecko_id=f"coin-{i}", last_updated_coingecko=now,
+            coin_metadata={"current_price_usd": i * 1.5, "image": f"https://example.com/{i}.png"}, note=None,
+        )
+        for i in range(rows)
+    )
+    db.commit()
+    return db
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    db = build_session(args.rows)
+    adapter = TypeAdapter(List[crypto_schemas.Crypto])
+
+    def orm_pydantic() -> bytes:
+        db.expunge_all()
+        cryptos = crud_crypto.get_cryptos(db, limit=args.rows)
+        validated = adapter.validate_python(cryptos, from_attributes=True)
+        return json.dumps(jsonable_encoder(validated)).encode()
+
+    def tuples_orjson() -> bytes:
+        return responses.dumps(crud_crypto.get_crypto_rows(db, limit=args.rows))
+
+    assert json.loads(orm_pydantic()) == json.loads(tuples_orjson())
+
+    results = {}
+    for name, func in (("orm+pydantic", orm_pydantic), ("tuples+orjson", tuples_orjson)):
+        best = min(timeit.repeat(func, number=args.repeat, repeat=5)) / args.repeat
+        results[name] = best
+        print(f"{name:>15}: {best * 1000:8.3f} ms per {args.rows}-row page")
+    print(f"{'speedup':>15}: {results['orm+pydantic'] / results['tuples+orjson']:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+In-process CoinGecko stub for offline benchmarks.
+
+Serves the endpoints used by app.services.coingecko through httpx.MockTransport, with a fixed
+per-request latency (slept in the calling thread or awaited on the event loop).
+"""
+import asyncio
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List
+from unittest.mock import patch
+
+import httpx
+
+from app.core.config import settings
+from app.services import coingecko
+from app.services.cache import MemoryBackend, ResponseCache
+from app.services.symbol_index import SymbolIndex
+
+
+def coin_id(index: int) -> str:
+    return f"stub-coin-{index}"
+
+
+def coin_symbol(index: int) -> str:
+    return f"STB{index}"
+
+
+class CoinGeckoStub:
+    def __init__(self, latency_ms: float = 0.0, coins: int = 10000):
+        self.latency = latency_ms / 1000
+        self.coins = coins
+        self.requests = 0
+
+    def _respond(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        path = request.url.path.removeprefix(httpx.URL(settings.COINGECKO_API_BASE_URL).path)
+        params = request.url.params
+        if path == "/search":
+            symbol = params["query"].upper()
+            coins = []
+            if symbol.startswith("STB") and symbol[3:].isdigit():
+                index = int(symbol[3:])
+                coins.append({"id": coin_id(index), "api_symbol": coin_id(index), "symbol": symbol,
+                              "name": f"Stub Coin {index}"})
+            return httpx.Response(200, json={"coins": coins})
+        if path == "/simple/price":
+            currencies = params["vs_currencies"].split(",")
+            return httpx.Response(200, json={
+                cg_id: {currency: float(len(cg_id)) for currency in currencies}
+                for cg_id in params["ids"].split(",") if cg_id.startswith("stub-coin-")
+            })
+        if path == "/coins/markets":
+            return httpx.Response(200, json=[
+                {"id": cg_id, "current_price": float(len(cg_id)), "image": f"https://example.com/{cg_id}.png",
+                 "market_cap": float(len(cg_id)) * 1e6, "market_cap_rank": int(cg_id.rsplit("-", 1)[1]) + 1}
+                for cg_id in params["ids"].split(",") if cg_id.startswith("stub-coin-")
+            ])
+        if path.startswith("/coins/") and path.count("/") == 2 and path != "/coins/list":
+            return httpx.Response(200, json={"image": {"large": f"https://example.com{path}.png"}})
+        if path == "/coins/list":
+            return httpx.Response(200, json=[
+                {"id": coin_id(i), "symbol": coin_symbol(i).lower(), "name": f"Stub Coin {i}"}
+                for i in range(self.coins)
+            ])
+        return httpx.Response(404)
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._respond(request)
+
+    async def handle_async(self, request: httpx.Request) -> httpx.Response:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._respond(request)
+
+    @contextmanager
+    def installed(self) -> Iterator["CoinGeckoStub"]:
+        """
+        Routes coingecko's sync and async clients to the stub. The rate limiter, the response cache, read
+        tracking and the symbol index are disabled and the CoinGecko cache starts empty, so every lookup hits
+        the stub.
+        """
+        sync_client = httpx.Client(base_url=settings.COINGECKO_API_BASE_URL, transport=httpx.MockTransport(self.handle))
+        async_client = httpx.AsyncClient(base_url=settings.COINGECKO_API_BASE_URL,
+                                         transport=httpx.MockTransport(self.handle_async))
+        cache = ResponseCache(MemoryBackend(settings.COINGECKO_CACHE_MAX_SIZE), ttls=coingecko.cache.ttls,
+                              negative_ttl=coingecko.cache.negative_ttl, stale_ttl=coingecko.cache.stale_ttl)
+        empty_index = SymbolIndex(os.path.join(tempfile.gettempdir(), "coingecko_stub_missing_index.json"))
+        with patch.object(coingecko, "sync_client", sync_client), \
+                patch.object(coingecko, "symbol_index", empty_index), \
+                patch.object(coingecko, "async_client", async_client), \
+                patch.object(coingecko, "cache", cache), \
+                patch.object(settings, "COINGECKO_RATE_LIMIT_ENABLED", False), \
+                patch.object(settings, "RESPONSE_CACHE_ENABLED", False), \
+                patch.object(settings, "REFRESH_TRACK_READS", False):
+            yield self
+        sync_client.close()
+
+
+def stub_rows(count: int) -> List[Dict]:
+    return [
+        {"symbol": coin_symbol(i), "name": f"Stub Coin {i}", "coingecko_id": coin_id(i),
+         "coin_metadata": {"current_price_usd": 1.0}, "price_usd": 1.0, "note": None}
+        for i in range(count)
+    ]
@@ -0,0 +1,248 @@
+"""
+Offline benchmark suite for the API, the price refresh task and the metadata batch update.
+
+    python benchmarks/run.py [--latency-ms 50] [--output results.json] [--compare baseline.json]
+
+CoinGecko is replaced by benchmarks/coingecko_stub.py (fixed latency per request) and every run uses a
+fresh in-memory SQLite database. Results are written as JSON; with --compare, medians are checked
+against a previous results file and the exit status is 1 when any benchmark regressed past --threshold.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "crypto_api"))
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.config import settings
+from app.crud import crud_crypto
+from app.db import models
+from app.db.base import Base, get_db
+from app.main import app
+from app.worker import tasks
+from app.worker.celery_app import celery_app
+
+from coingecko_stub import CoinGeckoStub, coin_id, coin_symbol, stub_rows
+
+CRYPTO_URL = settings.API_V1_STR + "/cryptocurrencies/"
+DEFAULT_TABLE_SIZES = [100, 1000, 10000]
+DEFAULT_COIN_COUNTS = [10, 100, 1000, 10000]
+
+
+def build_sessionmaker(rows: int = 0) -> sessionmaker:
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    if rows:
+        with session_factory() as db:
+            db.execute(models.Cryptocurrency.__table__.insert(), stub_rows(rows))
+            db.commit()
+    return session_factory
+
+
+def api_client(session_factory: sessionmaker) -> TestClient:
+    def _get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = _get_db
+    return TestClient(app)
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        "iterations": len(ordered),
+        "min_ms": ordered[0] * 1000,
+        "median_ms": statistics.median(ordered) * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))] * 1000,
+        "mean_ms": statistics.fmean(ordered) * 1000,
+    }
+
+
+def measure(func: Callable[[int], None], iterations: int, warmup: int = 1) -> List[float]:
+    for i in range(warmup):
+        func(-1 - i)
+    samples = []
+    for i in range(iterations):
+        started = time.perf_counter()
+        func(i)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def bench_create(stub: CoinGeckoStub, iterations: int) -> List[Dict[str, Any]]:
+    client = api_client(build_sessionmaker())
+    offset = iterations + 1
+
+    def create(i: int) -> None:
+        response = client.post(CRYPTO_URL, json={"symbol": coin_symbol(offset + i)})
+        assert response.status_code == 201, response.text
+
+    requests_before = stub.requests
+    samples = measure(create, iterations)
+    return [{"name": "create_cryptocurrency", "params": {},
+             "upstream_requests": (stub.requests - requests_before) / (iterations + 1), **summarize(samples)}]
+
+
+def bench_read(table_sizes: List[int], iterations: int) -> List[Dict[str, Any]]:
+    results = []
+    for rows in table_sizes:
+        client = api_client(build_sessionmaker(rows))
+        for page, skip in (("first", 0), ("last", max(rows - 100, 0))):
+            def read(_: int) -> None:
+                response = client.get(CRYPTO_URL, params={"skip": skip, "limit": 100})
+                assert response.status_code == 200, response.text
+
+            results.append({"name": "read_cryptocurrencies", "params": {"rows": rows, "page": page},
+                            **summarize(measure(read, iterations))})
+    return results
+
+
+def bench_update_prices(stub: CoinGeckoStub, coin_counts: List[int], iterations: int) -> List[Dict[str, Any]]:
+    results = []
+    snapshot_dir = tempfile.mkdtemp(prefix="crypto_api_bench_")
+    for coins in coin_counts:
+        session_factory = build_sessionmaker(coins)
+
+        def refresh(_: int) -> None:
+            result = tasks.update_all_crypto_prices.run()
+            assert result["coins"] == coins, result
+
+        requests_before = stub.requests
+        # Chunk subtasks and the chord callback run eagerly, one after another, in this process.
+        celery_app.conf.update(task_always_eager=True, task_eager_propagates=True)
+        with patch.object(tasks, "SessionLocal", session_factory), \
+                patch.object(settings, "PRICE_SNAPSHOT_PATH", os.path.join(snapshot_dir, "price_snapshot.bin")), \
+                patch.object(tasks.RedisLock, "acquire", lambda self: True), \
+                patch.object(tasks.RedisLock, "release", lambda self: True), \
+                patch.object(tasks.price_stream, "publish_prices", lambda prices: None):
+            samples = measure(refresh, iterations)
+        celery_app.conf.update(task_always_eager=False, task_eager_propagates=False)
+        results.append({"name": "update_all_crypto_prices", "params": {"coins": coins},
+                        "upstream_requests": (stub.requests - requests_before) / (iterations + 1),
+                        **summarize(samples)})
+    return results
+
+
+def bench_metadata_batch(table_sizes: List[int], iterations: int) -> List[Dict[str, Any]]:
+    results = []
+    for rows in table_sizes:
+        session_factory = build_sessionmaker(rows)
+
+        def update(i: int) -> None:
+            with session_factory() as db:
+                updates = {coin_id(n): {"current_price_usd": float(i + n)} for n in range(rows)}
+                assert crud_crypto.update_crypto_metadata_batch(db=db, updates=updates) == rows
+
+        results.append({"name": "update_crypto_metadata_batch", "params": {"rows": rows},
+                        **summarize(measure(update, iterations))})
+    return results
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def result_key(result: Dict[str, Any]) -> str:
+    params = ",".join(f"{name}={value}" for name, value in sorted(result["params"].items()))
+    return f"{result['name']}[{params}]"
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Prints median deltas against the baseline and returns the keys that regressed past threshold."""
+    previous = {result_key(result): result for result in baseline["results"]}
+    regressions = []
+    print(f"\nCompared with {baseline['meta'].get('git_revision')} ({baseline['meta'].get('timestamp')}):")
+    for result in current["results"]:
+        key = result_key(result)
+        if key not in previous:
+            print(f"  {key:<60} new")
+            continue
+        before, after = previous[key]["median_ms"], result["median_ms"]
+        change = (after - before) / before if before else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions.append(key)
+        print(f"  {key:<60} {before:10.2f} -> {after:10.2f} ms ({change:+.1%}){flag}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Stub latency per CoinGecko request")
+    parser.add_argument("--table-sizes", type=int, nargs="+", default=DEFAULT_TABLE_SIZES)
+    parser.add_argument("--coin-counts", type=int, nargs="+", default=DEFAULT_COIN_COUNTS)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--refresh-iterations", type=int, default=3,
+                        help="Iterations for update_all_crypto_prices and update_crypto_metadata_batch")
+    parser.add_argument("--only", nargs="+", choices=["create", "read", "refresh", "metadata"])
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", metavar="BASELINE", help="Previous results file to compare medians against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed median slowdown (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger("app").setLevel(logging.ERROR)
+    selected = set(args.only or ["create", "read", "refresh", "metadata"])
+
+    results: List[Dict[str, Any]] = []
+    stub = CoinGeckoStub(latency_ms=args.latency_ms, coins=max(args.coin_counts + args.table_sizes))
+    with stub.installed():
+        if "create" in selected:
+            results += bench_create(stub, args.iterations)
+        if "read" in selected:
+            results += bench_read(args.table_sizes, args.iterations)
+        if "refresh" in selected:
+            results += bench_update_prices(stub, args.coin_counts, args.refresh_iterations)
+        if "metadata" in selected:
+            results += bench_metadata_batch(args.table_sizes, args.refresh_iterations)
+    app.dependency_overrides.pop(get_db, None)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "latency_ms": args.latency_ms,
+        },
+        "results": results,
+    }
+    for result in results:
+        print(f"{result_key(result):<60} median {result['median_ms']:10.2f} ms  p95 {result['p95_ms']:10.2f} ms")
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
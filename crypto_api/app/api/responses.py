@@ -0,0 +1,18 @@
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+
+ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+
+def dumps(content: Any) -> bytes:
+    """orjson encoding matching the API's JSON output (UTC datetimes end in 'Z', like Pydantic)."""
+    return orjson.dumps(content, option=ORJSON_OPTIONS)
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson; content must already be plain dicts/lists (no validation)."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -1,37 +1,131 @@
+import asyncio
+import base64
+import json
 import logging
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List, Any
+from typing import List, Any, Dict, Optional, Literal, Iterator, AsyncIterator, Set, Tuple, Union
+from datetime import datetime, timedelta, timezone
+from app.api import responses
 from app.db import models
 from app.schemas import crypto as crypto_schemas
 from app.crud import crud_crypto
-from app.services import coingecko
-from app.db.base import get_db
+from app.core.config import settings
+from app.core.locks import SingleFlight
+from app.core.redis_client import get_redis, get_async_redis
+from app.services import coingecko, refresh_scheduler, response_cache
+from app.services.price_snapshot import price_snapshot
+from app.services.price_stream import price_hub
+from app.db.base import get_db, get_async_db
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+# Set when a response includes last-known upstream data because CoinGecko was unavailable; value is its age.
+STALE_DATA_HEADER = "X-Stale-Data-Age"
+EXPORT_BATCH_SIZE = 1000
+
+create_flights = SingleFlight(get_redis, get_async_redis, "create", ttl_seconds=settings.CREATE_LOCK_TTL,
+                              wait_seconds=settings.CREATE_LOCK_WAIT)
+
+HISTORY_INTERVALS = {"1m": 60, "5m": 300, "15m": 900, "1h": 3600, "4h": 14400, "1d": 86400, "1w": 604800}
+
+
+def _encode_cursor(last_id: int, sort: str = "id", order: str = "asc", value: Any = None) -> str:
+    position: Dict[str, Any] = {"id": last_id}
+    if (sort, order) != ("id", "asc"):
+        position.update(sort=sort, order=order, value=value)
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str, sort: str = "id", order: str = "asc") -> Tuple[int, Any]:
+    """Returns (last id, last sort value) of a cursor issued for the same sort and order."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded))
+        last_id = int(position["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid pagination cursor.")
+    value = position.get("value")
+    if (position.get("sort", "id"), position.get("order", "asc")) != (sort, order) or \
+            (sort != "id" and not isinstance(value, (int, float))):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="Pagination cursor does not belong to this sort order.")
+    return last_id, value
+
+
+def _parse_range(name: str, low: Optional[float],
+                 high: Optional[float]) -> Optional[Tuple[Optional[float], Optional[float]]]:
+    if low is None and high is None:
+        return None
+    if low is not None and high is not None and low > high:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"min_{name} must not be greater than max_{name}.")
+    return low, high
+
+
+def _parse_symbols(symbols: Optional[str]) -> Optional[Set[str]]:
+    if not symbols:
+        return None
+    return {symbol.strip().upper() for symbol in symbols.split(",") if symbol.strip()}
+
+
+def _parse_currency(currency: Optional[str]) -> Optional[str]:
+    if currency is None:
+        return None
+    currency = currency.lower()
+    if currency not in settings.PRICE_QUOTE_CURRENCIES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported currency '{currency}'. Choose one of: {', '.join(settings.PRICE_QUOTE_CURRENCIES)}.",
+        )
+    return currency
+
+
+def _quote(coin_metadata: Optional[Dict[str, Any]], currency: str) -> Optional[float]:
+    return (coin_metadata or {}).get(f"current_price_{currency}")
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
 
 @router.post("/", response_model=crypto_schemas.Crypto, status_code=status.HTTP_201_CREATED)
-def create_cryptocurrency(
+async def create_cryptocurrency(
         *,
         db: Session = Depends(get_db),
-        crypto_in: crypto_schemas.CryptoCreate
+        crypto_in: crypto_schemas.CryptoCreate,
+        response: Response
 ) -> Any:
     """
     Create new cryptocurrency record.
-    Verifies symbol with CoinGecko, fetches initial metadata (price, image) (synchronous).
+    Verifies symbol with CoinGecko and fetches initial metadata (USD price, image, market cap and rank) in a
+    single /coins/markets request without blocking the event loop; database calls run in the threadpool.
+    Other quote currencies are filled in by the next price refresh.
+    Concurrent creates of the same symbol are coalesced (in this process and across processes): the first
+    resolves and inserts the coin, the others then find it and get the usual "already exists" response.
+    While CoinGecko is unavailable, last-known market data is used and flagged with the X-Stale-Data-Age header.
     """
     symbol_upper = crypto_in.symbol.upper()
+    async with create_flights.hold(symbol_upper):
+        return await _create_cryptocurrency(db, crypto_in, symbol_upper, response)
 
-    db_crypto = crud_crypto.get_crypto(db, symbol=symbol_upper)
+
+async def _create_cryptocurrency(db: Session, crypto_in: crypto_schemas.CryptoCreate, symbol_upper: str,
+                                 response: Response) -> models.Cryptocurrency:
+    db_crypto = await run_in_threadpool(crud_crypto.get_crypto, db, symbol=symbol_upper)
     if db_crypto:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Cryptocurrency with symbol '{symbol_upper}' already exists.",
         )
 
-    search_result = coingecko.search_coin(symbol=symbol_upper)
+    search_result = await coingecko.search_coin_async(symbol=symbol_upper)
     if not search_result:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -40,65 +134,385 @@ def create_cryptocurrency(
 
     coingecko_id, name = search_result
 
-    existing_by_cg_id = db.query(models.Cryptocurrency).filter(
-        models.Cryptocurrency.coingecko_id == coingecko_id).first()
+    existing_by_cg_id = await run_in_threadpool(
+        lambda: db.query(models.Cryptocurrency).filter(models.Cryptocurrency.coingecko_id == coingecko_id).first()
+    )
     if existing_by_cg_id:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Cryptocurrency with CoinGecko ID '{coingecko_id}' (symbol: {existing_by_cg_id.symbol}) already exists.",
         )
 
-    coin_metadata = {}
-    prices = coingecko.get_prices(coingecko_ids=[coingecko_id], vs_currency="usd")
+    markets, stale = await coingecko.get_markets_or_stale_async(coingecko_ids=[coingecko_id])
+    coin_metadata = markets.get(coingecko_id, {})
+    if coingecko_id in stale:
+        response.headers[STALE_DATA_HEADER] = str(int(stale[coingecko_id]))
 
-    if coingecko_id in prices and "usd" in prices[coingecko_id]:
-        coin_metadata["current_price_usd"] = prices[coingecko_id]["usd"]
+    try:
+        return await run_in_threadpool(
+            crud_crypto.create_crypto,
+            db=db,
+            symbol=symbol_upper,
+            name=name,
+            coingecko_id=coingecko_id,
+            coin_metadata=coin_metadata,
+            note=crypto_in.note
+        )
+    except IntegrityError:
+        # Inserted concurrently by a create that did not hold the lock (Redis unavailable or wait timed out).
+        await run_in_threadpool(db.rollback)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Cryptocurrency with symbol '{symbol_upper}' or CoinGecko ID '{coingecko_id}' already exists.",
+        )
+
+
+# Inserting a bulk batch is retried this many times when concurrent creates claim some of its symbols.
+BULK_CREATE_ATTEMPTS = 3
 
-    details = coingecko.get_coin_details(coingecko_id=coingecko_id)
-    if details and details.get("image"):
-        coin_metadata["image"] = details["image"]
 
-    created_crypto = crud_crypto.create_crypto(
-        db=db,
-        symbol=symbol_upper,
-        name=name,
-        coingecko_id=coingecko_id,
-        coin_metadata=coin_metadata,
-        note=crypto_in.note
+def _bulk_exists_result(symbol: str, coingecko_id: Optional[str], existing_symbols: Set[str],
+                        existing_by_cg_id: Dict[str, str]) -> Optional[crypto_schemas.CryptoBulkItemResult]:
+    if symbol in existing_symbols:
+        return crypto_schemas.CryptoBulkItemResult(
+            symbol=symbol, status="exists", coingecko_id=coingecko_id,
+            detail=f"Cryptocurrency with symbol '{symbol}' already exists.")
+    if coingecko_id and coingecko_id in existing_by_cg_id:
+        return crypto_schemas.CryptoBulkItemResult(
+            symbol=symbol, status="exists", coingecko_id=coingecko_id,
+            detail=f"Cryptocurrency with CoinGecko ID '{coingecko_id}' "
+                   f"(symbol: {existing_by_cg_id[coingecko_id]}) already exists.")
+    return None
+
+
+@router.post("/bulk", response_model=crypto_schemas.CryptoBulkCreateResult)
+async def create_cryptocurrencies_bulk(
+        *,
+        db: Session = Depends(get_db),
+        bulk_in: crypto_schemas.CryptoBulkCreate
+) -> Any:
+    """
+    Create many cryptocurrency records in one request.
+    Symbols are resolved together, market data (USD price, image, market cap and rank) is fetched in batched
+    /coins/markets requests, existing symbols and CoinGecko IDs are checked with one query and all new rows
+    are inserted in a single transaction. Returns a per-symbol status report.
+    If a concurrent create inserts one of the symbols first, the check is repeated and the remaining rows
+    are inserted; coins whose market data could not be fetched are created without it and say so in `detail`.
+    """
+    notes: Dict[str, Any] = {}
+    repeated: Dict[int, crypto_schemas.CryptoBulkItemResult] = {}
+    for position, item in enumerate(bulk_in.items):
+        symbol_upper = item.symbol.upper()
+        if symbol_upper in notes:
+            repeated[position] = crypto_schemas.CryptoBulkItemResult(
+                symbol=symbol_upper, status="duplicate", detail="Symbol repeated in request.")
+        else:
+            notes[symbol_upper] = item.note
+
+    symbols = list(notes)
+    resolved = await coingecko.search_coins_async(symbols)
+    coingecko_ids = [result[0] for result in resolved.values() if result]
+
+    existing_symbols, existing_by_cg_id = await run_in_threadpool(
+        crud_crypto.get_existing_symbols_and_coingecko_ids, db, symbols=symbols, coingecko_ids=coingecko_ids
     )
-    return created_crypto
 
+    status_by_symbol: Dict[str, crypto_schemas.CryptoBulkItemResult] = {}
+    to_create: List[Dict[str, Any]] = []
+    claimed_cg_ids: Dict[str, str] = {}
+    for symbol in symbols:
+        search_result = resolved[symbol]
+        coingecko_id = search_result[0] if search_result else None
+        exists = _bulk_exists_result(symbol, coingecko_id, existing_symbols, existing_by_cg_id)
+        if exists:
+            status_by_symbol[symbol] = exists
+        elif not search_result:
+            status_by_symbol[symbol] = crypto_schemas.CryptoBulkItemResult(
+                symbol=symbol, status="not_found", detail=f"Symbol '{symbol}' not found on CoinGecko.")
+        elif coingecko_id in claimed_cg_ids:
+            status_by_symbol[symbol] = crypto_schemas.CryptoBulkItemResult(
+                symbol=symbol, status="duplicate", coingecko_id=coingecko_id,
+                detail=f"CoinGecko ID '{coingecko_id}' already requested as {claimed_cg_ids[coingecko_id]}.")
+        else:
+            claimed_cg_ids[coingecko_id] = symbol
+            to_create.append({"symbol": symbol, "name": search_result[1], "coingecko_id": coingecko_id,
+                              "coin_metadata": {}, "note": notes[symbol]})
+
+    market_failures: Set[str] = set()
+    if to_create:
+        batch = await coingecko.get_markets_batched_async([row["coingecko_id"] for row in to_create])
+        market_failures = set(batch.failed_ids)
+        for row in to_create:
+            row["coin_metadata"].update(batch.prices.get(row["coingecko_id"], {}))
 
-@router.get("/", response_model=List[crypto_schemas.Crypto])
+    for attempt in range(BULK_CREATE_ATTEMPTS):
+        try:
+            created = await run_in_threadpool(crud_crypto.create_cryptos_bulk, db, rows=to_create)
+            break
+        except IntegrityError:
+            # Some rows were inserted by concurrent creates since the check: re-check and insert the rest.
+            await run_in_threadpool(db.rollback)
+            if attempt == BULK_CREATE_ATTEMPTS - 1:
+                raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                                    detail="Conflicting concurrent creates; retry the request.")
+            existing_symbols, existing_by_cg_id = await run_in_threadpool(
+                crud_crypto.get_existing_symbols_and_coingecko_ids, db, symbols=[row["symbol"] for row in to_create],
+                coingecko_ids=[row["coingecko_id"] for row in to_create]
+            )
+            remaining = []
+            for row in to_create:
+                exists = _bulk_exists_result(row["symbol"], row["coingecko_id"], existing_symbols, existing_by_cg_id)
+                if exists:
+                    status_by_symbol[row["symbol"]] = exists
+                else:
+                    remaining.append(row)
+            to_create = remaining
+
+    for db_crypto in created:
+        detail = None
+        if db_crypto.coingecko_id in market_failures:
+            detail = "Market data could not be fetched from CoinGecko; it is filled in by the next refresh."
+        status_by_symbol[db_crypto.symbol] = crypto_schemas.CryptoBulkItemResult(
+            symbol=db_crypto.symbol, status="created", coingecko_id=db_crypto.coingecko_id, detail=detail,
+            crypto=crypto_schemas.Crypto.model_validate(db_crypto))
+
+    report = [repeated.get(position) or status_by_symbol[item.symbol.upper()]
+              for position, item in enumerate(bulk_in.items)]
+    return crypto_schemas.CryptoBulkCreateResult(created=len(created), results=report)
+
+
+@router.get("/", response_model=List[Union[crypto_schemas.CryptoPrice, crypto_schemas.Crypto]],
+            response_class=responses.ORJSONResponse)
 def read_cryptocurrencies(
         db: Session = Depends(get_db),
         skip: int = Query(0, ge=0, description="Number of records to skip for pagination"),
-        limit: int = Query(100, ge=1, le=200, description="Maximum number of records to return")
+        limit: int = Query(100, ge=1, le=200, description="Maximum number of records to return"),
+        cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header of the previous page"),
+        currency: Optional[str] = Query(None, description="Quote currency to add as `price`/`currency` (e.g. usd, eur)"),
+        sort: Literal["id", "price_usd", "market_cap_usd", "market_cap_rank"] = Query(
+            "id", description="Sort key; coins without a value for it are left out"),
+        order: Literal["asc", "desc"] = Query("asc", description="Sort direction"),
+        min_price_usd: Optional[float] = Query(None, ge=0, description="Inclusive lower bound on price_usd"),
+        max_price_usd: Optional[float] = Query(None, ge=0, description="Inclusive upper bound on price_usd"),
+        min_market_cap_usd: Optional[float] = Query(None, ge=0, description="Inclusive lower bound on market_cap_usd"),
+        max_market_cap_usd: Optional[float] = Query(None, ge=0, description="Inclusive upper bound on market_cap_usd"),
+        max_market_cap_rank: Optional[int] = Query(None, ge=1, description="Only coins ranked this high or better")
 ) -> Any:
     """
-    Retrieve a list of cryptocurrencies with pagination.
+    Retrieve a list of cryptocurrencies ordered by id, or by USD price, market cap or market cap rank.
+    Rows are read as column tuples and encoded straight to JSON with orjson; their shape is the
+    Crypto schema by construction (CRYPTO_COLUMNS), so per-row model validation is skipped.
+    Sorting and the range filters use the typed, indexed copies of the coin_metadata fields.
+    A full page sets the X-Next-Cursor response header; pass it back as `cursor` (with the same sort and
+    order) for keyset pagination (constant cost per page, no shifting results). `skip` is ignored when a
+    cursor is given.
+    """
+    after_id, after_value = _decode_cursor(cursor, sort, order) if cursor else (None, None)
+    currency = _parse_currency(currency)
+    ranges = {name: bounds for name, bounds in (
+        ("price_usd", _parse_range("price_usd", min_price_usd, max_price_usd)),
+        ("market_cap_usd", _parse_range("market_cap_usd", min_market_cap_usd, max_market_cap_usd)),
+        ("market_cap_rank", (None, max_market_cap_rank) if max_market_cap_rank is not None else None),
+    ) if bounds is not None}
+    cache_key = response_cache.list_key(skip=0 if cursor else skip, limit=limit, after_id=after_id,
+                                        currency=currency or "", sort=sort, order=order, after_value=after_value,
+                                        ranges=sorted(ranges.items()))
+    cached, generation = response_cache.read(cache_key)
+    if cached is not None:
+        headers = {NEXT_CURSOR_HEADER: cached["next_cursor"].decode()} if cached.get("next_cursor") else None
+        return Response(content=cached["body"], media_type="application/json", headers=headers)
+
+    rows = crud_crypto.get_crypto_rows(db, skip=skip, limit=limit, after_id=after_id, sort_by=sort,
+                                       descending=order == "desc", after_value=after_value, ranges=ranges)
+    sort_values = [row.pop("sort_value", None) for row in rows]
+    if currency:
+        for row in rows:
+            row["currency"] = currency
+            row["price"] = _quote(row["coin_metadata"], currency)
+    next_cursor = _encode_cursor(rows[-1]["id"], sort, order, sort_values[-1]) if len(rows) == limit else ""
+    response = responses.ORJSONResponse(rows, headers={NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None)
+    response_cache.store(cache_key, generation, {"body": response.body, "next_cursor": next_cursor}, is_list=True)
+    return response
+
+
+@router.get("/export")
+def export_cryptocurrencies(
+        db: Session = Depends(get_db)
+) -> StreamingResponse:
+    """
+    Stream every cryptocurrency as newline-delimited JSON, read from the database in batches.
+    """
+    def generate_lines() -> Iterator[bytes]:
+        for row in crud_crypto.iter_crypto_rows(db, batch_size=EXPORT_BATCH_SIZE):
+            yield responses.dumps(row) + b"\n"
+
+    return StreamingResponse(generate_lines(), media_type="application/x-ndjson")
+
+
+@router.get("/stream")
+async def stream_prices(
+        symbols: Optional[str] = Query(None, description="Comma-separated symbols to follow (default: all)")
+) -> StreamingResponse:
+    """
+    Server-Sent Events stream of price deltas pushed after each worker refresh.
+    A client that falls behind receives only the latest price per symbol.
+    """
+    subscription = price_hub.subscribe(_parse_symbols(symbols))
+
+    async def generate_events() -> AsyncIterator[str]:
+        try:
+            while True:
+                batch = await subscription.next_batch(timeout=settings.PRICE_STREAM_HEARTBEAT_SECONDS)
+                if batch:
+                    yield f"event: prices\ndata: {json.dumps(batch)}\n\n"
+                else:
+                    yield ": keep-alive\n\n"
+        finally:
+            price_hub.unsubscribe(subscription)
+
+    return StreamingResponse(generate_events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@router.websocket("/ws")
+async def websocket_prices(
+        websocket: WebSocket,
+        symbols: Optional[str] = Query(None, description="Comma-separated symbols to follow (default: all)")
+) -> None:
     """
-    cryptos = crud_crypto.get_cryptos(db, skip=skip, limit=limit)
-    return cryptos
+    WebSocket stream of price deltas; same payload and coalescing as the SSE stream.
+    Clients that cannot accept a message within PRICE_STREAM_SEND_TIMEOUT are disconnected.
+    """
+    await websocket.accept()
+    subscription = price_hub.subscribe(_parse_symbols(symbols))
+    try:
+        while True:
+            batch = await subscription.next_batch(timeout=settings.PRICE_STREAM_HEARTBEAT_SECONDS)
+            await asyncio.wait_for(websocket.send_json({"prices": batch}), settings.PRICE_STREAM_SEND_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.info("Closing slow price stream WebSocket client.")
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        price_hub.unsubscribe(subscription)
 
 
-@router.get("/{symbol}", response_model=crypto_schemas.Crypto)
-def read_cryptocurrency(
+@router.get("/{symbol}", response_model=Union[crypto_schemas.CryptoPrice, crypto_schemas.Crypto])
+async def read_cryptocurrency(
         *,
-        db: Session = Depends(get_db),
-        symbol: str
+        db: AsyncSession = Depends(get_async_db),
+        symbol: str,
+        currency: Optional[str] = Query(None, description="Quote currency to add as `price`/`currency` (e.g. usd, eur)")
 ) -> Any:
     """
     Get a specific cryptocurrency by its symbol.
+    Served from the Redis response cache when possible; writes invalidate the entry.
+    Runs entirely on the event loop (async Redis and async database session), without the threadpool.
+    Each successful read counts towards the coin's refresh tier.
     """
+    currency = _parse_currency(currency)
+    cache_key = response_cache.symbol_key(symbol, currency)
+    cached, generation = await response_cache.read_async(cache_key)
+    if cached is not None:
+        await refresh_scheduler.record_read_async(symbol)
+        return Response(content=cached["body"], media_type="application/json")
 
+    db_crypto = await crud_crypto.get_crypto_async(db, symbol=symbol)
+    if not db_crypto:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Cryptocurrency with symbol '{symbol}' not found",
+        )
+    crypto = crypto_schemas.Crypto.model_validate(db_crypto)
+    if currency:
+        crypto = crypto_schemas.CryptoPrice(**crypto.model_dump(), currency=currency,
+                                            price=_quote(crypto.coin_metadata, currency))
+    body = crypto.model_dump_json()
+    await response_cache.store_async(cache_key, generation, {"body": body})
+    await refresh_scheduler.record_read_async(symbol)
+    return Response(content=body, media_type="application/json")
+
+
+@router.get("/{symbol}/price", response_model=crypto_schemas.SnapshotQuote)
+async def read_cryptocurrency_price(
+        *,
+        db: AsyncSession = Depends(get_async_db),
+        symbol: str,
+        currency: Optional[str] = Query(None, description="Quote currency to add as `price`/`currency` (e.g. usd, eur)")
+) -> Any:
+    """
+    Get the latest quotes of a cryptocurrency from the price snapshot the worker publishes after each refresh.
+    Read from a memory-mapped file shared by all API processes: no database, cache or JSON decoding.
+    A coin created since the last refresh is not in the snapshot yet and is read from the database instead
+    (`snapshot_generated_at` is null). The read is counted in process memory and sent to Redis in batches.
+    """
+    currency = _parse_currency(currency)
+    if not price_snapshot.is_loaded:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            detail="Price snapshot is not available yet.")
+    quote = price_snapshot.lookup(symbol)
+    if quote is not None:
+        body = {
+            "symbol": quote.symbol,
+            "prices": quote.prices,
+            "updated_at": datetime.fromtimestamp(quote.updated_at, timezone.utc) if quote.updated_at else None,
+            "snapshot_generated_at": datetime.fromtimestamp(quote.generated_at, timezone.utc),
+        }
+    else:
+        db_crypto = await crud_crypto.get_crypto_async(db, symbol=symbol)
+        if not db_crypto:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Cryptocurrency with symbol '{symbol}' not found",
+            )
+        body = {
+            "symbol": db_crypto.symbol,
+            "prices": {code: float(price) for code in settings.PRICE_QUOTE_CURRENCIES
+                       if isinstance(price := _quote(db_crypto.coin_metadata, code), (int, float))},
+            "updated_at": _as_utc(db_crypto.last_updated_coingecko) if db_crypto.last_updated_coingecko else None,
+            "snapshot_generated_at": None,
+        }
+    if currency:
+        body["currency"] = currency
+        body["price"] = body["prices"].get(currency)
+    refresh_scheduler.read_buffer.add(symbol)
+    return Response(content=responses.dumps(body), media_type="application/json")
+
+
+@router.get("/{symbol}/history", response_model=crypto_schemas.PriceHistory)
+def read_cryptocurrency_history(
+        *,
+        db: Session = Depends(get_db),
+        symbol: str,
+        interval: Literal["1m", "5m", "15m", "1h", "4h", "1d", "1w"] = Query("1h", description="Candle size"),
+        start: Optional[datetime] = Query(None, description="Range start (defaults to limit candles before end)"),
+        end: Optional[datetime] = Query(None, description="Range end, exclusive (defaults to now)"),
+        limit: int = Query(500, ge=1, le=2000, description="Maximum number of candles in the range")
+) -> Any:
+    """
+    Get USD price history of a cryptocurrency as OHLC candles, downsampled in the database.
+    """
     db_crypto = crud_crypto.get_crypto(db, symbol=symbol)
     if not db_crypto:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Cryptocurrency with symbol '{symbol}' not found",
         )
-    return db_crypto
+
+    interval_seconds = HISTORY_INTERVALS[interval]
+    end = _as_utc(end) if end else datetime.now(timezone.utc)
+    start = _as_utc(start) if start else end - timedelta(seconds=interval_seconds * limit)
+    if start >= end or (end - start).total_seconds() > interval_seconds * limit:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Range must be positive and span at most {limit} candles of {interval}.",
+        )
+
+    refresh_scheduler.record_read(db_crypto.symbol)
+    candles = crud_crypto.get_price_history_ohlc(db, cryptocurrency_id=db_crypto.id,
+                                                 interval_seconds=interval_seconds, start=start, end=end)
+    return {"symbol": db_crypto.symbol, "interval": interval, "candles": candles}
 
 
 @router.put("/{symbol}", response_model=crypto_schemas.Crypto)
@@ -0,0 +1,38 @@
+from fastapi import APIRouter, Response, status
+from sqlalchemy import text
+from typing import Any
+
+from app.core.startup import startup_state
+from app.db.base import engine
+
+router = APIRouter()
+
+
+@router.get("/live")
+async def read_liveness() -> Any:
+    """
+    Liveness probe: the process is up and serving requests. Never touches dependencies.
+    """
+    return {"status": "ok"}
+
+
+@router.get("/ready")
+def read_readiness(response: Response) -> Any:
+    """
+    Readiness probe: the schema is prepared and the database answers. Seeding progress is reported
+    but does not gate readiness. Returns 503 while not ready.
+    """
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+        database = True
+    except Exception:
+        database = False
+
+    ready = database and startup_state.schema_ready
+    if not ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return {
+        "status": "ready" if ready else "not_ready",
+        "checks": {"database": database, "schema": startup_state.schema_ready, "seed": startup_state.seed_status},
+    }
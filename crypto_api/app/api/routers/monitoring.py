@@ -0,0 +1,23 @@
+from fastapi import APIRouter
+from typing import Any
+
+from app.services import coingecko
+
+router = APIRouter()
+
+
+@router.get("/cache")
+def read_cache_stats() -> Any:
+    """
+    CoinGecko response cache hit/miss counters per endpoint (counters are per API process).
+    """
+    return coingecko.cache.stats()
+
+
+@router.get("/circuit-breaker")
+def read_circuit_breaker() -> Any:
+    """
+    State of the CoinGecko circuit breaker (closed, open or half_open) with its recent failure rate
+    (per API process; each worker process keeps its own breaker).
+    """
+    return coingecko.breaker.snapshot()
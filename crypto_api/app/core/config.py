@@ -1,7 +1,7 @@
 import os
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
-from typing import Optional
+from typing import Dict, Optional, List
 
 dotenv_path = os.path.join(os.path.dirname(__file__), '..', '..', '.env')
 load_dotenv(dotenv_path=dotenv_path)
@@ -17,13 +17,112 @@ class Settings(BaseSettings):
     POSTGRES_PORT: str
     POSTGRES_DB: str
     DATABASE_URL: Optional[str] = None
+    # Async routes use this URL (derived from DATABASE_URL with the asyncpg driver when unset).
+    ASYNC_DATABASE_URL: Optional[str] = None
+    # Per-engine pool sizing; the sync and async engines each get their own pool.
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    # Connections are recycled instead of pinged on checkout; enable pre-ping where idle
+    # connections can be dropped by the network or a proxy before DB_POOL_RECYCLE.
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = False
 
     REDIS_HOST: str = "redis"
     REDIS_PORT: int = 6379
+    REDIS_CACHE_DB: int = 2
+    REDIS_SOCKET_TIMEOUT: float = 0.5
     CELERY_BROKER_URL: Optional[str] = None
     CELERY_RESULT_BACKEND: Optional[str] = None
 
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_TTL: int = 300
+
+    # Concurrent creates of one symbol are coalesced under a lock held for at most CREATE_LOCK_TTL;
+    # a create waits up to CREATE_LOCK_WAIT for another process before proceeding without it.
+    CREATE_LOCK_TTL: float = 30.0
+    CREATE_LOCK_WAIT: float = 10.0
+
+    PRICE_STREAM_ENABLED: bool = True
+    # Upper bound on one price refresh run; the lock that prevents overlapping runs expires after it.
+    PRICE_REFRESH_LOCK_TTL: float = 300.0
+    # Quote currencies fetched in the same /simple/price call and stored as coin_metadata["current_price_<cur>"].
+    PRICE_QUOTE_CURRENCIES: List[str] = ["usd", "eur", "gbp", "btc"]
+    # Image, market cap and rank are refreshed for all coins from /coins/markets at this cadence.
+    MARKET_DATA_REFRESH_SECONDS: float = 15 * 60
+    PRICE_STREAM_HEARTBEAT_SECONDS: float = 15.0
+    PRICE_STREAM_SEND_TIMEOUT: float = 10.0
+
+    # Tiered price refresh: every REFRESH_TICK_SECONDS the coins that are due are refreshed, hottest first,
+    # spending at most REFRESH_REQUEST_BUDGET_PER_MINUTE upstream requests (at least one per tick).
+    # Tiers are reassigned every REFRESH_PLAN_SECONDS from API read counts and price range over the window.
+    REFRESH_TICK_SECONDS: float = 5.0
+    REFRESH_PLAN_SECONDS: float = 60.0
+    REFRESH_REQUEST_BUDGET_PER_MINUTE: float = 12.0
+    REFRESH_TIER_INTERVALS: Dict[str, float] = {"hot": 10.0, "warm": 60.0, "cold": 300.0}
+    REFRESH_TRACK_READS: bool = True
+    # How often API processes push reads buffered by the snapshot price route to Redis.
+    REFRESH_READS_FLUSH_SECONDS: float = 5.0
+    # Reads per plan period (after decay) and relative price range ((max - min) / min) promoting a coin.
+    REFRESH_HOT_READS: float = 20.0
+    REFRESH_WARM_READS: float = 2.0
+    REFRESH_HOT_VOLATILITY: float = 0.02
+    REFRESH_WARM_VOLATILITY: float = 0.005
+    REFRESH_VOLATILITY_WINDOW_SECONDS: float = 60 * 60
+    REFRESH_READS_DECAY: float = 0.5
+
+    # Port of the Celery worker's Prometheus endpoint (the API serves /metrics itself); 0 disables it.
+    METRICS_WORKER_PORT: int = 9808
+
     COINGECKO_API_BASE_URL: str = "https://api.coingecko.com/api/v3"
+    COINGECKO_TIMEOUT: float = 10.0
+    COINGECKO_MAX_CONNECTIONS: int = 20
+    COINGECKO_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    COINGECKO_KEEPALIVE_EXPIRY: float = 30.0
+    COINGECKO_MAX_URL_LENGTH: int = 2000
+    COINGECKO_PRICE_CONCURRENCY: int = 4
+    COINGECKO_MAX_RETRIES: int = 3
+    COINGECKO_BACKOFF_BASE: float = 1.0
+    COINGECKO_BACKOFF_MAX: float = 60.0
+
+    # Per-process circuit breaker over the last COINGECKO_BREAKER_WINDOW upstream calls: it opens once at least
+    # COINGECKO_BREAKER_MIN_CALLS have a failure rate of COINGECKO_BREAKER_FAILURE_RATE, fails calls fast for
+    # COINGECKO_BREAKER_OPEN_SECONDS, then lets COINGECKO_BREAKER_HALF_OPEN_PROBES probe calls through.
+    COINGECKO_BREAKER_ENABLED: bool = True
+    COINGECKO_BREAKER_WINDOW: int = 20
+    COINGECKO_BREAKER_MIN_CALLS: int = 5
+    COINGECKO_BREAKER_FAILURE_RATE: float = 0.5
+    COINGECKO_BREAKER_OPEN_SECONDS: float = 30.0
+    COINGECKO_BREAKER_HALF_OPEN_PROBES: int = 1
+
+    COINGECKO_RATE_LIMIT_ENABLED: bool = True
+    COINGECKO_RATE_LIMIT_PER_MINUTE: float = 30.0
+    COINGECKO_RATE_LIMIT_BURST: int = 10
+    COINGECKO_RATE_LIMIT_INTERACTIVE_RESERVE: int = 3
+    COINGECKO_RATE_LIMIT_MAX_WAIT_INTERACTIVE: float = 5.0
+    COINGECKO_RATE_LIMIT_MAX_WAIT_BACKGROUND: float = 120.0
+
+    # Latest-price snapshot written by the worker after every refresh and memory-mapped by API processes.
+    PRICE_SNAPSHOT_PATH: str = "/app/data/price_snapshot.bin"
+    PRICE_SNAPSHOT_RELOAD_CHECK_SECONDS: float = 1.0
+
+    SYMBOL_INDEX_PATH: str = "/app/data/symbol_index.json"
+    SYMBOL_INDEX_RANKED_PAGES: int = 4
+    SYMBOL_INDEX_REFRESH_SECONDS: float = 6 * 60 * 60
+    SYMBOL_INDEX_RELOAD_CHECK_SECONDS: float = 60.0
+    SYMBOL_INDEX_FALLBACK_SEARCH: bool = False
+
+    COINGECKO_CACHE_BACKEND: str = "memory"
+    COINGECKO_CACHE_MAX_SIZE: int = 10000
+    COINGECKO_CACHE_SEARCH_TTL: float = 60 * 60
+    COINGECKO_CACHE_DETAILS_TTL: float = 6 * 60 * 60
+    COINGECKO_CACHE_MARKETS_TTL: float = 60.0
+    COINGECKO_CACHE_NEGATIVE_TTL: float = 5 * 60
+    # How long expired entries are kept as last-known data for when CoinGecko is unavailable.
+    COINGECKO_CACHE_STALE_TTL: float = 24 * 60 * 60
+
+    SEED_FIXTURE_PATH: str = os.path.join(os.path.dirname(__file__), '..', 'services', 'seed_data.json')
+    SEED_LOCK_TTL: float = 60.0
 
     class Config:
         case_sensitive = True
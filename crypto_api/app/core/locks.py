@@ -0,0 +1,108 @@
+import asyncio
+import logging
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Dict, Optional
+
+import redis
+import redis.asyncio
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "crypto:locks:"
+
+# KEYS: lock. ARGV: owner token. Deletes the lock only if this owner still holds it.
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisLock:
+    """
+    Expiring lock shared by every API and worker process. The owner token makes release safe after the
+    lock expired and was taken by someone else. Redis errors propagate so each caller decides whether
+    to proceed unlocked or skip the work.
+    """
+
+    def __init__(self, client_factory: Callable[[], redis.Redis], name: str, ttl_seconds: float,
+                 token: Optional[str] = None,
+                 async_client_factory: Optional[Callable[[], redis.asyncio.Redis]] = None):
+        self._client_factory = client_factory
+        self._async_client_factory = async_client_factory
+        self.key = KEY_PREFIX + name
+        self.ttl_ms = max(int(ttl_seconds * 1000), 1)
+        self.token = token or uuid.uuid4().hex
+
+    def acquire(self) -> bool:
+        return bool(self._client_factory().set(self.key, self.token, nx=True, px=self.ttl_ms))
+
+    def release(self) -> bool:
+        return bool(self._client_factory().eval(RELEASE_SCRIPT, 1, self.key, self.token))
+
+    async def acquire_async(self) -> bool:
+        return bool(await self._async_client_factory().set(self.key, self.token, nx=True, px=self.ttl_ms))
+
+    async def release_async(self) -> bool:
+        return bool(await self._async_client_factory().eval(RELEASE_SCRIPT, 1, self.key, self.token))
+
+
+class SingleFlight:
+    """
+    Runs at most one holder per key at a time: callers in this process queue on an asyncio.Lock and one
+    process at a time holds a RedisLock for the key. A caller that waited re-checks state once it gets
+    in, so duplicates of an in-flight operation observe its outcome instead of repeating it.
+    Fails open: if Redis is unavailable, or another process holds the key for longer than wait_seconds,
+    the caller proceeds with only the in-process lock.
+    """
+
+    def __init__(self, client_factory: Callable[[], redis.Redis],
+                 async_client_factory: Callable[[], redis.asyncio.Redis], name: str,
+                 ttl_seconds: float, wait_seconds: float, poll_seconds: float = 0.05):
+        self._client_factory = client_factory
+        self._async_client_factory = async_client_factory
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.wait_seconds = wait_seconds
+        self.poll_seconds = poll_seconds
+        self._local_locks: Dict[str, asyncio.Lock] = {}
+        self._local_users: Dict[str, int] = {}
+
+    async def _acquire(self, lock: RedisLock) -> bool:
+        deadline = time.monotonic() + self.wait_seconds
+        try:
+            while not await lock.acquire_async():
+                if time.monotonic() >= deadline:
+                    logger.warning(f"Waited {self.wait_seconds}s for {lock.key}; proceeding without it.")
+                    return False
+                await asyncio.sleep(self.poll_seconds)
+        except redis.RedisError as e:
+            logger.warning(f"Lock {lock.key} unavailable, proceeding without it: {e}")
+            return False
+        return True
+
+    @asynccontextmanager
+    async def hold(self, key: str) -> AsyncIterator[None]:
+        local_lock = self._local_locks.setdefault(key, asyncio.Lock())
+        self._local_users[key] = self._local_users.get(key, 0) + 1
+        try:
+            async with local_lock:
+                lock = RedisLock(self._client_factory, f"{self.name}:{key}", ttl_seconds=self.ttl_seconds,
+                                 async_client_factory=self._async_client_factory)
+                acquired = await self._acquire(lock)
+                try:
+                    yield
+                finally:
+                    if acquired:
+                        try:
+                            await lock.release_async()
+                        except redis.RedisError as e:
+                            logger.warning(f"Could not release {lock.key} (it expires on its own): {e}")
+        finally:
+            self._local_users[key] -= 1
+            if not self._local_users[key]:
+                del self._local_users[key]
+                del self._local_locks[key]
@@ -0,0 +1,178 @@
+import glob
+import os
+import re
+import time
+from typing import Optional, Tuple, Union
+
+# prometheus_client picks its value storage when imported; the multiprocess directory must exist by then.
+MULTIPROC_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+if MULTIPROC_DIR:
+    os.makedirs(MULTIPROC_DIR, exist_ok=True)
+
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram,
+                               generate_latest, multiprocess, start_http_server)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SQL_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+TASK_BUCKETS = (0.1, 0.5, 1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Time until response headers are sent, by route template.",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS,
+)
+COINGECKO_REQUEST_DURATION = Histogram(
+    "coingecko_request_duration_seconds", "CoinGecko HTTP call latency by endpoint and status "
+    "('error' for transport failures). Retries are observed individually.",
+    ["endpoint", "status"], buckets=LATENCY_BUCKETS,
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds", "SQL statement execution time by statement type.",
+    ["operation"], buckets=SQL_BUCKETS,
+)
+DB_POOL_CHECKOUT_DURATION = Histogram(
+    "db_pool_checkout_duration_seconds", "Time spent waiting for a pooled database connection.",
+    buckets=SQL_BUCKETS,
+)
+CELERY_TASK_DURATION = Histogram(
+    "celery_task_duration_seconds", "Celery task run time by task and final state.",
+    ["task", "state"], buckets=TASK_BUCKETS,
+)
+PRICE_UPDATE_ROWS = Counter(
+    "crypto_price_update_rows_total", "Cryptocurrency rows updated by price refreshes, whichever task ran them.",
+)
+
+# /coins/{id} is collapsed to one label value so coin ids do not create a series each.
+_COIN_DETAILS_PATH = re.compile(r"^/coins/(?!list$|markets$)[^/]+$")
+_SQL_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH"}
+
+
+def coingecko_endpoint(path: str) -> str:
+    return "/coins/{id}" if _COIN_DETAILS_PATH.match(path) else path
+
+
+def observe_coingecko_call(path: str, status: Union[int, str], seconds: float) -> None:
+    COINGECKO_REQUEST_DURATION.labels(endpoint=coingecko_endpoint(path), status=str(status)).observe(seconds)
+
+
+def _sql_operation(statement: str) -> str:
+    words = statement.split(None, 1)
+    operation = words[0].upper() if words else ""
+    return operation if operation in _SQL_OPERATIONS else "OTHER"
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Times every cursor execution and every pool checkout made through `engine`."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started_at"].pop()
+        DB_QUERY_DURATION.labels(operation=_sql_operation(statement)).observe(time.perf_counter() - started)
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(context):
+        started = context.connection.info.get("query_started_at") if context.connection is not None else None
+        if started:
+            started.pop()
+
+    # Pool events only fire once a connection has been handed out, so the wait is timed around
+    # raw_connection(); wrapping the engine (not the pool) survives engine.dispose().
+    raw_connection = engine.raw_connection
+
+    def _timed_raw_connection():
+        started = time.perf_counter()
+        try:
+            return raw_connection()
+        finally:
+            DB_POOL_CHECKOUT_DURATION.observe(time.perf_counter() - started)
+
+    engine.raw_connection = _timed_raw_connection
+
+
+def _route_template(scope) -> str:
+    """
+    Full path template of the matched route. Routes of included routers may only know their own
+    relative template, so the router prefix is recovered from the request path.
+    """
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if template is None:
+        return "unmatched"
+    path = scope.get("path", "")
+    try:
+        rendered = template.format(**{name: str(value) for name, value in scope.get("path_params", {}).items()})
+    except (KeyError, IndexError, ValueError):
+        return template
+    return path[:-len(rendered)] + template if rendered and path.endswith(rendered) else template
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware observing request latency per route template (e.g. /api/v1/cryptocurrencies/{symbol}).
+    Latency is measured to the response start, so streaming endpoints report time to first byte.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        observed = False
+
+        def observe(status: int) -> None:
+            nonlocal observed
+            observed = True
+            HTTP_REQUEST_DURATION.labels(
+                method=scope["method"], route=_route_template(scope), status=str(status),
+            ).observe(time.perf_counter() - started)
+
+        async def send_with_metrics(message):
+            if message["type"] == "http.response.start" and not observed:
+                observe(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            if not observed:
+                observe(500)
+
+
+def _registry() -> CollectorRegistry:
+    """This process's registry, or one aggregating every process sharing PROMETHEUS_MULTIPROC_DIR."""
+    if not MULTIPROC_DIR:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    return generate_latest(_registry()), CONTENT_TYPE_LATEST
+
+
+def clear_multiprocess_dir() -> None:
+    """Removes samples left by previous runs; call before any worker process starts writing."""
+    if MULTIPROC_DIR:
+        for path in glob.glob(os.path.join(MULTIPROC_DIR, "*.db")):
+            os.remove(path)
+
+
+def mark_process_dead(pid: int) -> None:
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid)
+
+
+def start_metrics_server(port: Optional[int]) -> None:
+    """Serves render_metrics() on its own port, for processes without an HTTP API (the Celery worker)."""
+    if port:
+        start_http_server(port, registry=_registry())
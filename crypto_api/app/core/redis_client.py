@@ -0,0 +1,37 @@
+from typing import Optional
+
+import redis
+import redis.asyncio
+
+from app.core.config import settings
+
+_client: Optional[redis.Redis] = None
+_async_client: Optional[redis.asyncio.Redis] = None
+
+
+def get_redis() -> redis.Redis:
+    """Returns the process-wide Redis client used for caches and coordination (not the Celery broker)."""
+    global _client
+    if _client is None:
+        _client = redis.Redis(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            db=settings.REDIS_CACHE_DB,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        )
+    return _client
+
+
+def get_async_redis() -> redis.asyncio.Redis:
+    """Async counterpart of get_redis for code running on the API event loop."""
+    global _async_client
+    if _async_client is None:
+        _async_client = redis.asyncio.Redis(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            db=settings.REDIS_CACHE_DB,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        )
+    return _async_client
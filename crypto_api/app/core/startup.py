@@ -0,0 +1,11 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class StartupState:
+    """Progress of the background database preparation started by the application lifespan."""
+    schema_ready: bool = False
+    seed_status: str = "pending"
+
+
+startup_state = StartupState()
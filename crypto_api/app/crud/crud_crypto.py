@@ -1,20 +1,106 @@
+import json
+from sqlalchemy import or_, text, bindparam, insert, select, func, cast, extract, tuple_, DateTime, Integer, Float
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy.orm.attributes import flag_modified
-from typing import List, Optional, Dict, Any
-from datetime import datetime
+from typing import List, Optional, Dict, Any, Set, Tuple, Iterator
+from datetime import datetime, timezone
 
-from app.db import models
+from app.db import metadata_columns, models
 from app.schemas import crypto as crypto_schemas
+from app.services import response_cache
 
 
 def get_crypto(db: Session, symbol: str) -> Optional[models.Cryptocurrency]:
-    """Gets a single cryptocurrency by its symbol (case-insensitive search)."""
-    return db.query(models.Cryptocurrency).filter(models.Cryptocurrency.symbol.ilike(symbol)).first()
+    """Gets a single cryptocurrency by its symbol (case-insensitive; symbols are stored upper-cased)."""
+    return db.query(models.Cryptocurrency).filter(models.Cryptocurrency.symbol == symbol.upper()).first()
 
 
-def get_cryptos(db: Session, skip: int = 0, limit: int = 100) -> List[models.Cryptocurrency]:
-    """Gets a list of cryptocurrencies with pagination."""
-    return db.query(models.Cryptocurrency).offset(skip).limit(limit).all()
+async def get_crypto_async(db: AsyncSession, symbol: str) -> Optional[models.Cryptocurrency]:
+    """get_crypto on an AsyncSession."""
+    result = await db.execute(select(models.Cryptocurrency).where(models.Cryptocurrency.symbol == symbol.upper()))
+    return result.scalars().first()
+
+
+def get_cryptos(db: Session, skip: int = 0, limit: int = 100,
+                after_id: Optional[int] = None) -> List[models.Cryptocurrency]:
+    """
+    Gets a list of cryptocurrencies ordered by id.
+    Pages by keyset (id > after_id) when after_id is given, otherwise by offset.
+    """
+    query = db.query(models.Cryptocurrency).order_by(models.Cryptocurrency.id)
+    if after_id is not None:
+        query = query.filter(models.Cryptocurrency.id > after_id)
+    else:
+        query = query.offset(skip)
+    return query.limit(limit).all()
+
+
+# Same order as the crypto_schemas.Crypto fields, so encoded rows match the schema's JSON byte for byte.
+CRYPTO_COLUMNS = (
+    models.Cryptocurrency.symbol,
+    models.Cryptocurrency.id,
+    models.Cryptocurrency.name,
+    models.Cryptocurrency.coingecko_id,
+    models.Cryptocurrency.last_updated_coingecko,
+    models.Cryptocurrency.coin_metadata,
+    models.Cryptocurrency.note,
+)
+
+
+def get_crypto_rows(db: Session, skip: int = 0, limit: int = 100, after_id: Optional[int] = None,
+                    sort_by: str = "id", descending: bool = False, after_value: Any = None,
+                    ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None
+                    ) -> List[Dict[str, Any]]:
+    """
+    Same page as get_cryptos, fetched as column tuples and returned as plain dicts
+    (no ORM instances, no identity map) for the fast list serialization path.
+    sort_by may also be one of the typed metadata columns (metadata_columns.FIELDS): rows are then ordered by
+    (value, id), coins without a value are left out, each row carries its value as "sort_value" and keyset
+    pages continue after (after_value, after_id). ranges maps typed columns to inclusive (min, max) bounds.
+    """
+    query = select(*CRYPTO_COLUMNS)
+    keyset = models.Cryptocurrency.id
+    position: Any = after_id
+    if sort_by != "id":
+        column = getattr(models.Cryptocurrency, sort_by)
+        query = query.add_columns(column.label("sort_value")).where(column.isnot(None))
+        keyset = tuple_(column, models.Cryptocurrency.id)
+        position = tuple_(after_value, after_id)
+        order = (column.desc(), models.Cryptocurrency.id.desc()) if descending else (column, models.Cryptocurrency.id)
+    else:
+        order = (models.Cryptocurrency.id.desc(),) if descending else (models.Cryptocurrency.id,)
+    for name, (low, high) in (ranges or {}).items():
+        column = getattr(models.Cryptocurrency, name)
+        if low is not None:
+            query = query.where(column >= low)
+        if high is not None:
+            query = query.where(column <= high)
+
+    query = query.order_by(*order)
+    if after_id is not None:
+        query = query.where(keyset < position if descending else keyset > position)
+    else:
+        query = query.offset(skip)
+    return [row._asdict() for row in db.execute(query.limit(limit))]
+
+
+def iter_crypto_rows(db: Session, batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+    """
+    Yields every cryptocurrency as a plain dict, reading the table in keyset batches of batch_size
+    column tuples (no ORM instances), so memory stays flat regardless of table size.
+    """
+    last_id = 0
+    while True:
+        rows = db.execute(
+            select(*CRYPTO_COLUMNS).where(models.Cryptocurrency.id > last_id)
+            .order_by(models.Cryptocurrency.id).limit(batch_size)
+        ).all()
+        for row in rows:
+            yield row._asdict()
+        if len(rows) < batch_size:
+            return
+        last_id = rows[-1].id
 
 
 def get_all_crypto_coingecko_ids(db: Session) -> List[str]:
@@ -23,6 +109,29 @@ def get_all_crypto_coingecko_ids(db: Session) -> List[str]:
     return [result[0] for result in results]
 
 
+def get_all_crypto_coingecko_id_map(db: Session) -> Dict[str, str]:
+    """Gets {coingecko_id: symbol} for every cryptocurrency with a coingecko_id."""
+    results = db.query(models.Cryptocurrency.coingecko_id, models.Cryptocurrency.symbol).filter(
+        models.Cryptocurrency.coingecko_id.isnot(None)).all()
+    return {coingecko_id: symbol for coingecko_id, symbol in results}
+
+
+def get_metadata_by_coingecko_ids(db: Session, coingecko_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Gets {coingecko_id: coin_metadata} for the given ids in one query; untracked ids are absent."""
+    if not coingecko_ids:
+        return {}
+    rows = db.query(models.Cryptocurrency.coingecko_id, models.Cryptocurrency.coin_metadata).filter(
+        models.Cryptocurrency.coingecko_id.in_(coingecko_ids))
+    return {coingecko_id: metadata or {} for coingecko_id, metadata in rows}
+
+
+def get_latest_prices(db: Session) -> List[Tuple[int, str, Optional[datetime], Dict[str, Any]]]:
+    """Gets (id, symbol, last_updated_coingecko, coin_metadata) for every cryptocurrency, in id order."""
+    return [tuple(row) for row in db.query(
+        models.Cryptocurrency.id, models.Cryptocurrency.symbol, models.Cryptocurrency.last_updated_coingecko,
+        models.Cryptocurrency.coin_metadata).order_by(models.Cryptocurrency.id)]
+
+
 def create_crypto(db: Session, symbol: str, name: str, coingecko_id: str, coin_metadata: Dict[str, Any],
                   note: Optional[str] = None) -> models.Cryptocurrency:
     """Creates a new cryptocurrency record."""
@@ -32,14 +141,60 @@ def create_crypto(db: Session, symbol: str, name: str, coingecko_id: str, coin_m
         coingecko_id=coingecko_id,
         coin_metadata=coin_metadata,
         note=note,
-        last_updated_coingecko=datetime.now()
+        last_updated_coingecko=datetime.now(),
+        **metadata_columns.values(coin_metadata)
     )
     db.add(db_crypto)
     db.commit()
     db.refresh(db_crypto)
+    response_cache.invalidate([db_crypto.symbol])
     return db_crypto
 
 
+def get_existing_symbols_and_coingecko_ids(db: Session, symbols: List[str],
+                                           coingecko_ids: List[str]) -> Tuple[Set[str], Dict[str, str]]:
+    """
+    Finds which of the given symbols and coingecko_ids are already stored, in a single query.
+    Returns (existing symbols, {coingecko_id: symbol}).
+    """
+    if not symbols and not coingecko_ids:
+        return set(), {}
+    rows = db.query(models.Cryptocurrency.symbol, models.Cryptocurrency.coingecko_id).filter(
+        or_(models.Cryptocurrency.symbol.in_(symbols), models.Cryptocurrency.coingecko_id.in_(coingecko_ids))
+    ).all()
+    return {row.symbol for row in rows}, {row.coingecko_id: row.symbol for row in rows if row.coingecko_id}
+
+
+def create_cryptos_bulk(db: Session, rows: List[Dict[str, Any]]) -> List[models.Cryptocurrency]:
+    """
+    Creates many cryptocurrency records in a single transaction.
+    Each row holds the create_crypto keyword arguments (symbol, name, coingecko_id, coin_metadata, note).
+    """
+    if not rows:
+        return []
+    now = datetime.now()
+    db_cryptos = [
+        models.Cryptocurrency(
+            symbol=row["symbol"].upper(),
+            name=row["name"],
+            coingecko_id=row["coingecko_id"],
+            coin_metadata=row["coin_metadata"],
+            note=row.get("note"),
+            last_updated_coingecko=now,
+            **metadata_columns.values(row["coin_metadata"])
+        )
+        for row in rows
+    ]
+    db.add_all(db_cryptos)
+    db.flush()
+    ids = [db_crypto.id for db_crypto in db_cryptos]
+    symbols = [db_crypto.symbol for db_crypto in db_cryptos]
+    db.commit()
+    response_cache.invalidate(symbols)
+    return db.query(models.Cryptocurrency).filter(models.Cryptocurrency.id.in_(ids)).order_by(
+        models.Cryptocurrency.id).all()
+
+
 def update_crypto(db: Session, db_obj: models.Cryptocurrency,
                   crypto_in: crypto_schemas.CryptoUpdate) -> models.Cryptocurrency:
     """Updates the note for an existing cryptocurrency record."""
@@ -52,22 +207,92 @@ def update_crypto(db: Session, db_obj: models.Cryptocurrency,
     db.add(db_obj)
     db.commit()
     db.refresh(db_obj)
+    response_cache.invalidate([db_obj.symbol])
     return db_obj
 
 
+METADATA_BATCH_SIZE = 5000
+
+
+def _metadata_column_assignments(dialect: str, document: str, table: str) -> str:
+    """SET clauses copying the typed metadata columns out of a partial-metadata JSON document."""
+    return ",\n            ".join(
+        f"{name} = {metadata_columns.extract_sql(dialect, document, name, current=f'{table}.{name}')}"
+        for name in metadata_columns.FIELDS)
+
+
+# Top-level merge of p.value into coin_metadata with the semantics of PostgreSQL's jsonb ||: keys in the update
+# replace stored ones whole (nested objects included) and null values are kept (json_patch would drop them and
+# merge nested objects). json_each yields SQL values, so objects, arrays and booleans are turned back into JSON.
+SQLITE_SHALLOW_MERGE = """
+            SELECT json_group_object(key, CASE type WHEN 'object' THEN json(value) WHEN 'array' THEN json(value)
+                                                    WHEN 'true' THEN json('true') WHEN 'false' THEN json('false')
+                                                    ELSE value END)
+            FROM (SELECT key, value, type FROM json_each(COALESCE(cryptocurrencies.coin_metadata, '{}'))
+                  WHERE key NOT IN (SELECT key FROM json_each(p.value))
+                  UNION ALL
+                  SELECT key, value, type FROM json_each(p.value))"""
+
+
+# Merge a {coingecko_id: partial_metadata} JSON payload into coin_metadata in one set-based statement,
+# updating the typed metadata columns of the keys present in the same pass.
+METADATA_MERGE_SQL = {
+    "postgresql": text(f"""
+        UPDATE cryptocurrencies AS c
+        SET coin_metadata = (COALESCE(c.coin_metadata::jsonb, '{{}}'::jsonb) || p.value)::json,
+            {_metadata_column_assignments("postgresql", "p.value", "c")},
+            last_updated_coingecko = :now
+        FROM jsonb_each(CAST(:payload AS jsonb)) AS p
+        WHERE c.coingecko_id = p.key
+        RETURNING c.symbol
+    """),
+    "sqlite": text(f"""
+        UPDATE cryptocurrencies
+        SET coin_metadata = ({SQLITE_SHALLOW_MERGE}),
+            {_metadata_column_assignments("sqlite", "p.value", "cryptocurrencies")},
+            last_updated_coingecko = :now
+        FROM json_each(:payload) AS p
+        WHERE cryptocurrencies.coingecko_id = p.key
+        RETURNING cryptocurrencies.symbol
+    """),
+}
+
+
 def update_crypto_metadata_batch(db: Session, updates: Dict[str, Dict[str, Any]]) -> int:
     """
     Updates coin_metadata for multiple cryptocurrencies based on coingecko_id.
     'updates' dict format: {coingecko_id: {'current_price_usd': ..., 'image': ...}}
-    Returns the number of updated records.
+    New keys are merged into the stored metadata (top-level keys replaced, nulls kept) with one UPDATE per
+    METADATA_BATCH_SIZE coins (JSONB || on PostgreSQL, an equivalent json_each merge on SQLite), which also
+    keeps the typed metadata columns in sync. Returns the number of updated records.
+    Cached API responses of the updated coins are invalidated after the commit.
     """
     if not updates:
         return 0
 
+    statement = METADATA_MERGE_SQL.get(db.get_bind().dialect.name)
+    if statement is None:
+        return _update_crypto_metadata_batch_orm(db, updates)
+
+    statement = statement.bindparams(bindparam("now", type_=DateTime(timezone=True)))
+    now = datetime.now()
+    items = list(updates.items())
+    updated_symbols: List[str] = []
+    for start in range(0, len(items), METADATA_BATCH_SIZE):
+        payload = json.dumps(dict(items[start:start + METADATA_BATCH_SIZE]))
+        updated_symbols.extend(db.execute(statement, {"payload": payload, "now": now}).scalars())
+
+    db.commit()
+    response_cache.invalidate(updated_symbols)
+    return len(updated_symbols)
+
+
+def _update_crypto_metadata_batch_orm(db: Session, updates: Dict[str, Dict[str, Any]]) -> int:
+    """Row-by-row fallback for dialects without a set-based JSON merge."""
     coingecko_ids = list(updates.keys())
     db_cryptos = db.query(models.Cryptocurrency).filter(models.Cryptocurrency.coingecko_id.in_(coingecko_ids)).all()
 
-    updated_count = 0
+    updated_symbols: List[str] = []
     for db_crypto in db_cryptos:
         if db_crypto.coingecko_id in updates:
             new_metadata = updates[db_crypto.coingecko_id]
@@ -76,19 +301,103 @@ def update_crypto_metadata_batch(db: Session, updates: Dict[str, Dict[str, Any]]
 
             db_crypto.coin_metadata = current_metadata
             flag_modified(db_crypto, "coin_metadata")
+            for name, value in metadata_columns.values(new_metadata, partial=True).items():
+                setattr(db_crypto, name, value)
             db_crypto.last_updated_coingecko = datetime.now()
             db.add(db_crypto)
-            updated_count += 1
+            updated_symbols.append(db_crypto.symbol)
+
+    if updated_symbols:
+        db.commit()
+        response_cache.invalidate(updated_symbols)
+    return len(updated_symbols)
+
 
-    if updated_count > 0:
+def insert_price_history(db: Session, prices_usd: Dict[str, float], recorded_at: Optional[datetime] = None) -> int:
+    """
+    Appends one price_history row per tracked coingecko_id in 'prices_usd' ({coingecko_id: price}).
+    Returns the number of rows written.
+    """
+    if not prices_usd:
+        return 0
+    recorded_at = recorded_at or datetime.now(timezone.utc)
+    id_rows = db.query(models.Cryptocurrency.coingecko_id, models.Cryptocurrency.id).filter(
+        models.Cryptocurrency.coingecko_id.in_(list(prices_usd.keys()))).all()
+    rows = [
+        {"cryptocurrency_id": crypto_id, "price_usd": prices_usd[coingecko_id], "recorded_at": recorded_at}
+        for coingecko_id, crypto_id in id_rows
+    ]
+    if rows:
+        db.execute(insert(models.PriceHistory), rows)
         db.commit()
-    return updated_count
+    return len(rows)
+
+
+def get_price_volatility(db: Session, since: datetime) -> Dict[str, float]:
+    """
+    Gets {coingecko_id: (max - min) / min} of the USD price recorded since 'since', for every coin with
+    at least one price_history row in that window.
+    """
+    history = models.PriceHistory
+    rows = db.query(models.Cryptocurrency.coingecko_id, func.min(history.price_usd), func.max(history.price_usd)).join(
+        history, history.cryptocurrency_id == models.Cryptocurrency.id).filter(
+        history.recorded_at >= since).group_by(models.Cryptocurrency.coingecko_id).all()
+    return {coingecko_id: (high - low) / low for coingecko_id, low, high in rows if low}
+
+
+def _epoch_bucket(db: Session, column, interval_seconds: int):
+    """SQL expression flooring a timestamp column to the start of its interval bucket, in epoch seconds."""
+    if db.get_bind().dialect.name == "sqlite":
+        return (cast(func.strftime("%s", column), Integer) // interval_seconds) * interval_seconds
+    return func.floor(cast(extract("epoch", column), Float) / interval_seconds) * interval_seconds
+
+
+def get_price_history_ohlc(db: Session, cryptocurrency_id: int, interval_seconds: int, start: datetime,
+                           end: datetime) -> List[Dict[str, Any]]:
+    """
+    Downsamples price_history for one coin into OHLC buckets of interval_seconds within [start, end).
+    Aggregation runs in the database (window functions for open/close), so only one row per bucket is returned.
+    """
+    history = models.PriceHistory
+    bucket = _epoch_bucket(db, history.recorded_at, interval_seconds)
+    ticks = select(
+        bucket.label("bucket"),
+        history.price_usd.label("price"),
+        func.first_value(history.price_usd).over(partition_by=bucket, order_by=history.recorded_at.asc()).label("open"),
+        func.first_value(history.price_usd).over(partition_by=bucket, order_by=history.recorded_at.desc()).label("close"),
+    ).where(
+        history.cryptocurrency_id == cryptocurrency_id,
+        history.recorded_at >= start,
+        history.recorded_at < end,
+    ).subquery()
+
+    candles = select(
+        ticks.c.bucket,
+        func.max(ticks.c.open).label("open"),
+        func.max(ticks.c.price).label("high"),
+        func.min(ticks.c.price).label("low"),
+        func.max(ticks.c.close).label("close"),
+        func.count().label("samples"),
+    ).group_by(ticks.c.bucket).order_by(ticks.c.bucket)
+
+    return [
+        {
+            "bucket_start": datetime.fromtimestamp(int(row.bucket), tz=timezone.utc),
+            "open": row.open,
+            "high": row.high,
+            "low": row.low,
+            "close": row.close,
+            "samples": row.samples,
+        }
+        for row in db.execute(candles)
+    ]
 
 
 def delete_crypto(db: Session, symbol: str) -> Optional[models.Cryptocurrency]:
-    """Deletes a cryptocurrency record by its ID."""
-    db_obj = db.query(models.Cryptocurrency).filter(models.Cryptocurrency.symbol == symbol).first()
+    """Deletes a cryptocurrency record by its symbol."""
+    db_obj = db.query(models.Cryptocurrency).filter(models.Cryptocurrency.symbol == symbol.upper()).first()
     if db_obj:
         db.delete(db_obj)
         db.commit()
+        response_cache.invalidate([db_obj.symbol])
     return db_obj
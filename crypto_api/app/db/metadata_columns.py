@@ -0,0 +1,45 @@
+from typing import Any, Dict, Optional
+
+# Typed, indexed copies of numeric coin_metadata keys: {column: metadata key}. coin_metadata stays the
+# source of truth; the columns exist so lists can be sorted and range-filtered by index scans.
+FIELDS: Dict[str, str] = {
+    "price_usd": "current_price_usd",
+    "market_cap_usd": "market_cap_usd",
+    "market_cap_rank": "market_cap_rank",
+}
+INTEGER_FIELDS = {"market_cap_rank"}
+
+
+def values(metadata: Optional[Dict[str, Any]], partial: bool = False) -> Dict[str, Any]:
+    """
+    Column values for a metadata dict; non-numeric values become None. With partial=True only columns
+    whose key is present are returned, for merging a metadata update into a stored row.
+    """
+    metadata = metadata or {}
+    result = {}
+    for column, key in FIELDS.items():
+        if partial and key not in metadata:
+            continue
+        value = metadata.get(key)
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            result[column] = None
+        else:
+            result[column] = int(value) if column in INTEGER_FIELDS else float(value)
+    return result
+
+
+def extract_sql(dialect: str, document: str, column: str, current: str = "NULL") -> str:
+    """
+    SQL expression reading `column`'s metadata key from the JSON `document` expression (jsonb on PostgreSQL).
+    A missing key yields `current`, a non-numeric value NULL.
+    """
+    key = FIELDS[column]
+    if dialect == "postgresql":
+        sql_type = "integer" if column in INTEGER_FIELDS else "double precision"
+        return (f"CASE WHEN {document} -> '{key}' IS NULL THEN {current} "
+                f"WHEN jsonb_typeof({document} -> '{key}') = 'number' "
+                f"THEN CAST(CAST({document} ->> '{key}' AS numeric) AS {sql_type}) END")
+    sql_type = "INTEGER" if column in INTEGER_FIELDS else "REAL"
+    return (f"CASE WHEN json_type({document}, '$.{key}') IS NULL THEN {current} "
+            f"WHEN json_type({document}, '$.{key}') IN ('integer', 'real') "
+            f"THEN CAST(json_extract({document}, '$.{key}') AS {sql_type}) END")
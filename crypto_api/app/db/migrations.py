@@ -0,0 +1,82 @@
+import logging
+from typing import Callable, List, Tuple
+
+from sqlalchemy import text, inspect, bindparam
+from sqlalchemy.engine import Connection, Engine
+
+from app.db import metadata_columns, models
+
+logger = logging.getLogger(__name__)
+
+# Serializes migrations across API/worker processes starting at the same time (PostgreSQL only).
+MIGRATION_LOCK_ID = 4815162342
+
+
+def normalize_symbols(connection: Connection) -> bool:
+    """
+    Upper-cases stored symbols and adds the upper-case CHECK constraint to tables created before it existed.
+    Symbols that only differ by case are left for manual merging and the migration is retried on next start.
+    """
+    collisions = connection.execute(text(
+        "SELECT UPPER(symbol) FROM cryptocurrencies GROUP BY UPPER(symbol) HAVING COUNT(*) > 1"
+    )).scalars().all()
+
+    update = "UPDATE cryptocurrencies SET symbol = UPPER(symbol) WHERE symbol <> UPPER(symbol)"
+    if collisions:
+        logger.error(f"Symbols differing only by case must be merged manually, left untouched: {collisions}")
+        connection.execute(
+            text(update + " AND UPPER(symbol) NOT IN :collisions").bindparams(bindparam("collisions", expanding=True)),
+            {"collisions": collisions},
+        )
+        return False
+    connection.execute(text(update))
+
+    if connection.dialect.name == "postgresql":
+        constraints = {c["name"] for c in inspect(connection).get_check_constraints("cryptocurrencies")}
+        if "ck_cryptocurrencies_symbol_upper" not in constraints:
+            connection.execute(text(
+                "ALTER TABLE cryptocurrencies "
+                "ADD CONSTRAINT ck_cryptocurrencies_symbol_upper CHECK (symbol = upper(symbol))"
+            ))
+    return True
+
+
+def add_metadata_columns(connection: Connection) -> bool:
+    """Adds the typed metadata columns and their indexes to existing tables and backfills them from coin_metadata."""
+    table = models.Cryptocurrency.__table__
+    existing = {column["name"] for column in inspect(connection).get_columns(table.name)}
+    for name in metadata_columns.FIELDS:
+        if name not in existing:
+            column_type = table.c[name].type.compile(dialect=connection.dialect)
+            connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {name} {column_type}"))
+    for index in table.indexes:
+        if set(index.columns.keys()) & set(metadata_columns.FIELDS):
+            index.create(connection, checkfirst=True)
+
+    dialect = connection.dialect.name
+    document = "coin_metadata::jsonb" if dialect == "postgresql" else "coin_metadata"
+    assignments = ", ".join(f"{name} = {metadata_columns.extract_sql(dialect, document, name)}"
+                            for name in metadata_columns.FIELDS)
+    connection.execute(text(f"UPDATE {table.name} SET {assignments} WHERE coin_metadata IS NOT NULL"))
+    return True
+
+
+# Ordered, append-only. Each step returns True once it is complete and is then never run again.
+MIGRATIONS: List[Tuple[str, Callable[[Connection], bool]]] = [
+    ("0001_normalize_symbols", normalize_symbols),
+    ("0002_add_metadata_columns", add_metadata_columns),
+]
+
+
+def run_migrations(engine: Engine) -> None:
+    """Applies pending data/schema migrations for tables that create_all() cannot alter."""
+    with engine.begin() as connection:
+        if connection.dialect.name == "postgresql":
+            connection.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": MIGRATION_LOCK_ID})
+        applied = set(connection.execute(text("SELECT name FROM schema_migrations")).scalars())
+        for name, migration in MIGRATIONS:
+            if name in applied:
+                continue
+            logger.info(f"Applying migration {name}...")
+            if migration(connection):
+                connection.execute(models.SchemaMigration.__table__.insert().values(name=name))
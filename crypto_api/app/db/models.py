@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, JSON
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, JSON, Float, ForeignKey, Index, CheckConstraint
 from sqlalchemy.sql import func
 
 from .base import Base
@@ -14,3 +14,36 @@ class Cryptocurrency(Base):
     last_updated_coingecko = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     coin_metadata = Column(JSON, nullable=True)
     note = Column(String, nullable=True)
+    # Typed copies of coin_metadata keys (see metadata_columns.FIELDS), kept in sync on every metadata write.
+    price_usd = Column(Float, nullable=True)
+    market_cap_usd = Column(Float, nullable=True)
+    market_cap_rank = Column(Integer, nullable=True)
+
+    __table_args__ = (
+        # Symbols are stored upper-cased so case-insensitive lookups are plain equality on the unique index.
+        CheckConstraint("symbol = upper(symbol)", name="ck_cryptocurrencies_symbol_upper"),
+        # (value, id) so sorted list pages are keyset index range scans in either direction.
+        Index("ix_cryptocurrencies_price_usd_id", "price_usd", "id"),
+        Index("ix_cryptocurrencies_market_cap_usd_id", "market_cap_usd", "id"),
+        Index("ix_cryptocurrencies_market_cap_rank_id", "market_cap_rank", "id"),
+    )
+
+
+class PriceHistory(Base):
+    __tablename__ = "price_history"
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    cryptocurrency_id = Column(Integer, ForeignKey("cryptocurrencies.id", ondelete="CASCADE"), nullable=False)
+    price_usd = Column(Float, nullable=False)
+    recorded_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_price_history_coin_recorded_at", "cryptocurrency_id", "recorded_at"),
+    )
+
+
+class SchemaMigration(Base):
+    __tablename__ = "schema_migrations"
+
+    name = Column(String, primary_key=True)
+    applied_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,33 +1,63 @@
+import asyncio
 import logging
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
+from app.core import metrics
 from app.core.config import settings
+from app.core.startup import startup_state
 from app.api.routers import crypto as crypto_router
-from app.db.base import Base, engine, SessionLocal
+from app.api.routers import monitoring as monitoring_router
+from app.api.routers import health as health_router
+from app.db.base import Base, engine, SessionLocal, dispose_async_engine
+from app.db.migrations import run_migrations
 from app.services.seed_provider import seed_db
+from app.services import coingecko
+from app.services.refresh_scheduler import read_buffer
+from app.services.symbol_index import symbol_index
+from app.services.price_stream import price_hub
 
 logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(name)s: %(message)s')
 logger = logging.getLogger(__name__)
 
 
-def create_db_and_tables():
+def create_db_and_tables() -> bool:
     try:
         Base.metadata.create_all(bind=engine)
         logger.info("Database tables created or already exist.")
+        run_migrations(engine)
+        return True
     except Exception as e:
         logger.error(f"Error creating database tables: {e}", exc_info=True)
+        return False
+
+
+def prepare_database() -> None:
+    """Creates/migrates the schema and seeds an empty database; runs off the event loop after startup."""
+    startup_state.schema_ready = create_db_and_tables()
+    startup_state.seed_status = seed_db() if startup_state.schema_ready else "failed"
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Application startup...")
-    create_db_and_tables()
-    seed_db()
+    # Requests are accepted right away; /health/ready reports 503 until the schema is prepared.
+    preparation = asyncio.create_task(asyncio.to_thread(prepare_database))
+    await symbol_index.start()
+    await coingecko.open_async_client()
+    await read_buffer.start()
+    if settings.PRICE_STREAM_ENABLED:
+        await price_hub.start()
 
     yield
 
     logger.info("Application shutdown...")
+    await price_hub.stop()
+    await symbol_index.stop()
+    await read_buffer.stop()
+    await coingecko.close_async_client()
+    await preparation
+    await dispose_async_engine()
 
 
 app = FastAPI(
@@ -43,8 +73,17 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(metrics.MetricsMiddleware)
 
 app.include_router(crypto_router.router, prefix=settings.API_V1_STR + "/cryptocurrencies", tags=["cryptocurrencies"])
+app.include_router(monitoring_router.router, prefix=settings.API_V1_STR + "/monitoring", tags=["monitoring"])
+app.include_router(health_router.router, prefix="/health", tags=["health"])
+
+
+@app.get("/metrics", include_in_schema=False)
+def read_metrics():
+    content, content_type = metrics.render_metrics()
+    return Response(content=content, media_type=content_type)
 
 
 @app.get("/", tags=["Root"])
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Literal
 from datetime import datetime
 
 
@@ -25,3 +25,51 @@ class Crypto(CryptoBase):
 
     class Config:
         from_attributes = True
+
+
+class CryptoPrice(Crypto):
+    """Crypto with the price in the quote currency requested through `?currency=`."""
+    currency: str
+    price: Optional[float] = None
+
+
+class CryptoBulkCreate(BaseModel):
+    items: List[CryptoCreate] = Field(..., min_length=1, max_length=1000)
+
+
+class CryptoBulkItemResult(BaseModel):
+    symbol: str
+    status: Literal["created", "exists", "not_found", "duplicate"]
+    coingecko_id: Optional[str] = None
+    detail: Optional[str] = None
+    crypto: Optional[Crypto] = None
+
+
+class CryptoBulkCreateResult(BaseModel):
+    created: int
+    results: List[CryptoBulkItemResult]
+
+
+class PriceCandle(BaseModel):
+    bucket_start: datetime
+    open: float
+    high: float
+    low: float
+    close: float
+    samples: int
+
+
+class PriceHistory(BaseModel):
+    symbol: str
+    interval: str
+    candles: List[PriceCandle]
+
+
+class SnapshotQuote(BaseModel):
+    symbol: str
+    prices: Dict[str, float]
+    updated_at: Optional[datetime] = None
+    # None when the coin is not in the snapshot yet and its quotes were read from the database.
+    snapshot_generated_at: Optional[datetime] = None
+    currency: Optional[str] = None
+    price: Optional[float] = None
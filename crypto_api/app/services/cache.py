@@ -0,0 +1,237 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Callable, List, Optional, Sequence, Tuple
+
+import redis
+import redis.asyncio
+
+logger = logging.getLogger(__name__)
+
+MISSING = object()
+
+
+class MemoryBackend:
+    """Thread-safe in-process LRU store with per-entry expiry."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.evictions = 0
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISSING
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def set_many(self, items: Dict[str, Tuple[Any, float]]) -> None:
+        for key, (value, ttl) in items.items():
+            self.set(key, value, ttl)
+
+    # Async variants share the interface with RedisBackend; an in-process lookup never blocks the loop.
+    async def get_many_async(self, keys: Sequence[str]) -> List[Any]:
+        return [self.get(key) for key in keys]
+
+    async def set_async(self, key: str, value: Any, ttl: float) -> None:
+        self.set(key, value, ttl)
+
+    async def set_many_async(self, items: Dict[str, Tuple[Any, float]]) -> None:
+        self.set_many(items)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisBackend:
+    """
+    Redis store shared by the API and worker processes; expiry via SETEX, eviction via Redis maxmemory policy.
+    The *_async methods use the async client, so async callers never block the event loop on Redis.
+    """
+
+    def __init__(self, client_factory: Callable[[], redis.Redis], prefix: str,
+                 async_client_factory: Optional[Callable[[], redis.asyncio.Redis]] = None):
+        self._client_factory = client_factory
+        self._async_client_factory = async_client_factory
+        self.prefix = prefix
+
+    @staticmethod
+    def _decode(raw: Optional[bytes]) -> Any:
+        return MISSING if raw is None else json.loads(raw)["v"]
+
+    @staticmethod
+    def _encode(value: Any) -> str:
+        return json.dumps({"v": value})
+
+    def get(self, key: str) -> Any:
+        try:
+            raw = self._client_factory().get(self.prefix + key)
+        except redis.RedisError as e:
+            logger.warning(f"Redis cache get failed for {key}: {e}")
+            return MISSING
+        return self._decode(raw)
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        try:
+            self._client_factory().setex(self.prefix + key, max(int(ttl), 1), self._encode(value))
+        except redis.RedisError as e:
+            logger.warning(f"Redis cache set failed for {key}: {e}")
+
+    def set_many(self, items: Dict[str, Tuple[Any, float]]) -> None:
+        """Stores {key: (value, ttl)} in one pipelined round trip."""
+        try:
+            pipe = self._client_factory().pipeline(transaction=False)
+            for key, (value, ttl) in items.items():
+                pipe.setex(self.prefix + key, max(int(ttl), 1), self._encode(value))
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Redis cache set failed for {len(items)} keys: {e}")
+
+    async def get_many_async(self, keys: Sequence[str]) -> List[Any]:
+        """Values (or MISSING) of many keys in one MGET."""
+        if not keys:
+            return []
+        try:
+            raws = await self._async_client_factory().mget([self.prefix + key for key in keys])
+        except redis.RedisError as e:
+            logger.warning(f"Redis cache get failed for {len(keys)} keys: {e}")
+            return [MISSING] * len(keys)
+        return [self._decode(raw) for raw in raws]
+
+    async def set_async(self, key: str, value: Any, ttl: float) -> None:
+        try:
+            await self._async_client_factory().setex(self.prefix + key, max(int(ttl), 1), self._encode(value))
+        except redis.RedisError as e:
+            logger.warning(f"Redis cache set failed for {key}: {e}")
+
+    async def set_many_async(self, items: Dict[str, Tuple[Any, float]]) -> None:
+        try:
+            pipe = self._async_client_factory().pipeline(transaction=False)
+            for key, (value, ttl) in items.items():
+                pipe.setex(self.prefix + key, max(int(ttl), 1), self._encode(value))
+            await pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Redis cache set failed for {len(items)} keys: {e}")
+
+
+class ResponseCache:
+    """
+    Per-endpoint TTL cache for upstream responses. A stored None is a negative result and
+    lives for negative_ttl instead of the endpoint TTL. Hit/miss counters are kept per endpoint.
+    Entries are kept stale_ttl past their TTL so callers can fall back to last-known data with
+    get(..., allow_stale=True) while upstream is unavailable.
+    """
+
+    def __init__(self, backend, ttls: Dict[str, float], negative_ttl: float, stale_ttl: float = 0.0):
+        self.backend = backend
+        self.ttls = ttls
+        self.negative_ttl = negative_ttl
+        self.stale_ttl = stale_ttl
+        self._counters: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def _count(self, endpoint: str, counter: str) -> None:
+        with self._lock:
+            counters = self._counters.setdefault(endpoint,
+                                                 {"hits": 0, "negative_hits": 0, "stale_hits": 0, "misses": 0})
+            counters[counter] += 1
+
+    def _ttl(self, endpoint: str, value: Any) -> float:
+        return self.negative_ttl if value is None else self.ttls[endpoint]
+
+    def _read(self, endpoint: str, entry: Any, allow_stale: bool) -> Tuple[Any, float]:
+        if entry is MISSING or not isinstance(entry, dict) or "at" not in entry:
+            self._count(endpoint, "misses")
+            return MISSING, 0.0
+        value, age = entry["v"], max(time.time() - entry["at"], 0.0)
+        if age >= self._ttl(endpoint, value):
+            if not allow_stale:
+                self._count(endpoint, "misses")
+                return MISSING, age
+            self._count(endpoint, "stale_hits")
+        elif value is None:
+            self._count(endpoint, "negative_hits")
+        else:
+            self._count(endpoint, "hits")
+        return value, age
+
+    def _entries(self, endpoint: str, values: Dict[str, Any]) -> Dict[str, Tuple[Dict[str, Any], float]]:
+        now = time.time()
+        return {f"{endpoint}:{key}": ({"at": now, "v": value}, self._ttl(endpoint, value) + self.stale_ttl)
+                for key, value in values.items()}
+
+    def get_with_age(self, endpoint: str, key: str, allow_stale: bool = False) -> Tuple[Any, float]:
+        """
+        Returns (cached value or MISSING, age in seconds). Entries past their TTL are returned only with
+        allow_stale, counted as stale hits.
+        """
+        return self._read(endpoint, self.backend.get(f"{endpoint}:{key}"), allow_stale)
+
+    def get(self, endpoint: str, key: str, allow_stale: bool = False) -> Any:
+        """Returns the cached value (None for a negative entry) or MISSING."""
+        return self.get_with_age(endpoint, key, allow_stale)[0]
+
+    def set(self, endpoint: str, key: str, value: Any) -> None:
+        ((entry_key, (entry, ttl)),) = self._entries(endpoint, {key: value}).items()
+        self.backend.set(entry_key, entry, ttl)
+
+    def set_many(self, endpoint: str, values: Dict[str, Any]) -> None:
+        if values:
+            self.backend.set_many(self._entries(endpoint, values))
+
+    async def get_many_with_age_async(self, endpoint: str, keys: Sequence[str],
+                                      allow_stale: bool = False) -> Dict[str, Tuple[Any, float]]:
+        """get_with_age for many keys in one backend round trip, without blocking the event loop."""
+        entries = await self.backend.get_many_async([f"{endpoint}:{key}" for key in keys])
+        return {key: self._read(endpoint, entry, allow_stale) for key, entry in zip(keys, entries)}
+
+    async def get_async(self, endpoint: str, key: str, allow_stale: bool = False) -> Any:
+        return (await self.get_many_with_age_async(endpoint, [key], allow_stale))[key][0]
+
+    async def set_async(self, endpoint: str, key: str, value: Any) -> None:
+        ((entry_key, (entry, ttl)),) = self._entries(endpoint, {key: value}).items()
+        await self.backend.set_async(entry_key, entry, ttl)
+
+    async def set_many_async(self, endpoint: str, values: Dict[str, Any]) -> None:
+        if values:
+            await self.backend.set_many_async(self._entries(endpoint, values))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            endpoints = {endpoint: dict(counters) for endpoint, counters in self._counters.items()}
+        stats: Dict[str, Any] = {"backend": type(self.backend).__name__, "endpoints": endpoints}
+        if isinstance(self.backend, MemoryBackend):
+            stats["size"] = len(self.backend)
+            stats["max_size"] = self.backend.max_size
+            stats["evictions"] = self.backend.evictions
+        return stats
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._counters.clear()
+
+
+def build_backend(name: str, max_size: int, client_factory: Callable[[], redis.Redis], prefix: str,
+                  async_client_factory: Optional[Callable[[], redis.asyncio.Redis]] = None):
+    if name == "redis":
+        return RedisBackend(client_factory, prefix, async_client_factory)
+    if name != "memory":
+        logger.warning(f"Unknown cache backend '{name}', using the in-memory backend.")
+    return MemoryBackend(max_size)
@@ -0,0 +1,129 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(httpx.RequestError):
+    """
+    Raised instead of making a call while the breaker is open. It is an httpx.RequestError, so callers
+    that already handle transport failures treat it the same way, without waiting for a timeout.
+    """
+
+
+class CircuitBreaker:
+    """
+    Per-process circuit breaker over the outcomes of the last `window` calls.
+    Opens once at least `min_calls` outcomes are recorded and their failure rate reaches `failure_rate`;
+    calls then fail fast for `open_seconds`. After that, up to `half_open_probes` calls at a time are let
+    through as probes: a successful probe closes the breaker, a failed one opens it again.
+    Thread-safe, so worker threads and the event loop can share one instance.
+    """
+
+    def __init__(self, name: str, window: int, min_calls: int, failure_rate: float, open_seconds: float,
+                 half_open_probes: int = 1, enabled: bool = True):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self.enabled = enabled
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._state = STATE_CLOSED
+        self._opened_at: Optional[float] = None
+        self._probes_in_flight = 0
+        self._rejected = 0
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        """
+        Raises CircuitOpenError if the call may not proceed now. A call let through must end in
+        record_success, record_failure or abandon.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._state == STATE_OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+                self._state = STATE_HALF_OPEN
+                self._probes_in_flight = 0
+                logger.info(f"Circuit {self.name} half-open; probing upstream.")
+            if self._state == STATE_CLOSED:
+                return
+            if self._state == STATE_HALF_OPEN and self._probes_in_flight < self.half_open_probes:
+                self._probes_in_flight += 1
+                return
+            self._rejected += 1
+        raise CircuitOpenError(f"Circuit {self.name} is open; not calling upstream.")
+
+    def record_success(self) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._state == STATE_HALF_OPEN:
+                logger.info(f"Circuit {self.name} closed; upstream recovered.")
+                self._state = STATE_CLOSED
+                self._outcomes.clear()
+                self._probes_in_flight = 0
+            self._outcomes.append(True)
+
+    def record_failure(self) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._state == STATE_HALF_OPEN:
+                self._open()
+                return
+            self._outcomes.append(False)
+            if self._state == STATE_CLOSED and len(self._outcomes) >= self.min_calls \
+                    and self._failure_rate() >= self.failure_rate:
+                self._open()
+
+    def abandon(self) -> None:
+        """For a call that ended without an upstream outcome (e.g. cancelled): frees its probe slot."""
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._state == STATE_HALF_OPEN and self._probes_in_flight:
+                self._probes_in_flight -= 1
+
+    def _failure_rate(self) -> float:
+        return self._outcomes.count(False) / len(self._outcomes) if self._outcomes else 0.0
+
+    def _open(self) -> None:
+        logger.warning(f"Circuit {self.name} opened for {self.open_seconds}s "
+                       f"(failure rate {self._failure_rate():.0%} over {len(self._outcomes)} calls).")
+        self._state = STATE_OPEN
+        self._opened_at = time.monotonic()
+        self._probes_in_flight = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            retry_in = None
+            if self._state == STATE_OPEN:
+                retry_in = max(self.open_seconds - (time.monotonic() - self._opened_at), 0.0)
+            return {
+                "name": self.name,
+                "enabled": self.enabled,
+                "state": self._state,
+                "failure_rate": self._failure_rate(),
+                "window_calls": len(self._outcomes),
+                "rejected_calls": self._rejected,
+                "retry_in_seconds": retry_in,
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._outcomes.clear()
+            self._state = STATE_CLOSED
+            self._opened_at = None
+            self._probes_in_flight = 0
+            self._rejected = 0
@@ -1,95 +1,538 @@
+import asyncio
 import httpx
 import logging
-from typing import Optional, Dict, Any, List, Tuple
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional, Dict, Any, List, Tuple, Union, Sequence, Callable, Awaitable
+from urllib.parse import quote_plus
 
+from app.core import metrics
 from app.core.config import settings
+from app.core.redis_client import get_redis, get_async_redis
+from app.services.cache import ResponseCache, MISSING, build_backend
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.rate_limiter import RedisTokenBucket, PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND
+from app.services.symbol_index import symbol_index
 
 logger = logging.getLogger(__name__)
 
-sync_client = httpx.Client(base_url=settings.COINGECKO_API_BASE_URL, timeout=10.0)
+client_limits = httpx.Limits(
+    max_connections=settings.COINGECKO_MAX_CONNECTIONS,
+    max_keepalive_connections=settings.COINGECKO_MAX_KEEPALIVE_CONNECTIONS,
+    keepalive_expiry=settings.COINGECKO_KEEPALIVE_EXPIRY,
+)
+
+sync_client = httpx.Client(
+    base_url=settings.COINGECKO_API_BASE_URL,
+    timeout=settings.COINGECKO_TIMEOUT,
+    limits=client_limits,
+)
+
+async_client: Optional[httpx.AsyncClient] = None
+
+CACHE_SEARCH = "search"
+CACHE_DETAILS = "details"
+CACHE_MARKETS = "markets"
+
+RETRYABLE_STATUS_CODES = {429, 503}
+
+rate_limiter = RedisTokenBucket(
+    client_factory=get_redis,
+    async_client_factory=get_async_redis,
+    key="coingecko:rate_limit",
+    rate_per_second=settings.COINGECKO_RATE_LIMIT_PER_MINUTE / 60,
+    capacity=settings.COINGECKO_RATE_LIMIT_BURST,
+    interactive_reserve=settings.COINGECKO_RATE_LIMIT_INTERACTIVE_RESERVE,
+)
+
+cache = ResponseCache(
+    backend=build_backend(settings.COINGECKO_CACHE_BACKEND, settings.COINGECKO_CACHE_MAX_SIZE,
+                          get_redis, prefix="coingecko:", async_client_factory=get_async_redis),
+    ttls={CACHE_SEARCH: settings.COINGECKO_CACHE_SEARCH_TTL, CACHE_DETAILS: settings.COINGECKO_CACHE_DETAILS_TTL,
+          CACHE_MARKETS: settings.COINGECKO_CACHE_MARKETS_TTL},
+    negative_ttl=settings.COINGECKO_CACHE_NEGATIVE_TTL,
+    stale_ttl=settings.COINGECKO_CACHE_STALE_TTL,
+)
+
+breaker = CircuitBreaker(
+    "coingecko",
+    window=settings.COINGECKO_BREAKER_WINDOW,
+    min_calls=settings.COINGECKO_BREAKER_MIN_CALLS,
+    failure_rate=settings.COINGECKO_BREAKER_FAILURE_RATE,
+    open_seconds=settings.COINGECKO_BREAKER_OPEN_SECONDS,
+    half_open_probes=settings.COINGECKO_BREAKER_HALF_OPEN_PROBES,
+    enabled=settings.COINGECKO_BREAKER_ENABLED,
+)
+
+ENCODED_ID_SEPARATOR = quote_plus(",")
+
+COIN_DETAILS_PARAMS = {
+    "localization": "false",
+    "tickers": "false",
+    "market_data": "false",
+    "community_data": "false",
+    "developer_data": "false",
+    "sparkline": "false"
+}
+
+
+async def open_async_client() -> httpx.AsyncClient:
+    """Opens the shared AsyncClient (called from the app lifespan)."""
+    global async_client
+    if async_client is None or async_client.is_closed:
+        async_client = httpx.AsyncClient(
+            base_url=settings.COINGECKO_API_BASE_URL,
+            timeout=settings.COINGECKO_TIMEOUT,
+            limits=client_limits,
+        )
+    return async_client
+
+
+async def close_async_client() -> None:
+    """Closes the shared AsyncClient and its connection pool."""
+    global async_client
+    if async_client is not None:
+        await async_client.aclose()
+        async_client = None
+
+
+async def get_async_client() -> httpx.AsyncClient:
+    """Returns the shared AsyncClient, opening it lazily outside of the lifespan (e.g. scripts)."""
+    if async_client is None or async_client.is_closed:
+        return await open_async_client()
+    return async_client
+
+
+def _retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max((parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _backoff_delay(attempt: int, retry_after: Optional[float]) -> float:
+    """Full-jitter exponential backoff, never shorter than the upstream Retry-After."""
+    delay = random.uniform(0, min(settings.COINGECKO_BACKOFF_MAX, settings.COINGECKO_BACKOFF_BASE * 2 ** attempt))
+    return max(delay, retry_after or 0.0)
+
+
+def _record_outcome(status: Union[int, str]) -> None:
+    """Transport errors and 5xx responses count against the breaker; anything else is a success."""
+    if status == "error" or status >= 500:
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+
+
+def _timed_get(path: str, params: Optional[Dict[str, Any]]) -> httpx.Response:
+    breaker.before_call()
+    started = time.perf_counter()
+    try:
+        response = sync_client.get(path, params=params)
+    except httpx.HTTPError:
+        metrics.observe_coingecko_call(path, "error", time.perf_counter() - started)
+        _record_outcome("error")
+        raise
+    except BaseException:
+        breaker.abandon()
+        raise
+    metrics.observe_coingecko_call(path, response.status_code, time.perf_counter() - started)
+    _record_outcome(response.status_code)
+    return response
+
+
+async def _timed_get_async(client: httpx.AsyncClient, path: str, params: Optional[Dict[str, Any]]) -> httpx.Response:
+    breaker.before_call()
+    started = time.perf_counter()
+    try:
+        response = await client.get(path, params=params)
+    except httpx.HTTPError:
+        metrics.observe_coingecko_call(path, "error", time.perf_counter() - started)
+        _record_outcome("error")
+        raise
+    except BaseException:
+        breaker.abandon()
+        raise
+    metrics.observe_coingecko_call(path, response.status_code, time.perf_counter() - started)
+    _record_outcome(response.status_code)
+    return response
+
+
+def _retry_delay(path: str, status_code: int, attempt: int, retry_after: Optional[float],
+                 deadline: float) -> Optional[float]:
+    """Seconds to wait before retrying a 429/503, or None when that wait would pass the call's deadline."""
+    delay = _backoff_delay(attempt, retry_after)
+    if time.monotonic() + delay > deadline:
+        logger.warning(f"CoinGecko returned {status_code} for {path}; not retrying, the next attempt "
+                       f"({delay:.2f}s away) would exceed the caller's maximum wait.")
+        return None
+    return delay
+
+
+def _get(path: str, params: Optional[Dict[str, Any]] = None,
+         priority: str = PRIORITY_BACKGROUND) -> httpx.Response:
+    """
+    Rate-limited GET on sync_client. Sync callers (Celery tasks, seeding) default to background priority.
+    429/503 responses are retried with jittered exponential backoff honoring Retry-After; the last
+    response is returned for the caller to inspect. Waiting for tokens and between retries shares one
+    deadline of _max_wait(priority) per call, so only background callers sit out long Retry-After values.
+    Every attempt goes through the circuit breaker, which raises CircuitOpenError without calling
+    upstream while it is open.
+    """
+    deadline = time.monotonic() + _max_wait(priority)
+    for attempt in range(settings.COINGECKO_MAX_RETRIES + 1):
+        if settings.COINGECKO_RATE_LIMIT_ENABLED:
+            rate_limiter.acquire(priority, max(deadline - time.monotonic(), 0.0))
+        response = _timed_get(path, params)
+        if response.status_code not in RETRYABLE_STATUS_CODES or attempt == settings.COINGECKO_MAX_RETRIES:
+            return response
+        retry_after = _retry_after_seconds(response)
+        if retry_after is not None and settings.COINGECKO_RATE_LIMIT_ENABLED:
+            rate_limiter.penalize(retry_after)
+        delay = _retry_delay(path, response.status_code, attempt, retry_after, deadline)
+        if delay is None:
+            return response
+        logger.warning(f"CoinGecko returned {response.status_code} for {path}; retrying in {delay:.2f}s")
+        time.sleep(delay)
+    return response
+
+
+async def _get_async(path: str, params: Optional[Dict[str, Any]] = None,
+                     priority: str = PRIORITY_INTERACTIVE) -> httpx.Response:
+    """Async _get on the shared AsyncClient. Async callers serve API requests, so they default to interactive."""
+    client = await get_async_client()
+    deadline = time.monotonic() + _max_wait(priority)
+    for attempt in range(settings.COINGECKO_MAX_RETRIES + 1):
+        if settings.COINGECKO_RATE_LIMIT_ENABLED:
+            await rate_limiter.acquire_async(priority, max(deadline - time.monotonic(), 0.0))
+        response = await _timed_get_async(client, path, params)
+        if response.status_code not in RETRYABLE_STATUS_CODES or attempt == settings.COINGECKO_MAX_RETRIES:
+            return response
+        retry_after = _retry_after_seconds(response)
+        if retry_after is not None and settings.COINGECKO_RATE_LIMIT_ENABLED:
+            await rate_limiter.penalize_async(retry_after)
+        delay = _retry_delay(path, response.status_code, attempt, retry_after, deadline)
+        if delay is None:
+            return response
+        logger.warning(f"CoinGecko returned {response.status_code} for {path}; retrying in {delay:.2f}s")
+        await asyncio.sleep(delay)
+    return response
+
+
+def _max_wait(priority: str) -> float:
+    if priority == PRIORITY_INTERACTIVE:
+        return settings.COINGECKO_RATE_LIMIT_MAX_WAIT_INTERACTIVE
+    return settings.COINGECKO_RATE_LIMIT_MAX_WAIT_BACKGROUND
+
+
+def _match_search_result(data: Dict[str, Any], symbol: str) -> Optional[Tuple[str, str]]:
+    """Picks the first coin from a /search response whose symbol matches exactly."""
+    if data and "coins" in data and data["coins"]:
+        for coin in data["coins"]:
+            if coin.get("symbol", "").lower() == symbol.lower():
+                coingecko_id = coin.get("api_symbol", coin.get("id"))
+                if coingecko_id and coin.get("name"):
+                    return coingecko_id, coin["name"]
+    return None
+
+
+def _lookup_symbol_index(symbol: str) -> Tuple[bool, Optional[Tuple[str, str]]]:
+    """
+    Resolves a symbol from the local index. Returns (resolved, result): when resolved is True the
+    result is authoritative and no /search call is needed.
+    """
+    result = symbol_index.lookup(symbol)
+    if result is not None:
+        return True, result
+    if symbol_index.is_loaded and not settings.SYMBOL_INDEX_FALLBACK_SEARCH:
+        return True, None
+    return False, None
+
+
+def _search(symbol: str) -> Optional[Tuple[str, str]]:
+    response = _get("/search", params={"query": symbol})
+    response.raise_for_status()
+    return _match_search_result(response.json(), symbol)
+
+
+async def _search_async(symbol: str) -> Optional[Tuple[str, str]]:
+    response = await _get_async("/search", params={"query": symbol})
+    response.raise_for_status()
+    return _match_search_result(response.json(), symbol)
+
+
+def _search_result(cached: Any) -> Any:
+    if cached is MISSING or cached is None:
+        return cached
+    return tuple(cached)
+
+
+def _cached_search(symbol: str, allow_stale: bool = False) -> Any:
+    return _search_result(cache.get(CACHE_SEARCH, symbol.lower(), allow_stale=allow_stale))
+
+
+async def _cached_search_async(symbol: str, allow_stale: bool = False) -> Any:
+    return _search_result(await cache.get_async(CACHE_SEARCH, symbol.lower(), allow_stale=allow_stale))
+
+
+def _stale_search(symbol: str) -> Optional[Tuple[str, str]]:
+    """Last-known result for a symbol whose /search call failed (coin ids do not change), else None."""
+    cached = _cached_search(symbol, allow_stale=True)
+    return None if cached is MISSING else cached
+
+
+async def _stale_search_async(symbol: str) -> Optional[Tuple[str, str]]:
+    cached = await _cached_search_async(symbol, allow_stale=True)
+    return None if cached is MISSING else cached
 
 
 def search_coin(symbol: str) -> Optional[Tuple[str, str]]:
     """
-    Searches for a coin on CoinGecko using the /search endpoint (synchronous).
+    Searches for a coin on CoinGecko (synchronous): the local symbol index answers without a network
+    call once loaded; the /search endpoint (cached, including misses) is used only while no index is available.
+    If the call fails (or the circuit breaker is open) an expired cached result is used when there is one.
     Returns a tuple (coingecko_id, name) if found and matches the symbol closely, otherwise None.
     """
+    symbol_index.reload_if_changed()
+    resolved, result = _lookup_symbol_index(symbol)
+    if resolved:
+        return result
+    cached = _cached_search(symbol)
+    if cached is not MISSING:
+        return cached
     try:
-        response = sync_client.get("/search", params={"query": symbol})
-        response.raise_for_status()
-        data = response.json()
+        result = _search(symbol)
+        cache.set(CACHE_SEARCH, symbol.lower(), list(result) if result else None)
+        return result
+    except httpx.HTTPStatusError as e:
+        logger.error(f"HTTP error searching for coin {symbol}: {e.response.status_code} - {e.response.text}")
+    except httpx.RequestError as e:
+        logger.error(f"Request error searching for coin {symbol}: {e}")
+    except Exception as e:
+        logger.exception(f"Unexpected error searching for coin {symbol}: {e}")
+    return _stale_search(symbol)
 
-        if data and "coins" in data and data["coins"]:
-            for coin in data["coins"]:
-                if coin.get("symbol", "").lower() == symbol.lower():
-                    coingecko_id = coin.get("api_symbol", coin.get("id"))
-                    if coingecko_id and coin.get("name"):
-                        return coingecko_id, coin["name"]
 
+async def search_coin_async(symbol: str) -> Optional[Tuple[str, str]]:
+    """
+    Searches for a coin on CoinGecko (asynchronous).
+    Same contract as search_coin; the cache is read and written with the backend's async methods, and
+    the symbol index is only read (the API's lifespan task keeps it current off the event loop).
+    """
+    resolved, result = _lookup_symbol_index(symbol)
+    if resolved:
+        return result
+    cached = await _cached_search_async(symbol)
+    if cached is not MISSING:
+        return cached
+    try:
+        result = await _search_async(symbol)
+        await cache.set_async(CACHE_SEARCH, symbol.lower(), list(result) if result else None)
+        return result
     except httpx.HTTPStatusError as e:
         logger.error(f"HTTP error searching for coin {symbol}: {e.response.status_code} - {e.response.text}")
     except httpx.RequestError as e:
         logger.error(f"Request error searching for coin {symbol}: {e}")
     except Exception as e:
         logger.exception(f"Unexpected error searching for coin {symbol}: {e}")
-    return None
+    return await _stale_search_async(symbol)
+
+
+async def search_coins_async(symbols: List[str],
+                             max_concurrency: Optional[int] = None) -> Dict[str, Optional[Tuple[str, str]]]:
+    """
+    Resolves many symbols at once (asynchronous). Index hits cost nothing; any /search fallbacks run
+    concurrently with at most max_concurrency requests in flight.
+    Returns a dictionary mapping each symbol to (coingecko_id, name) or None.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency or settings.COINGECKO_PRICE_CONCURRENCY)
+
+    async def resolve(symbol: str) -> Optional[Tuple[str, str]]:
+        async with semaphore:
+            return await search_coin_async(symbol)
+
+    results = await asyncio.gather(*(resolve(symbol) for symbol in symbols))
+    return dict(zip(symbols, results))
+
+
+def _parse_coin_details(response: httpx.Response) -> Optional[Dict[str, Any]]:
+    """Returns None for an unknown id (404, cached as a negative result); raises on other errors."""
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    data = response.json()
+    return {
+        "image": data.get("image", {}).get("large")
+    }
 
 
 def get_coin_details(coingecko_id: str) -> Optional[Dict[str, Any]]:
     """
-    Fetches detailed information for a coin using its coingecko_id (/coins/{id}) (synchronous).
-    Returns a dictionary with details (like image URL) or None if error.
+    Fetches detailed information for a coin using its coingecko_id (/coins/{id}) (synchronous, cached).
+    Returns a dictionary with details (like image URL), the last-known details if the call fails,
+    or None if there are none.
     """
     if not coingecko_id:
         return None
+    cached = cache.get(CACHE_DETAILS, coingecko_id)
+    if cached is not MISSING:
+        return cached
     try:
+        response = _get(f"/coins/{coingecko_id}", params=COIN_DETAILS_PARAMS)
+        details = _parse_coin_details(response)
+        cache.set(CACHE_DETAILS, coingecko_id, details)
+        return details
+    except httpx.HTTPStatusError as e:
+        logger.error(f"HTTP error getting details for {coingecko_id}: {e.response.status_code} - {e.response.text}")
+    except httpx.RequestError as e:
+        logger.error(f"Request error getting details for {coingecko_id}: {e}")
+    except Exception as e:
+        logger.exception(f"Unexpected error getting details for {coingecko_id}: {e}")
+    stale = cache.get(CACHE_DETAILS, coingecko_id, allow_stale=True)
+    return None if stale is MISSING else stale
 
-        params = {
-            "localization": "false",
-            "tickers": "false",
-            "market_data": "false",
-            "community_data": "false",
-            "developer_data": "false",
-            "sparkline": "false"
-        }
-
-        response = sync_client.get(f"/coins/{coingecko_id}", params=params)
-        response.raise_for_status()
-        data = response.json()
 
-        return {
-            "image": data.get("image", {}).get("large")
-        }
+async def get_coin_details_async(coingecko_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Fetches detailed information for a coin using its coingecko_id (/coins/{id}) (asynchronous, cached).
+    Same contract as get_coin_details.
+    """
+    if not coingecko_id:
+        return None
+    cached = await cache.get_async(CACHE_DETAILS, coingecko_id)
+    if cached is not MISSING:
+        return cached
+    try:
+        response = await _get_async(f"/coins/{coingecko_id}", params=COIN_DETAILS_PARAMS)
+        details = _parse_coin_details(response)
+        await cache.set_async(CACHE_DETAILS, coingecko_id, details)
+        return details
     except httpx.HTTPStatusError as e:
         logger.error(f"HTTP error getting details for {coingecko_id}: {e.response.status_code} - {e.response.text}")
     except httpx.RequestError as e:
         logger.error(f"Request error getting details for {coingecko_id}: {e}")
     except Exception as e:
         logger.exception(f"Unexpected error getting details for {coingecko_id}: {e}")
-    return None
+    stale = await cache.get_async(CACHE_DETAILS, coingecko_id, allow_stale=True)
+    return None if stale is MISSING else stale
+
+
+def get_coins_list() -> List[Dict[str, Any]]:
+    """
+    Downloads the full coin list (/coins/list) as [{'id': ..., 'symbol': ..., 'name': ...}, ...] (synchronous).
+    Returns an empty list if error.
+    """
+    try:
+        response = _get("/coins/list")
+        response.raise_for_status()
+        return response.json()
+    except httpx.HTTPStatusError as e:
+        logger.error(f"HTTP error getting coin list: {e.response.status_code} - {e.response.text}")
+    except httpx.RequestError as e:
+        logger.error(f"Request error getting coin list: {e}")
+    except Exception as e:
+        logger.exception(f"Unexpected error getting coin list: {e}")
+    return []
 
 
-def get_prices(coingecko_ids: List[str], vs_currency: str = "usd") -> Dict[str, Dict[str, float]]:
+def get_market_cap_ranks(pages: int, per_page: int = 250) -> Dict[str, int]:
+    """
+    Fetches market_cap_rank for the top pages * per_page coins via /coins/markets (synchronous).
+    Returns a dictionary mapping coingecko_id to rank; pages that fail are skipped.
+    """
+    ranks: Dict[str, int] = {}
+    for page in range(1, pages + 1):
+        params = {"vs_currency": "usd", "order": "market_cap_desc", "per_page": per_page, "page": page}
+        try:
+            response = _get("/coins/markets", params=params)
+            response.raise_for_status()
+            for coin in response.json():
+                if coin.get("id") and coin.get("market_cap_rank") is not None:
+                    ranks[coin["id"]] = coin["market_cap_rank"]
+        except httpx.HTTPStatusError as e:
+            logger.error(f"HTTP error getting market ranks page {page}: {e.response.status_code} - {e.response.text}")
+        except httpx.RequestError as e:
+            logger.error(f"Request error getting market ranks page {page}: {e}")
+        except Exception as e:
+            logger.exception(f"Unexpected error getting market ranks page {page}: {e}")
+    return ranks
+
+
+VsCurrency = Union[str, Sequence[str]]
+
+
+def _vs_currencies(vs_currency: VsCurrency) -> str:
+    return vs_currency if isinstance(vs_currency, str) else ",".join(vs_currency)
+
+
+def _price_params(coingecko_ids: List[str], vs_currency: VsCurrency) -> Dict[str, str]:
+    return {
+        "ids": ",".join(coingecko_ids),
+        "vs_currencies": _vs_currencies(vs_currency)
+    }
+
+
+def price_metadata(price_info: Dict[str, float]) -> Dict[str, float]:
+    """Maps one coin's /simple/price quotes ({'usd': ..., 'eur': ...}) to coin_metadata price keys."""
+    return {f"current_price_{currency}": price for currency, price in price_info.items()}
+
+
+def _fetch_prices(coingecko_ids: List[str], vs_currency: VsCurrency) -> Dict[str, Dict[str, float]]:
+    """Single /simple/price request; raises on any error so batch callers can attribute it to a chunk."""
+    response = _get("/simple/price", params=_price_params(coingecko_ids, vs_currency))
+    response.raise_for_status()
+    return response.json()
+
+
+async def _fetch_prices_async(coingecko_ids: List[str], vs_currency: VsCurrency) -> Dict[str, Dict[str, float]]:
+    response = await _get_async("/simple/price", params=_price_params(coingecko_ids, vs_currency))
+    response.raise_for_status()
+    return response.json()
+
+
+def get_prices(coingecko_ids: List[str], vs_currency: VsCurrency = "usd") -> Dict[str, Dict[str, float]]:
     """
     Fetches current prices for a list of coingecko_ids using /simple/price (synchronous).
+    vs_currency may be a list of quote currencies, all fetched in the same request.
     Returns a dictionary mapping coingecko_id to its price dict, e.g.,
-    {'bitcoin': {'usd': 60000.0}, 'ethereum': {'usd': 4000.0}}
+    {'bitcoin': {'usd': 60000.0, 'eur': 55000.0}, 'ethereum': {'usd': 4000.0, 'eur': 3700.0}}
     Returns an empty dict if error or no IDs provided.
     """
     if not coingecko_ids:
         return {}
 
     try:
-        ids_param = ",".join(coingecko_ids)
-        params = {
-            "ids": ids_param,
-            "vs_currencies": vs_currency
-        }
+        return _fetch_prices(coingecko_ids, vs_currency)
+    except httpx.HTTPStatusError as e:
+        logger.error(f"HTTP error getting prices for {coingecko_ids}: {e.response.status_code} - {e.response.text}")
+    except httpx.RequestError as e:
+        logger.error(f"Request error getting prices for {coingecko_ids}: {e}")
+    except Exception as e:
+        logger.exception(f"Unexpected error getting prices for {coingecko_ids}: {e}")
+    return {}
 
-        response = sync_client.get("/simple/price", params=params)
-        response.raise_for_status()
-        data = response.json()
-        return data
+
+async def get_prices_async(coingecko_ids: List[str], vs_currency: VsCurrency = "usd") -> Dict[str, Dict[str, float]]:
+    """
+    Fetches current prices for a list of coingecko_ids using /simple/price (asynchronous).
+    Same contract as get_prices.
+    """
+    if not coingecko_ids:
+        return {}
+
+    try:
+        return await _fetch_prices_async(coingecko_ids, vs_currency)
     except httpx.HTTPStatusError as e:
         logger.error(f"HTTP error getting prices for {coingecko_ids}: {e.response.status_code} - {e.response.text}")
     except httpx.RequestError as e:
@@ -97,3 +540,249 @@ def get_prices(coingecko_ids: List[str], vs_currency: str = "usd") -> Dict[str,
     except Exception as e:
         logger.exception(f"Unexpected error getting prices for {coingecko_ids}: {e}")
     return {}
+
+
+@dataclass
+class ChunkFailure:
+    coingecko_ids: List[str]
+    error: str
+
+
+@dataclass
+class PriceBatchResult:
+    prices: Dict[str, Dict[str, float]] = field(default_factory=dict)
+    failed_chunks: List[ChunkFailure] = field(default_factory=list)
+    chunk_count: int = 0
+
+    @property
+    def failed_ids(self) -> List[str]:
+        return [cg_id for chunk in self.failed_chunks for cg_id in chunk.coingecko_ids]
+
+
+def chunk_ids_by_url_length(coingecko_ids: List[str], path: str = "/simple/price", extra_query_length: int = 0,
+                            max_url_length: Optional[int] = None,
+                            max_chunk_size: Optional[int] = None) -> List[List[str]]:
+    """
+    Splits ids into chunks whose encoded "ids=" query keeps the request URL under max_url_length.
+    extra_query_length accounts for the other query parameters; max_chunk_size optionally caps ids per chunk.
+    """
+    max_url_length = max_url_length or settings.COINGECKO_MAX_URL_LENGTH
+    base_length = len(settings.COINGECKO_API_BASE_URL) + len(path) + len("?ids=") + extra_query_length
+    budget = max(max_url_length - base_length, 1)
+
+    chunks: List[List[str]] = []
+    current: List[str] = []
+    current_length = 0
+    for cg_id in coingecko_ids:
+        id_length = len(quote_plus(cg_id))
+        added_length = id_length if not current else id_length + len(ENCODED_ID_SEPARATOR)
+        if current and (current_length + added_length > budget
+                        or (max_chunk_size is not None and len(current) >= max_chunk_size)):
+            chunks.append(current)
+            current, current_length = [], 0
+            added_length = id_length
+        current.append(cg_id)
+        current_length += added_length
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def price_chunks(coingecko_ids: List[str], vs_currency: VsCurrency) -> List[List[str]]:
+    unique_ids = list(dict.fromkeys(coingecko_ids))
+    extra_query_length = len(f"&vs_currencies={quote_plus(_vs_currencies(vs_currency))}")
+    return chunk_ids_by_url_length(unique_ids, extra_query_length=extra_query_length)
+
+
+def _collect_chunk(result: PriceBatchResult, chunk: List[str], outcome: Any) -> None:
+    if isinstance(outcome, BaseException):
+        logger.error(f"Price chunk of {len(chunk)} ids failed: {outcome!r}")
+        result.failed_chunks.append(ChunkFailure(coingecko_ids=chunk, error=repr(outcome)))
+    else:
+        result.prices.update(outcome)
+
+
+def _fetch_chunks(fetch: Callable[[List[str]], Dict[str, Any]], chunks: List[List[str]],
+                  max_concurrency: Optional[int]) -> PriceBatchResult:
+    """Runs fetch(chunk) for every chunk on a thread pool and merges the results."""
+    result = PriceBatchResult(chunk_count=len(chunks))
+    if not chunks:
+        return result
+
+    max_workers = min(max_concurrency or settings.COINGECKO_PRICE_CONCURRENCY, len(chunks))
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="coingecko-prices") as executor:
+        futures = [(chunk, executor.submit(fetch, chunk)) for chunk in chunks]
+        for chunk, future in futures:
+            try:
+                outcome = future.result()
+            except Exception as e:
+                outcome = e
+            _collect_chunk(result, chunk, outcome)
+    return result
+
+
+async def _fetch_chunks_async(fetch: Callable[[List[str]], Awaitable[Dict[str, Any]]], chunks: List[List[str]],
+                              max_concurrency: Optional[int]) -> PriceBatchResult:
+    """Awaits fetch(chunk) for every chunk, at most max_concurrency at a time, and merges the results."""
+    result = PriceBatchResult(chunk_count=len(chunks))
+    if not chunks:
+        return result
+
+    semaphore = asyncio.Semaphore(max_concurrency or settings.COINGECKO_PRICE_CONCURRENCY)
+
+    async def fetch_chunk(chunk: List[str]) -> Dict[str, Any]:
+        async with semaphore:
+            return await fetch(chunk)
+
+    outcomes = await asyncio.gather(*(fetch_chunk(chunk) for chunk in chunks), return_exceptions=True)
+    for chunk, outcome in zip(chunks, outcomes):
+        _collect_chunk(result, chunk, outcome)
+    return result
+
+
+def get_prices_batched(coingecko_ids: List[str], vs_currency: VsCurrency = "usd",
+                       max_concurrency: Optional[int] = None) -> PriceBatchResult:
+    """
+    Fetches prices for any number of ids (synchronous): ids are split into URL-length-bounded chunks,
+    fetched concurrently on sync_client with at most max_concurrency requests in flight, and merged.
+    A failing chunk is reported in failed_chunks without discarding the other chunks.
+    """
+    return _fetch_chunks(lambda chunk: _fetch_prices(chunk, vs_currency),
+                         price_chunks(coingecko_ids, vs_currency), max_concurrency)
+
+
+async def get_prices_batched_async(coingecko_ids: List[str], vs_currency: VsCurrency = "usd",
+                                   max_concurrency: Optional[int] = None) -> PriceBatchResult:
+    """
+    Asynchronous get_prices_batched on the shared AsyncClient; a semaphore caps requests in flight.
+    """
+    return await _fetch_chunks_async(lambda chunk: _fetch_prices_async(chunk, vs_currency),
+                                     price_chunks(coingecko_ids, vs_currency), max_concurrency)
+
+
+# /coins/markets returns at most this many coins per page; one page is requested per chunk of ids.
+MARKETS_PER_PAGE = 250
+# Quote currency of /coins/markets rows; other PRICE_QUOTE_CURRENCIES come from /simple/price.
+MARKETS_VS_CURRENCY = "usd"
+
+
+def _markets_params(coingecko_ids: List[str]) -> Dict[str, Any]:
+    return {
+        "vs_currency": MARKETS_VS_CURRENCY,
+        "ids": ",".join(coingecko_ids),
+        "per_page": MARKETS_PER_PAGE,
+        "page": 1,
+        "sparkline": "false",
+    }
+
+
+def market_metadata(coin: Dict[str, Any]) -> Dict[str, Any]:
+    """Maps one /coins/markets row to coin_metadata keys (price, image, market cap and rank); nulls are dropped."""
+    metadata = {
+        f"current_price_{MARKETS_VS_CURRENCY}": coin.get("current_price"),
+        "image": coin.get("image"),
+        f"market_cap_{MARKETS_VS_CURRENCY}": coin.get("market_cap"),
+        "market_cap_rank": coin.get("market_cap_rank"),
+    }
+    return {key: value for key, value in metadata.items() if value is not None}
+
+
+def market_chunks(coingecko_ids: List[str]) -> List[List[str]]:
+    unique_ids = list(dict.fromkeys(coingecko_ids))
+    extra_query_length = len("&" + "&".join(f"{name}={value}" for name, value in _markets_params([]).items()
+                                            if name != "ids"))
+    return chunk_ids_by_url_length(unique_ids, path="/coins/markets", extra_query_length=extra_query_length,
+                                   max_chunk_size=MARKETS_PER_PAGE)
+
+
+def _parse_markets(response: httpx.Response) -> Dict[str, Dict[str, Any]]:
+    response.raise_for_status()
+    return {coin["id"]: market_metadata(coin) for coin in response.json() if coin.get("id")}
+
+
+def _remember_markets(markets: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    cache.set_many(CACHE_MARKETS, markets)
+    return markets
+
+
+async def _remember_markets_async(markets: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    await cache.set_many_async(CACHE_MARKETS, markets)
+    return markets
+
+
+def _fetch_markets(coingecko_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Single /coins/markets request; raises on any error so batch callers can attribute it to a chunk.
+    Rows are cached per id as the last-known data for get_markets_or_stale_async.
+    """
+    return _remember_markets(_parse_markets(_get("/coins/markets", params=_markets_params(coingecko_ids))))
+
+
+async def _fetch_markets_async(coingecko_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    response = await _get_async("/coins/markets", params=_markets_params(coingecko_ids))
+    return await _remember_markets_async(_parse_markets(response))
+
+
+async def get_markets_async(coingecko_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Fetches price, image, market cap and rank for up to MARKETS_PER_PAGE coingecko_ids in one
+    /coins/markets request (asynchronous). Returns {coingecko_id: market_metadata(...)}, ids unknown to
+    CoinGecko are absent. Returns an empty dict if error or no IDs provided.
+    """
+    if not coingecko_ids:
+        return {}
+
+    try:
+        return await _fetch_markets_async(coingecko_ids)
+    except httpx.HTTPStatusError as e:
+        logger.error(f"HTTP error getting markets for {coingecko_ids}: {e.response.status_code} - {e.response.text}")
+    except httpx.RequestError as e:
+        logger.error(f"Request error getting markets for {coingecko_ids}: {e}")
+    except Exception as e:
+        logger.exception(f"Unexpected error getting markets for {coingecko_ids}: {e}")
+    return {}
+
+
+async def get_markets_or_stale_async(
+        coingecko_ids: List[str]) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, float]]:
+    """
+    get_markets_async that does not wait on an unavailable upstream: rows cached within
+    COINGECKO_CACHE_MARKETS_TTL are used as they are, and if the request fails (or the circuit breaker
+    is open) the last-known rows kept for COINGECKO_CACHE_STALE_TTL are returned instead.
+    Returns (markets, stale) where stale maps each id served from expired data to its age in seconds.
+    """
+    markets: Dict[str, Dict[str, Any]] = {}
+    missing = []
+    cached = await cache.get_many_with_age_async(CACHE_MARKETS, list(dict.fromkeys(coingecko_ids)))
+    for coingecko_id, (row, _) in cached.items():
+        if row is MISSING or row is None:
+            missing.append(coingecko_id)
+        else:
+            markets[coingecko_id] = row
+    if not missing:
+        return markets, {}
+
+    fetched = await get_markets_async(missing)
+    markets.update(fetched)
+    stale: Dict[str, float] = {}
+    if not fetched:
+        last_known = await cache.get_many_with_age_async(CACHE_MARKETS, missing, allow_stale=True)
+        for coingecko_id, (row, age) in last_known.items():
+            if row is not MISSING and row is not None:
+                markets[coingecko_id] = row
+                stale[coingecko_id] = age
+    return markets, stale
+
+
+def get_markets_batched(coingecko_ids: List[str], max_concurrency: Optional[int] = None) -> PriceBatchResult:
+    """
+    get_prices_batched for /coins/markets (synchronous): `prices` maps each coingecko_id to its
+    market_metadata, one request per chunk of at most MARKETS_PER_PAGE ids.
+    """
+    return _fetch_chunks(_fetch_markets, market_chunks(coingecko_ids), max_concurrency)
+
+
+async def get_markets_batched_async(coingecko_ids: List[str],
+                                    max_concurrency: Optional[int] = None) -> PriceBatchResult:
+    """Asynchronous get_markets_batched on the shared AsyncClient."""
+    return await _fetch_chunks_async(_fetch_markets_async, market_chunks(coingecko_ids), max_concurrency)
@@ -0,0 +1,187 @@
+import bisect
+import logging
+import math
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# File layout (little-endian), written once per price refresh and swapped in with os.replace:
+#   header     magic, version, currency count C, coin count N, generated_at (epoch seconds)
+#   currencies C x 8-byte ASCII codes
+#   index      N x (16-byte upper-case symbol, u32 slot), sorted by symbol for binary search
+#   ids        N x u32 cryptocurrency id, slots in id order
+#   updated_at N x f64 epoch seconds of each coin's last price update (NaN if never)
+#   prices     N x C x f64 quotes, NaN where a quote is missing
+MAGIC = b"CPS1"
+VERSION = 1
+HEADER = struct.Struct("<4sHHId")
+CURRENCY = struct.Struct("<8s")
+INDEX_ENTRY = struct.Struct("<16sI")
+SYMBOL_BYTES = 16
+
+
+@dataclass
+class SnapshotRow:
+    id: int
+    symbol: str
+    updated_at: Optional[float]
+    prices: Dict[str, float]
+
+
+@dataclass
+class SnapshotPrice:
+    symbol: str
+    prices: Dict[str, float]
+    updated_at: Optional[float]
+    generated_at: float
+
+
+def _encode_symbol(symbol: str) -> Optional[bytes]:
+    encoded = symbol.upper().encode("ascii", errors="ignore")
+    return encoded.ljust(SYMBOL_BYTES, b"\0") if 0 < len(encoded) <= SYMBOL_BYTES else None
+
+
+def encode(rows: Sequence[SnapshotRow], currencies: Sequence[str], generated_at: Optional[float] = None) -> bytes:
+    """Serializes rows into the snapshot layout. Symbols longer than 16 ASCII bytes are left out."""
+    rows = sorted((row for row in rows if _encode_symbol(row.symbol)), key=lambda row: row.id)
+    generated_at = time.time() if generated_at is None else generated_at
+    parts = [HEADER.pack(MAGIC, VERSION, len(currencies), len(rows), generated_at)]
+    parts += [CURRENCY.pack(currency.encode("ascii")) for currency in currencies]
+    index = sorted((_encode_symbol(row.symbol), slot) for slot, row in enumerate(rows))
+    parts += [INDEX_ENTRY.pack(symbol, slot) for symbol, slot in index]
+    parts.append(struct.pack(f"<{len(rows)}I", *(row.id for row in rows)))
+    parts.append(struct.pack(f"<{len(rows)}d",
+                             *(math.nan if row.updated_at is None else row.updated_at for row in rows)))
+    parts.append(struct.pack(f"<{len(rows) * len(currencies)}d",
+                             *(row.prices.get(currency, math.nan) for row in rows for currency in currencies)))
+    return b"".join(parts)
+
+
+def write(path: str, rows: Sequence[SnapshotRow], currencies: Sequence[str]) -> None:
+    """Writes the snapshot to a temporary file and atomically replaces `path` with it."""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".price_snapshot.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(encode(rows, currencies))
+        os.replace(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+
+
+class _Mapped:
+    """One memory-mapped snapshot file; lookups read fixed-width records straight from the mapping."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self.identity = os.fstat(f.fileno())
+        magic, version, currency_count, self.count, self.generated_at = HEADER.unpack_from(self.buffer, 0)
+        if magic != MAGIC or version != VERSION:
+            self.buffer.close()
+            raise ValueError(f"Unsupported price snapshot format in {path}")
+        offset = HEADER.size
+        self.currencies: List[str] = [
+            CURRENCY.unpack_from(self.buffer, offset + i * CURRENCY.size)[0].rstrip(b"\0").decode("ascii")
+            for i in range(currency_count)
+        ]
+        self.index_offset = offset + currency_count * CURRENCY.size
+        self.updated_offset = self.index_offset + self.count * INDEX_ENTRY.size + self.count * 4
+        self.prices_offset = self.updated_offset + self.count * 8
+        self.row = struct.Struct(f"<{currency_count}d")
+        self._symbols = _IndexSymbols(self.buffer, self.index_offset, self.count)
+
+    def slot(self, symbol: bytes) -> Optional[int]:
+        position = bisect.bisect_left(self._symbols, symbol)
+        if position < self.count:
+            found, slot = INDEX_ENTRY.unpack_from(self.buffer, self.index_offset + position * INDEX_ENTRY.size)
+            if found == symbol:
+                return slot
+        return None
+
+    def read(self, slot: int) -> Tuple[Dict[str, float], Optional[float]]:
+        (updated_at,) = struct.unpack_from("<d", self.buffer, self.updated_offset + slot * 8)
+        values = self.row.unpack_from(self.buffer, self.prices_offset + slot * self.row.size)
+        prices = {currency: value for currency, value in zip(self.currencies, values) if not math.isnan(value)}
+        return prices, None if math.isnan(updated_at) else updated_at
+
+
+class _IndexSymbols:
+    """Sequence view of the sorted index's symbols, so bisect can search the mapping in place."""
+
+    def __init__(self, buffer: mmap.mmap, offset: int, count: int):
+        self.buffer, self.offset, self.count = buffer, offset, count
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, position: int) -> bytes:
+        start = self.offset + position * INDEX_ENTRY.size
+        return self.buffer[start:start + SYMBOL_BYTES]
+
+
+class PriceSnapshot:
+    """
+    Read side of the latest-price snapshot published by the worker. Each API process maps the file and
+    checks for a newer one (a new inode, since writers swap files) at most every
+    PRICE_SNAPSHOT_RELOAD_CHECK_SECONDS; a replaced mapping stays valid for readers still using it.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._mapped: Optional[_Mapped] = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def is_loaded(self) -> bool:
+        self._maybe_reload()
+        return self._mapped is not None
+
+    def lookup(self, symbol: str) -> Optional[SnapshotPrice]:
+        self._maybe_reload()
+        mapped = self._mapped
+        encoded = _encode_symbol(symbol)
+        if mapped is None or encoded is None:
+            return None
+        slot = mapped.slot(encoded)
+        if slot is None:
+            return None
+        prices, updated_at = mapped.read(slot)
+        return SnapshotPrice(symbol=symbol.upper(), prices=prices, updated_at=updated_at,
+                             generated_at=mapped.generated_at)
+
+    def _maybe_reload(self) -> None:
+        now = time.monotonic()
+        if now - self._last_check < settings.PRICE_SNAPSHOT_RELOAD_CHECK_SECONDS:
+            return
+        with self._lock:
+            if now - self._last_check < settings.PRICE_SNAPSHOT_RELOAD_CHECK_SECONDS:
+                return
+            self._last_check = now
+            try:
+                stat = os.stat(self.path)
+            except OSError:
+                return
+            current = self._mapped
+            if current is not None and (stat.st_ino, stat.st_mtime_ns) == (current.identity.st_ino,
+                                                                           current.identity.st_mtime_ns):
+                return
+            try:
+                self._mapped = _Mapped(self.path)
+            except (OSError, ValueError, struct.error) as e:
+                logger.error(f"Could not map price snapshot {self.path}: {e}")
+
+
+price_snapshot = PriceSnapshot(settings.PRICE_SNAPSHOT_PATH)
@@ -0,0 +1,118 @@
+import asyncio
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, Set
+
+import redis
+
+from app.core.redis_client import get_redis, get_async_redis
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "crypto:prices"
+
+
+def publish_prices(prices: Dict[str, Dict[str, Any]]) -> None:
+    """
+    Publishes changed prices ({symbol: {'usd': ..., 'eur': ...}}) to Redis pub/sub (called by the worker).
+    Returns silently on Redis errors; streaming clients simply miss that refresh.
+    """
+    if not prices:
+        return
+    message = json.dumps({"published_at": datetime.now(timezone.utc).isoformat(), "prices": prices})
+    try:
+        get_redis().publish(CHANNEL, message)
+    except redis.RedisError as e:
+        logger.error(f"Could not publish {len(prices)} price updates: {e}")
+
+
+class Subscription:
+    """
+    One streaming client. Deltas for its symbols are coalesced per symbol until the client reads them,
+    so a slow client skips intermediate ticks instead of growing an unbounded queue.
+    """
+
+    def __init__(self, symbols: Optional[Set[str]]):
+        self.symbols = symbols
+        self.coalesced = 0
+        self._pending: Dict[str, Any] = {}
+        self._event = asyncio.Event()
+
+    def offer(self, prices: Dict[str, Any]) -> None:
+        for symbol, quote in prices.items():
+            if self.symbols is None or symbol in self.symbols:
+                if symbol in self._pending:
+                    self.coalesced += 1
+                self._pending[symbol] = quote
+        if self._pending:
+            self._event.set()
+
+    async def next_batch(self, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Waits for pending deltas; returns an empty dict if timeout passes first (use for heartbeats)."""
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return {}
+        self._event.clear()
+        batch, self._pending = self._pending, {}
+        return batch
+
+
+class PriceHub:
+    """Per-process fan-out: a single Redis subscription feeding every connected streaming client."""
+
+    def __init__(self):
+        self._subscriptions: Set[Subscription] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscriptions)
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def subscribe(self, symbols: Optional[Set[str]] = None) -> Subscription:
+        subscription = Subscription(symbols)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscriptions.discard(subscription)
+
+    def dispatch(self, prices: Dict[str, Any]) -> None:
+        for subscription in list(self._subscriptions):
+            subscription.offer(prices)
+
+    async def _listen(self) -> None:
+        delay = 1.0
+        while True:
+            pubsub = get_async_redis().pubsub()
+            try:
+                await pubsub.subscribe(CHANNEL)
+                delay = 1.0
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self.dispatch(json.loads(message["data"])["prices"])
+            except asyncio.CancelledError:
+                await pubsub.aclose()
+                raise
+            except (redis.RedisError, ValueError, KeyError) as e:
+                logger.warning(f"Price stream subscription lost ({e}); reconnecting in {delay:.0f}s")
+                await pubsub.aclose()
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+
+
+price_hub = PriceHub()
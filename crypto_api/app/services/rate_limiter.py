@@ -0,0 +1,112 @@
+import asyncio
+import logging
+import time
+from typing import Callable
+
+import redis
+import redis.asyncio
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BACKGROUND = "background"
+
+# KEYS: bucket hash, cooldown key. ARGV: refill rate (tokens/s), capacity, reserve floor for this caller.
+# Returns 0 when a token was taken, otherwise the number of milliseconds to wait before retrying.
+TOKEN_BUCKET_SCRIPT = """
+local cooldown = redis.call('PTTL', KEYS[2])
+if cooldown > 0 then
+  return cooldown
+end
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local floor = tonumber(ARGV[3])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens - 1 >= floor then
+  tokens = tokens - 1
+else
+  wait = math.ceil((floor + 1 - tokens) / rate * 1000)
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+return wait
+"""
+
+
+class RateLimitTimeout(Exception):
+    """Raised when no token became available within the caller's maximum wait."""
+
+
+class RedisTokenBucket:
+    """
+    Token bucket shared by every process through Redis. Background callers may not take the last
+    `interactive_reserve` tokens, so interactive requests keep headroom when refreshes drain the bucket.
+    A 429 from upstream sets a shared cooldown that pauses all callers for the Retry-After period.
+    Redis errors fail open: the call proceeds unthrottled rather than failing.
+    """
+
+    def __init__(self, client_factory: Callable[[], redis.Redis],
+                 async_client_factory: Callable[[], redis.asyncio.Redis], key: str,
+                 rate_per_second: float, capacity: int, interactive_reserve: int):
+        self._client_factory = client_factory
+        self._async_client_factory = async_client_factory
+        self.key = key
+        self.cooldown_key = f"{key}:cooldown"
+        self.rate_per_second = rate_per_second
+        self.capacity = capacity
+        self.interactive_reserve = min(interactive_reserve, max(capacity - 1, 0))
+
+    def _args(self, priority: str):
+        floor = self.interactive_reserve if priority == PRIORITY_BACKGROUND else 0
+        return [self.key, self.cooldown_key], [self.rate_per_second, self.capacity, floor]
+
+    def acquire(self, priority: str, max_wait: float) -> None:
+        deadline = time.monotonic() + max_wait
+        keys, args = self._args(priority)
+        while True:
+            try:
+                wait_ms = self._client_factory().eval(TOKEN_BUCKET_SCRIPT, len(keys), *keys, *args)
+            except redis.RedisError as e:
+                logger.warning(f"Rate limiter unavailable, proceeding without throttling: {e}")
+                return
+            if not wait_ms:
+                return
+            wait = wait_ms / 1000
+            if time.monotonic() + wait > deadline:
+                raise RateLimitTimeout(f"No CoinGecko request token for {priority} caller within {max_wait}s")
+            time.sleep(wait)
+
+    async def acquire_async(self, priority: str, max_wait: float) -> None:
+        deadline = time.monotonic() + max_wait
+        keys, args = self._args(priority)
+        while True:
+            try:
+                wait_ms = await self._async_client_factory().eval(TOKEN_BUCKET_SCRIPT, len(keys), *keys, *args)
+            except redis.RedisError as e:
+                logger.warning(f"Rate limiter unavailable, proceeding without throttling: {e}")
+                return
+            if not wait_ms:
+                return
+            wait = wait_ms / 1000
+            if time.monotonic() + wait > deadline:
+                raise RateLimitTimeout(f"No CoinGecko request token for {priority} caller within {max_wait}s")
+            await asyncio.sleep(wait)
+
+    def penalize(self, seconds: float) -> None:
+        """Pauses every caller for `seconds` (e.g. upstream Retry-After)."""
+        try:
+            self._client_factory().set(self.cooldown_key, 1, px=max(int(seconds * 1000), 1))
+        except redis.RedisError as e:
+            logger.warning(f"Could not record rate limit cooldown: {e}")
+
+    async def penalize_async(self, seconds: float) -> None:
+        try:
+            await self._async_client_factory().set(self.cooldown_key, 1, px=max(int(seconds * 1000), 1))
+        except redis.RedisError as e:
+            logger.warning(f"Could not record rate limit cooldown: {e}")
@@ -0,0 +1,182 @@
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import redis
+
+from app.core.config import settings
+from app.core.redis_client import get_redis, get_async_redis
+from app.services import coingecko
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "crypto:refresh:"
+# ZSET symbol -> decayed read count, incremented by the API on every single-coin read.
+READS_KEY = KEY_PREFIX + "reads"
+# HASH coingecko_id -> tier, rewritten by plan().
+TIERS_KEY = KEY_PREFIX + "tiers"
+# ZSET coingecko_id -> epoch second at which the coin is next due for a refresh.
+DUE_KEY = KEY_PREFIX + "due"
+
+TIER_HOT = "hot"
+TIER_WARM = "warm"
+TIER_COLD = "cold"
+TIERS = (TIER_HOT, TIER_WARM, TIER_COLD)
+
+# Read counts decayed below this are dropped, which also forgets symbols that were never tracked.
+MIN_TRACKED_READS = 0.01
+
+
+def record_read(symbol: str) -> None:
+    """Counts one API read of `symbol` towards its refresh tier. Never raises."""
+    if not settings.REFRESH_TRACK_READS:
+        return
+    try:
+        get_redis().zincrby(READS_KEY, 1, symbol.upper())
+    except redis.RedisError as e:
+        logger.warning(f"Could not record read of {symbol}: {e}")
+
+
+async def record_read_async(symbol: str) -> None:
+    """record_read() on the async Redis client, for async routes."""
+    if not settings.REFRESH_TRACK_READS:
+        return
+    try:
+        await get_async_redis().zincrby(READS_KEY, 1, symbol.upper())
+    except redis.RedisError as e:
+        logger.warning(f"Could not record read of {symbol}: {e}")
+
+
+class ReadBuffer:
+    """
+    Counts reads in process memory and adds them to READS_KEY in one pipeline every
+    REFRESH_READS_FLUSH_SECONDS, for routes that must not wait on Redis. Counts buffered while
+    Redis is unavailable are dropped; they only steer refresh tiers.
+    """
+
+    def __init__(self):
+        self._counts: Dict[str, int] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def add(self, symbol: str) -> None:
+        if not settings.REFRESH_TRACK_READS:
+            return
+        symbol = symbol.upper()
+        self._counts[symbol] = self._counts.get(symbol, 0) + 1
+
+    async def flush(self) -> None:
+        """Never raises."""
+        counts, self._counts = self._counts, {}
+        if not counts:
+            return
+        try:
+            pipe = get_async_redis().pipeline(transaction=False)
+            for symbol, count in counts.items():
+                pipe.zincrby(READS_KEY, count, symbol)
+            await pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Could not record {sum(counts.values())} buffered reads: {e}")
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(settings.REFRESH_READS_FLUSH_SECONDS)
+            await self.flush()
+
+
+read_buffer = ReadBuffer()
+
+
+def assign_tier(reads: float, volatility: float) -> str:
+    """Tier of a coin from its decayed read count and relative price range over the volatility window."""
+    if reads >= settings.REFRESH_HOT_READS or volatility >= settings.REFRESH_HOT_VOLATILITY:
+        return TIER_HOT
+    if reads >= settings.REFRESH_WARM_READS or volatility >= settings.REFRESH_WARM_VOLATILITY:
+        return TIER_WARM
+    return TIER_COLD
+
+
+def tier_interval(tier: Optional[str]) -> float:
+    return settings.REFRESH_TIER_INTERVALS.get(tier or TIER_COLD, settings.REFRESH_TIER_INTERVALS[TIER_COLD])
+
+
+def requests_per_tick() -> int:
+    """Upstream /simple/price requests one scheduler tick may spend (at least one)."""
+    return max(1, int(settings.REFRESH_REQUEST_BUDGET_PER_MINUTE * settings.REFRESH_TICK_SECONDS / 60))
+
+
+def order_due(due: Sequence[Tuple[str, float]], tiers: Dict[str, Optional[str]]) -> List[str]:
+    """Due coingecko_ids, hottest tier first and most overdue first within a tier."""
+    rank = {tier: i for i, tier in enumerate(TIERS)}
+    ordered = sorted(due, key=lambda item: (rank.get(tiers.get(item[0]) or TIER_COLD, len(TIERS)), item[1]))
+    return [cg_id for cg_id, _ in ordered]
+
+
+def is_planned() -> bool:
+    return bool(get_redis().exists(TIERS_KEY))
+
+
+def plan(symbols_by_cg_id: Dict[str, str], volatility: Dict[str, float],
+         now: Optional[float] = None) -> Dict[str, int]:
+    """
+    Reassigns every tracked coin to a tier and returns the tier sizes. Coins new to the schedule are due
+    immediately, promoted coins are pulled forward to their new interval, and coins no longer tracked are
+    dropped. Read counts are then decayed by REFRESH_READS_DECAY so popularity follows recent traffic.
+    Raises redis.RedisError.
+    """
+    now = time.time() if now is None else now
+    client = get_redis()
+    cg_ids = list(symbols_by_cg_id)
+    reads = client.zmscore(READS_KEY, [symbols_by_cg_id[cg_id] for cg_id in cg_ids]) if cg_ids else []
+    tiers = {cg_id: assign_tier(count or 0.0, volatility.get(cg_id, 0.0)) for cg_id, count in zip(cg_ids, reads)}
+    scheduled = {cg_id.decode() for cg_id in client.hkeys(TIERS_KEY)}
+
+    pipe = client.pipeline()
+    pipe.delete(TIERS_KEY)
+    if tiers:
+        pipe.hset(TIERS_KEY, mapping=tiers)
+        # LT only ever moves a due time earlier; demoted coins keep theirs and pick up the longer
+        # interval when next refreshed.
+        pipe.zadd(DUE_KEY, {cg_id: now if cg_id not in scheduled else now + tier_interval(tier)
+                            for cg_id, tier in tiers.items()}, lt=True)
+    dropped = scheduled - set(tiers)
+    if dropped:
+        pipe.zrem(DUE_KEY, *dropped)
+    pipe.zunionstore(READS_KEY, {READS_KEY: settings.REFRESH_READS_DECAY})
+    pipe.zremrangebyscore(READS_KEY, "-inf", f"({MIN_TRACKED_READS}")
+    pipe.execute()
+
+    return {tier: sum(1 for value in tiers.values() if value == tier) for tier in TIERS}
+
+
+def take_due(max_requests: int, now: Optional[float] = None) -> List[List[str]]:
+    """
+    Picks the coins to refresh now as /simple/price-sized chunks, at most `max_requests` of them, and
+    reschedules the picked coins one tier interval ahead. Coins left over stay due for the next tick.
+    Raises redis.RedisError.
+    """
+    now = time.time() if now is None else now
+    client = get_redis()
+    due = [(cg_id.decode(), score) for cg_id, score in client.zrangebyscore(DUE_KEY, "-inf", now, withscores=True)]
+    if not due:
+        return []
+    tiers = {cg_id: tier.decode() if tier else None
+             for (cg_id, _), tier in zip(due, client.hmget(TIERS_KEY, [cg_id for cg_id, _ in due]))}
+    chunks = coingecko.price_chunks(order_due(due, tiers), settings.PRICE_QUOTE_CURRENCIES)[:max_requests]
+    # XX: a coin removed by a concurrent plan() is not put back.
+    client.zadd(DUE_KEY, {cg_id: now + tier_interval(tiers[cg_id]) for chunk in chunks for cg_id in chunk}, xx=True)
+    return chunks
@@ -0,0 +1,125 @@
+import logging
+from typing import Optional, Dict, Iterable, Tuple
+
+import redis
+
+from app.core.config import settings
+from app.core.redis_client import get_redis, get_async_redis
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "crypto:responses:"
+GENERATION_KEY = KEY_PREFIX + "generation"
+LIST_INDEX_KEY = KEY_PREFIX + "list:keys"
+
+# KEYS: entry, generation, list index. ARGV: generation seen before the DB read, ttl, is_list, field/value pairs.
+# The entry is only stored if no write invalidated the cache in between, so a slow reader never caches stale data.
+SET_IF_CURRENT_SCRIPT = """
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[1] then
+  return 0
+end
+redis.call('DEL', KEYS[1])
+redis.call('HSET', KEYS[1], unpack(ARGV, 4))
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+if ARGV[3] == '1' then
+  redis.call('SADD', KEYS[3], KEYS[1])
+  redis.call('EXPIRE', KEYS[3], ARGV[2])
+end
+return 1
+"""
+
+# KEYS: generation, list index, symbol entries. Drops the given symbols and every cached list page.
+INVALIDATE_SCRIPT = """
+local pages = redis.call('SMEMBERS', KEYS[2])
+for i = 1, #pages, 1000 do
+  redis.call('DEL', unpack(pages, i, math.min(i + 999, #pages)))
+end
+redis.call('DEL', KEYS[2])
+for i = 3, #KEYS do
+  redis.call('DEL', KEYS[i])
+end
+return redis.call('INCR', KEYS[1])
+"""
+
+
+def symbol_key(symbol: str, currency: Optional[str] = None) -> str:
+    key = f"{KEY_PREFIX}symbol:{symbol.upper()}"
+    return f"{key}:{currency}" if currency else key
+
+
+def list_key(**params) -> str:
+    return KEY_PREFIX + "list:" + "&".join(f"{name}={params[name]}" for name in sorted(params))
+
+
+def read(key: str) -> Tuple[Optional[Dict[str, bytes]], Optional[bytes]]:
+    """
+    Returns (cached fields or None, current generation) in one round trip.
+    A None generation means the cache is disabled or unavailable and nothing should be stored.
+    """
+    if not settings.RESPONSE_CACHE_ENABLED:
+        return None, None
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.hgetall(key)
+        pipe.get(GENERATION_KEY)
+        fields, generation = pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Response cache read failed for {key}: {e}")
+        return None, None
+    return _decode(fields, generation)
+
+
+async def read_async(key: str) -> Tuple[Optional[Dict[str, bytes]], Optional[bytes]]:
+    """read() on the async Redis client, for async routes."""
+    if not settings.RESPONSE_CACHE_ENABLED:
+        return None, None
+    try:
+        pipe = get_async_redis().pipeline(transaction=False)
+        pipe.hgetall(key)
+        pipe.get(GENERATION_KEY)
+        fields, generation = await pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Response cache read failed for {key}: {e}")
+        return None, None
+    return _decode(fields, generation)
+
+
+def _decode(fields: Dict[bytes, bytes], generation: Optional[bytes]) -> Tuple[Optional[Dict[str, bytes]], bytes]:
+    fields = {name.decode(): value for name, value in fields.items()}
+    return fields or None, generation or b"0"
+
+
+def _store_args(key: str, generation: bytes, fields: Dict[str, str], is_list: bool) -> list:
+    pairs = [item for name, value in fields.items() for item in (name, value)]
+    return [SET_IF_CURRENT_SCRIPT, 3, key, GENERATION_KEY, LIST_INDEX_KEY,
+            generation, settings.RESPONSE_CACHE_TTL, "1" if is_list else "0", *pairs]
+
+
+def store(key: str, generation: Optional[bytes], fields: Dict[str, str], is_list: bool = False) -> None:
+    if generation is None:
+        return
+    try:
+        get_redis().eval(*_store_args(key, generation, fields, is_list))
+    except redis.RedisError as e:
+        logger.warning(f"Response cache write failed for {key}: {e}")
+
+
+async def store_async(key: str, generation: Optional[bytes], fields: Dict[str, str], is_list: bool = False) -> None:
+    if generation is None:
+        return
+    try:
+        await get_async_redis().eval(*_store_args(key, generation, fields, is_list))
+    except redis.RedisError as e:
+        logger.warning(f"Response cache write failed for {key}: {e}")
+
+
+def invalidate(symbols: Iterable[str]) -> None:
+    """Drops cached responses for the given symbols (in every quote currency) and all cached list pages."""
+    if not settings.RESPONSE_CACHE_ENABLED:
+        return
+    currencies = [None, *settings.PRICE_QUOTE_CURRENCIES]
+    keys = [symbol_key(symbol, currency) for symbol in symbols for currency in currencies]
+    try:
+        get_redis().eval(INVALIDATE_SCRIPT, 2 + len(keys), GENERATION_KEY, LIST_INDEX_KEY, *keys)
+    except redis.RedisError as e:
+        logger.error(f"Response cache invalidation failed for {len(keys)} symbols: {e}")
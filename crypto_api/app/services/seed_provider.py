@@ -1,56 +1,73 @@
+import json
 import logging
-from app.services import coingecko
+
+import redis
+from sqlalchemy.exc import IntegrityError
+
+from app.core.config import settings
+from app.core.locks import RedisLock
+from app.core.redis_client import get_redis
 from app.db.base import SessionLocal
 from app.crud import crud_crypto
 from app.db import models
 
-logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(name)s: %(message)s')
 logger = logging.getLogger(__name__)
 
-def seed_db():
-    """Seeds the database with initial data if it's empty."""
+SEED_LOCK_NAME = "seed"
+
+SEED_SKIPPED = "skipped"
+SEED_LOCKED = "locked"
+SEED_DONE = "seeded"
+SEED_FAILED = "failed"
+
+
+def load_seed_rows(path: str):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def seed_db() -> str:
+    """
+    Seeds an empty database from the offline fixture file (SEED_FIXTURE_PATH); no CoinGecko calls are made,
+    prices are filled in by the next worker refresh. A Redis lock lets a single process seed while the
+    others skip; if Redis is unavailable seeding proceeds and the unique constraints settle any race.
+    Returns one of SEED_SKIPPED, SEED_LOCKED, SEED_DONE or SEED_FAILED.
+    """
     db = SessionLocal()
+    lock = RedisLock(get_redis, SEED_LOCK_NAME, ttl_seconds=settings.SEED_LOCK_TTL)
+    locked = False
     try:
-        count = db.query(models.Cryptocurrency).count()
-        if count == 0:
-            logger.info("Database is empty, seeding initial data...")
-            initial_symbols = ["BTC", "ETH"]
-            for symbol in initial_symbols:
-                try:
-                    logger.info(f"Attempting to seed {symbol}...")
-
-                    existing = crud_crypto.get_crypto(db, symbol=symbol)
-                    if existing:
-                        logger.info(f"{symbol} already exists, skipping seed.")
-                        continue
-
-                    search_result = coingecko.search_coin(symbol=symbol)
-                    if search_result:
-                        coingecko_id, name = search_result
-                        coin_metadata = {}
-                        prices = coingecko.get_prices(coingecko_ids=[coingecko_id], vs_currency="usd")
-                        if coingecko_id in prices and "usd" in prices[coingecko_id]:
-                            coin_metadata["current_price_usd"] = prices[coingecko_id]["usd"]
-                        details = coingecko.get_coin_details(coingecko_id=coingecko_id)
-                        if details and details.get("image"):
-                            coin_metadata["image"] = details["image"]
-
-                        crud_crypto.create_crypto(
-                            db=db,
-                            symbol=symbol,
-                            name=name,
-                            coingecko_id=coingecko_id,
-                            coin_metadata=coin_metadata,
-                            note=f"Initial seed for {symbol}"
-                        )
-                        logger.info(f"Successfully seeded {symbol}")
-                    else:
-                        logger.warning(f"Could not find {symbol} on CoinGecko during seeding.")
-                except Exception as seed_error:
-                    logger.error(f"Error seeding {symbol}: {seed_error}", exc_info=True)
-                    db.rollback()
-            logger.info("Initial data seeding complete.")
-        else:
-            logger.info(f"Database contains {count} records, skipping seeding.")
+        if db.query(models.Cryptocurrency.id).first() is not None:
+            logger.info("Database already contains cryptocurrencies, skipping seeding.")
+            return SEED_SKIPPED
+
+        try:
+            locked = lock.acquire()
+            if not locked:
+                logger.info("Another process is seeding the database, skipping.")
+                return SEED_LOCKED
+        except redis.RedisError as e:
+            logger.warning(f"Seed lock unavailable, seeding without it: {e}")
+
+        if db.query(models.Cryptocurrency.id).first() is not None:
+            return SEED_SKIPPED
+
+        rows = load_seed_rows(settings.SEED_FIXTURE_PATH)
+        created = crud_crypto.create_cryptos_bulk(db, rows=rows)
+        logger.info(f"Seeded {len(created)} cryptocurrencies from {settings.SEED_FIXTURE_PATH}.")
+        return SEED_DONE
+    except IntegrityError:
+        db.rollback()
+        logger.info("Seed rows were inserted concurrently by another process.")
+        return SEED_SKIPPED
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error seeding database: {e}", exc_info=True)
+        return SEED_FAILED
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+        if locked:
+            try:
+                lock.release()
+            except redis.RedisError as e:
+                logger.warning(f"Could not release seed lock (it expires on its own): {e}")
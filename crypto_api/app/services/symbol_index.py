@@ -0,0 +1,142 @@
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Optional, Dict, Any, List, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def build_entries(coins: List[Dict[str, Any]], ranks: Dict[str, int]) -> Dict[str, Tuple[str, str]]:
+    """
+    Builds a symbol -> (coingecko_id, name) mapping from the /coins/list payload.
+    Symbol collisions are resolved deterministically: the best (lowest) market_cap_rank wins,
+    ranked coins beat unranked ones, and remaining ties go to the lexicographically smallest id.
+    """
+    best: Dict[str, Tuple[Tuple[int, int, str], str, str]] = {}
+    for coin in coins:
+        coingecko_id, symbol, name = coin.get("id"), coin.get("symbol"), coin.get("name")
+        if not coingecko_id or not symbol or not name:
+            continue
+        rank = ranks.get(coingecko_id)
+        sort_key = (0, rank, coingecko_id) if rank is not None else (1, 0, coingecko_id)
+        key = symbol.lower()
+        if key not in best or sort_key < best[key][0]:
+            best[key] = (sort_key, coingecko_id, name)
+    return {symbol: (coingecko_id, name) for symbol, (_, coingecko_id, name) in best.items()}
+
+
+class SymbolIndex:
+    """
+    In-memory symbol -> (coingecko_id, name) index persisted as a JSON file.
+    The worker rebuilds and saves it; API processes pick up a newer file from a background task that
+    checks its mtime every SYMBOL_INDEX_RELOAD_CHECK_SECONDS and parses it in a thread, so lookups
+    on the event loop never touch the disk.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._entries: Dict[str, Tuple[str, str]] = {}
+        self._loaded_mtime: Optional[float] = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded_mtime is not None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, symbol: str) -> Optional[Tuple[str, str]]:
+        return self._entries.get(symbol.lower())
+
+    def load(self) -> bool:
+        """Loads the index from disk. Returns False if the file is missing or unreadable."""
+        try:
+            mtime = os.path.getmtime(self.path)
+            with open(self.path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+            entries = {symbol: (value[0], value[1]) for symbol, value in payload["entries"].items()}
+        except FileNotFoundError:
+            logger.info(f"Symbol index file {self.path} not found; falling back to CoinGecko /search.")
+            return False
+        except Exception as e:
+            logger.error(f"Could not load symbol index from {self.path}: {e}")
+            return False
+
+        with self._lock:
+            self._entries = entries
+            self._loaded_mtime = mtime
+        logger.info(f"Loaded symbol index with {len(entries)} symbols from {self.path}.")
+        return True
+
+    def replace(self, entries: Dict[str, Tuple[str, str]], persist: bool = True) -> None:
+        """Swaps in a freshly built index and (optionally) writes it to disk atomically."""
+        if persist:
+            self._save(entries)
+        with self._lock:
+            self._entries = entries
+            self._loaded_mtime = os.path.getmtime(self.path) if persist else time.time()
+
+    def _save(self, entries: Dict[str, Tuple[str, str]]) -> None:
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        payload = {"generated_at": time.time(), "entries": {symbol: list(value) for symbol, value in entries.items()}}
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".symbol_index.")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(payload, f, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+    def reload_if_changed(self) -> bool:
+        """
+        Reloads the file if it is newer than the loaded index, checking at most every
+        SYMBOL_INDEX_RELOAD_CHECK_SECONDS. Blocking; call it from a thread or a worker process.
+        """
+        now = time.monotonic()
+        if now - self._last_check < settings.SYMBOL_INDEX_RELOAD_CHECK_SECONDS:
+            return False
+        self._last_check = now
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return False
+        if self._loaded_mtime is None or mtime > self._loaded_mtime:
+            return self.load()
+        return False
+
+    async def start(self) -> None:
+        """Loads the index and then watches the file for updates, both off the event loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._watch())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _watch(self) -> None:
+        await asyncio.to_thread(self.load)
+        while True:
+            await asyncio.sleep(settings.SYMBOL_INDEX_RELOAD_CHECK_SECONDS)
+            try:
+                await asyncio.to_thread(self.reload_if_changed)
+            except Exception as e:
+                logger.error(f"Symbol index reload check failed: {e}")
+
+
+symbol_index = SymbolIndex(settings.SYMBOL_INDEX_PATH)
@@ -16,9 +16,21 @@ celery_app.conf.update(
     enable_utc=True,
 
     beat_schedule={
-        'update-crypto-prices-every-30-mins': {
-            'task': 'app.worker.tasks.update_all_crypto_prices',
-            'schedule': 60.0,
+        'refresh-due-prices': {
+            'task': 'app.worker.tasks.refresh_due_prices',
+            'schedule': settings.REFRESH_TICK_SECONDS,
+        },
+        'plan-refresh-tiers': {
+            'task': 'app.worker.tasks.plan_refresh_tiers',
+            'schedule': settings.REFRESH_PLAN_SECONDS,
+        },
+        'refresh-market-data': {
+            'task': 'app.worker.tasks.refresh_market_data',
+            'schedule': settings.MARKET_DATA_REFRESH_SECONDS,
+        },
+        'refresh-symbol-index': {
+            'task': 'app.worker.tasks.refresh_symbol_index',
+            'schedule': settings.SYMBOL_INDEX_REFRESH_SECONDS,
         },
     },
 )
@@ -1,58 +1,317 @@
 import logging
-from typing import Dict, Any
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List
 
+import redis
+from celery import chord
+from celery.signals import celeryd_init, worker_ready, worker_process_shutdown, task_prerun, task_postrun
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.locks import RedisLock
+from app.core.redis_client import get_redis
 from app.worker.celery_app import celery_app
 from app.db.base import SessionLocal
 from app.crud import crud_crypto
-from app.services import coingecko
+from app.services import coingecko, price_snapshot, price_stream, refresh_scheduler
+from app.services.symbol_index import symbol_index, build_entries
 
 logger = logging.getLogger(__name__)
 
 
+PRICE_REFRESH_LOCK_NAME = "price_refresh"
+
+
+def _acquire_refresh_lock():
+    """Returns (lock, None) when acquired, or (None, skip result) while a previous run holds it."""
+    lock = RedisLock(get_redis, PRICE_REFRESH_LOCK_NAME, ttl_seconds=settings.PRICE_REFRESH_LOCK_TTL)
+    try:
+        if not lock.acquire():
+            logger.info("Previous price refresh is still running; skipping this tick.")
+            return None, {"message": "Previous price refresh still in progress; skipped."}
+    except redis.RedisError as e:
+        logger.error(f"Price refresh lock unavailable, skipping this tick: {e}")
+        return None, {"message": "Price refresh lock unavailable; skipped."}
+    return lock, None
+
+
+def _dispatch_chunks(chunks: List[List[str]], symbols_by_cg_id: Dict[str, str], lock: RedisLock) -> None:
+    """Runs one update_price_chunk per chunk as a chord whose callback releases `lock`."""
+    chord(
+        update_price_chunk.s({cg_id: symbols_by_cg_id[cg_id] for cg_id in chunk if cg_id in symbols_by_cg_id})
+        for chunk in chunks
+    )(finalize_price_refresh.s(lock_token=lock.token))
+
+
 @celery_app.task(acks_late=True)
 def update_all_crypto_prices():
     """
-    Celery task to fetch current prices for all tracked cryptocurrencies
-    from CoinGecko and update them in the database.
+    Celery task refreshing the prices of all tracked cryptocurrencies at once, regardless of their tier.
+    Splits the coingecko_ids into /simple/price-sized chunks and dispatches one update_price_chunk
+    subtask per chunk as a chord, so chunks run in parallel across workers and
+    finalize_price_refresh aggregates their reports. A Redis lock, released by the chord callback
+    (or expiring after PRICE_REFRESH_LOCK_TTL), skips ticks while the previous run is in progress.
     """
-    logger.info("Starting periodic task: update_all_crypto_prices")
-    db = SessionLocal()
-    updated_count = 0
-    try:
+    logger.info("Starting task: update_all_crypto_prices")
+    lock, skipped = _acquire_refresh_lock()
+    if lock is None:
+        return skipped
 
-        coingecko_ids = crud_crypto.get_all_crypto_coingecko_ids(db)
-        if not coingecko_ids:
+    try:
+        db = SessionLocal()
+        try:
+            symbols_by_cg_id = crud_crypto.get_all_crypto_coingecko_id_map(db)
+        finally:
+            db.close()
+        if not symbols_by_cg_id:
             logger.info("No cryptocurrencies with coingecko_ids found in DB. Skipping price update.")
+            lock.release()
             return {"message": "No coins to update."}
 
-        logger.info(f"Found {len(coingecko_ids)} coingecko_ids to update prices for.")
+        chunks = coingecko.price_chunks(list(symbols_by_cg_id), settings.PRICE_QUOTE_CURRENCIES)
+        logger.info(f"Dispatching {len(chunks)} price chunks for {len(symbols_by_cg_id)} coingecko_ids.")
+        _dispatch_chunks(chunks, symbols_by_cg_id, lock)
+    except Exception as e:
+        logger.error(f"Error during update_all_crypto_prices task: {e}", exc_info=True)
+        lock.release()
+        raise
+
+    return {"message": f"Dispatched {len(chunks)} price chunks.", "chunks": len(chunks),
+            "coins": len(symbols_by_cg_id)}
+
+
+@celery_app.task(acks_late=True)
+def plan_refresh_tiers():
+    """
+    Periodic task assigning every tracked coin a refresh tier (hot, warm or cold) from its API read
+    count and its USD price range over REFRESH_VOLATILITY_WINDOW_SECONDS.
+    """
+    db = SessionLocal()
+    try:
+        symbols_by_cg_id = crud_crypto.get_all_crypto_coingecko_id_map(db)
+        since = datetime.now(timezone.utc) - timedelta(seconds=settings.REFRESH_VOLATILITY_WINDOW_SECONDS)
+        volatility = crud_crypto.get_price_volatility(db, since=since)
+    finally:
+        db.close()
+
+    try:
+        tiers = refresh_scheduler.plan(symbols_by_cg_id, volatility)
+    except redis.RedisError as e:
+        logger.error(f"Could not store refresh tiers: {e}")
+        return {"message": "Refresh scheduler unavailable; tiers not updated."}
+    logger.info(f"Refresh tiers: {tiers}")
+    return {"message": f"Assigned refresh tiers to {len(symbols_by_cg_id)} coins.", "tiers": tiers}
+
 
-        prices_data = coingecko.get_prices(coingecko_ids=coingecko_ids, vs_currency="usd")
+@celery_app.task(acks_late=True)
+def refresh_due_prices():
+    """
+    Periodic task (every REFRESH_TICK_SECONDS) refreshing the coins whose tier interval has elapsed,
+    hottest first, in at most refresh_scheduler.requests_per_tick() chunks so upstream calls stay within
+    REFRESH_REQUEST_BUDGET_PER_MINUTE. Shares the refresh lock with update_all_crypto_prices: a tick
+    is skipped while the previous chord is still running.
+    """
+    lock, skipped = _acquire_refresh_lock()
+    if lock is None:
+        return skipped
 
-        if not prices_data:
-            logger.warning("Received no price data from CoinGecko.")
-            return {"message": "Failed to fetch price data from CoinGecko."}
+    try:
+        if not refresh_scheduler.is_planned():
+            plan_refresh_tiers.run()
+        chunks = refresh_scheduler.take_due(refresh_scheduler.requests_per_tick())
+        if not chunks:
+            lock.release()
+            return {"message": "No coins due.", "chunks": 0, "coins": 0}
 
-        updates_for_db: Dict[str, Dict[str, Any]] = {}
-        for cg_id, price_info in prices_data.items():
-            if "usd" in price_info:
-                updates_for_db[cg_id] = {"current_price_usd": price_info["usd"]}
-            else:
-                logger.warning(f"USD price not found for coingecko_id: {cg_id}")
+        db = SessionLocal()
+        try:
+            symbols_by_cg_id = crud_crypto.get_all_crypto_coingecko_id_map(db)
+        finally:
+            db.close()
+        _dispatch_chunks(chunks, symbols_by_cg_id, lock)
+    except Exception as e:
+        logger.error(f"Error during refresh_due_prices task: {e}", exc_info=True)
+        lock.release()
+        raise
 
-        if not updates_for_db:
-            logger.info("No prices found in the expected format from CoinGecko response.")
-            return {"message": "No valid price data to update."}
+    coins = sum(len(chunk) for chunk in chunks)
+    return {"message": f"Dispatched {len(chunks)} price chunks.", "chunks": len(chunks), "coins": coins}
 
-        logger.info(f"Attempting to update coin_metadata for {len(updates_for_db)} cryptocurrencies.")
-        updated_count = crud_crypto.update_crypto_metadata_batch(db=db, updates=updates_for_db)
-        logger.info(f"Successfully updated coin_metadata for {updated_count} cryptocurrencies.")
 
+@celery_app.task(acks_late=True)
+def update_price_chunk(symbols_by_cg_id: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Celery subtask refreshing one chunk: a single /simple/price request for every PRICE_QUOTE_CURRENCIES
+    quote, one batch metadata update, price history rows and a price stream publish of the coins whose
+    quotes changed.
+    Never raises, so a failing chunk cannot prevent the chord callback; failures are reported instead.
+    """
+    coingecko_ids = list(symbols_by_cg_id)
+    report: Dict[str, Any] = {"updated": 0, "history": 0, "failed_ids": [], "error": None}
+
+    batch = coingecko.get_prices_batched(coingecko_ids=coingecko_ids, vs_currency=settings.PRICE_QUOTE_CURRENCIES)
+    if batch.failed_chunks:
+        report["failed_ids"] = batch.failed_ids
+        report["error"] = batch.failed_chunks[0].error
+    updates_for_db = {cg_id: coingecko.price_metadata(price_info)
+                      for cg_id, price_info in batch.prices.items() if price_info}
+    if not updates_for_db:
+        return report
+
+    db = SessionLocal()
+    try:
+        stored = crud_crypto.get_metadata_by_coingecko_ids(db, list(updates_for_db))
+        changed = [cg_id for cg_id, metadata in updates_for_db.items()
+                   if any(stored.get(cg_id, {}).get(key) != value for key, value in metadata.items())]
+        report["updated"] = crud_crypto.update_crypto_metadata_batch(db=db, updates=updates_for_db)
+        metrics.PRICE_UPDATE_ROWS.inc(report["updated"])
+        report["history"] = crud_crypto.insert_price_history(
+            db=db, prices_usd={cg_id: price_info["usd"] for cg_id, price_info in batch.prices.items()
+                               if cg_id in updates_for_db and "usd" in price_info})
     except Exception as e:
-        logger.error(f"Error during update_all_crypto_prices task: {e}", exc_info=True)
+        db.rollback()
+        logger.error(f"Error writing price chunk of {len(coingecko_ids)} ids: {e}", exc_info=True)
+        report["failed_ids"] = coingecko_ids
+        report["error"] = repr(e)
+        return report
+    finally:
+        db.close()
+
+    # Only coins with at least one changed quote are pushed to streaming clients, with all their quotes.
+    price_stream.publish_prices({symbols_by_cg_id[cg_id]: batch.prices[cg_id]
+                                 for cg_id in changed if cg_id in symbols_by_cg_id})
+    return report
+
 
+def publish_price_snapshot() -> None:
+    """Writes every coin's latest quotes to PRICE_SNAPSHOT_PATH for the API's /{symbol}/price. Never raises."""
+    db = SessionLocal()
+    try:
+        rows = [
+            price_snapshot.SnapshotRow(
+                id=crypto_id, symbol=symbol, updated_at=updated_at.timestamp() if updated_at else None,
+                prices={currency: float(price) for currency in settings.PRICE_QUOTE_CURRENCIES
+                        if isinstance(price := (metadata or {}).get(f"current_price_{currency}"), (int, float))})
+            for crypto_id, symbol, updated_at, metadata in crud_crypto.get_latest_prices(db)
+        ]
+        price_snapshot.write(settings.PRICE_SNAPSHOT_PATH, rows, settings.PRICE_QUOTE_CURRENCIES)
+    except Exception as e:
+        logger.error(f"Could not publish price snapshot to {settings.PRICE_SNAPSHOT_PATH}: {e}", exc_info=True)
+    finally:
+        db.close()
+
+
+@celery_app.task(acks_late=True)
+def finalize_price_refresh(reports: List[Dict[str, Any]], lock_token: str) -> Dict[str, Any]:
+    """
+    Chord callback: aggregates the chunk reports, republishes the price snapshot when prices changed
+    and releases the refresh lock.
+    """
+    updated = sum(report["updated"] for report in reports)
+    history = sum(report["history"] for report in reports)
+    failed = [report for report in reports if report["failed_ids"]]
+    failed_ids = [cg_id for report in failed for cg_id in report["failed_ids"]]
+    if failed:
+        logger.warning(f"{len(failed)} of {len(reports)} price chunks failed ({len(failed_ids)} coingecko_ids).")
+    logger.info(f"Price refresh updated {updated} records and recorded {history} price history rows.")
+
+    if updated:
+        publish_price_snapshot()
+
+    try:
+        RedisLock(get_redis, PRICE_REFRESH_LOCK_NAME, ttl_seconds=settings.PRICE_REFRESH_LOCK_TTL,
+                  token=lock_token).release()
+    except redis.RedisError as e:
+        logger.warning(f"Could not release price refresh lock (it expires on its own): {e}")
+
+    return {"message": f"Price update task completed. Updated {updated} records.",
+            "updated": updated, "failed_chunks": len(failed), "failed_ids": failed_ids}
+
+
+@celery_app.task(acks_late=True)
+def refresh_market_data():
+    """
+    Periodic task keeping image, market cap and rank current for every tracked coin, with the same
+    batched /coins/markets call the create path uses (up to MARKETS_PER_PAGE coins per request).
+    """
+    db = SessionLocal()
+    try:
+        coingecko_ids = list(crud_crypto.get_all_crypto_coingecko_id_map(db))
+        if not coingecko_ids:
+            return {"message": "No coins to update."}
+
+        batch = coingecko.get_markets_batched(coingecko_ids)
+        if batch.failed_chunks:
+            logger.warning(f"{len(batch.failed_chunks)} of {batch.chunk_count} market chunks failed "
+                           f"({len(batch.failed_ids)} coingecko_ids).")
+        updated = crud_crypto.update_crypto_metadata_batch(db=db, updates=batch.prices)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error during refresh_market_data task: {e}", exc_info=True)
         raise
     finally:
         db.close()
 
-    return {"message": f"Price update task completed. Updated {updated_count} records."}
+    logger.info(f"Market data refreshed for {updated} records in {batch.chunk_count} requests.")
+    return {"message": f"Market data refreshed for {updated} records.", "updated": updated,
+            "failed_ids": batch.failed_ids}
+
+
+@celery_app.task(acks_late=True)
+def refresh_symbol_index():
+    """
+    Celery task to rebuild the local symbol index from the CoinGecko coin list,
+    ranking symbol collisions by market cap, and persist it for the API processes.
+    """
+    logger.info("Starting periodic task: refresh_symbol_index")
+    coins = coingecko.get_coins_list()
+    if not coins:
+        logger.warning("Received no coin list from CoinGecko; keeping the existing symbol index.")
+        return {"message": "Failed to fetch coin list from CoinGecko."}
+
+    ranks = coingecko.get_market_cap_ranks(pages=settings.SYMBOL_INDEX_RANKED_PAGES)
+    entries = build_entries(coins, ranks)
+    symbol_index.replace(entries)
+    logger.info(f"Symbol index rebuilt with {len(entries)} symbols ({len(ranks)} ranked coins).")
+    return {"message": f"Symbol index refreshed with {len(entries)} symbols."}
+
+
+@worker_ready.connect
+def build_missing_symbol_index(**kwargs):
+    """Builds the symbol index on worker start when none has been persisted yet."""
+    if not os.path.exists(settings.SYMBOL_INDEX_PATH):
+        refresh_symbol_index.delay()
+
+
+_task_started_at: Dict[str, float] = {}
+
+
+@celeryd_init.connect
+def reset_worker_metrics(**kwargs):
+    """Drops multiprocess metric files of a previous worker run before the pool processes start."""
+    metrics.clear_multiprocess_dir()
+
+
+@worker_ready.connect
+def start_worker_metrics_server(**kwargs):
+    metrics.start_metrics_server(settings.METRICS_WORKER_PORT)
+
+
+@worker_process_shutdown.connect
+def mark_worker_process_dead(pid=None, **kwargs):
+    metrics.mark_process_dead(pid or os.getpid())
+
+
+@task_prerun.connect
+def record_task_start(task_id=None, **kwargs):
+    _task_started_at[task_id] = time.perf_counter()
+
+
+@task_postrun.connect
+def record_task_duration(task_id=None, task=None, state=None, **kwargs):
+    started = _task_started_at.pop(task_id, None)
+    if started is not None and task is not None:
+        metrics.CELERY_TASK_DURATION.labels(task=task.name, state=state or "UNKNOWN").observe(
+            time.perf_counter() - started)
@@ -0,0 +1,26 @@
+from unittest.mock import patch
+
+from fastapi import status
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+
+from app.api.routers import health
+from app.core.startup import startup_state
+
+
+def test_liveness_does_not_depend_on_startup(client: TestClient):
+    with patch.object(startup_state, "schema_ready", False):
+        assert client.get("/health/live").status_code == status.HTTP_200_OK
+
+
+def test_readiness_waits_for_schema(client: TestClient):
+    with patch.object(health, "engine", create_engine("sqlite://")):
+        with patch.object(startup_state, "schema_ready", False):
+            response = client.get("/health/ready")
+            assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+            assert response.json()["checks"]["database"] is True
+
+        with patch.object(startup_state, "schema_ready", True):
+            response = client.get("/health/ready")
+            assert response.status_code == status.HTTP_200_OK
+            assert response.json()["status"] == "ready"
@@ -1,12 +1,22 @@
+import asyncio
+import json
+
+import httpx
 import pytest
-from unittest.mock import patch, MagicMock
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch, MagicMock, AsyncMock
 from fastapi import status
 from fastapi.testclient import TestClient
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
 from app.crud import crud_crypto
 from app.db import models
+from app.main import app as main_app
+from app.api.routers import crypto as crypto_router
+from app.services import coingecko
+from app.services.price_snapshot import PriceSnapshot, SnapshotRow, write
 
 API_V1_STR = settings.API_V1_STR
 CRYPTO_ENDPOINT = f"{API_V1_STR}/cryptocurrencies"
@@ -14,8 +24,8 @@ CRYPTO_ENDPOINT = f"{API_V1_STR}/cryptocurrencies"
 
 @pytest.fixture(autouse=True)
 def mock_coingecko_search():
-    """Mocks coingecko.search_coin to return a predefined result."""
-    with patch("app.api.routers.crypto.coingecko.search_coin") as mock_search:
+    """Mocks coingecko.search_coin_async to return a predefined result."""
+    with patch("app.api.routers.crypto.coingecko.search_coin_async", new_callable=AsyncMock) as mock_search:
         def side_effect(symbol):
             if symbol.upper() == "BTC":
                 return ("bitcoin", "Bitcoin")
@@ -31,25 +41,14 @@ def mock_coingecko_search():
 
 
 @pytest.fixture(autouse=True)
-def mock_coingecko_prices():
-    """Mocks coingecko.get_prices to return predefined prices."""
-    with patch("app.api.routers.crypto.coingecko.get_prices") as mock_prices:
-        mock_prices.return_value = {
-            "bitcoin": {"usd": 100000.0},
-            "ethereum": {"usd": 2000.0},
-        }
-        yield mock_prices
-
-
-@pytest.fixture(autouse=True)
-def mock_coingecko_details():
-    """Mocks coingecko.get_coin_details to return predefined details."""
-    with patch("app.api.routers.crypto.coingecko.get_coin_details") as mock_details:
-        mock_details.return_value = {
-            "image": {"thumb": "http://example.com/thumb.png", "small": "http://example.com/small.png",
-                      "large": "http://example.com/large.png"}
-        }
-        yield mock_details
+def mock_coingecko_markets():
+    """Mocks coingecko.get_markets_or_stale_async to return predefined, fresh market data."""
+    with patch("app.api.routers.crypto.coingecko.get_markets_or_stale_async", new_callable=AsyncMock) as mock_markets:
+        mock_markets.return_value = ({
+            "ethereum": {"current_price_usd": 2000.0, "image": "http://example.com/large.png",
+                         "market_cap_usd": 240000000000.0, "market_cap_rank": 2},
+        }, {})
+        yield mock_markets
 
 
 @pytest.fixture
@@ -79,7 +78,7 @@ def test_crypto_eth(db_session: Session) -> models.Cryptocurrency:
 
 
 def test_create_cryptocurrency_success(client: TestClient, db_session: Session, mock_coingecko_search: MagicMock,
-                                       mock_coingecko_prices: MagicMock, mock_coingecko_details: MagicMock):
+                                       mock_coingecko_markets: MagicMock):
     """Test successful creation of a new cryptocurrency (e.g., ETH)."""
     crypto_data = {"symbol": "ETH", "note": "My Ethereum"}
     response = client.post(CRYPTO_ENDPOINT + "/", json=crypto_data)
@@ -92,11 +91,11 @@ def test_create_cryptocurrency_success(client: TestClient, db_session: Session,
     assert data["note"] == "My Ethereum"
     assert "current_price_usd" in data["coin_metadata"]
     assert data["coin_metadata"]["current_price_usd"] == 2000.0
-    assert "image" in data["coin_metadata"]
+    assert data["coin_metadata"]["image"] == "http://example.com/large.png"
+    assert data["coin_metadata"]["market_cap_rank"] == 2
 
     mock_coingecko_search.assert_called_once_with(symbol="ETH")
-    mock_coingecko_prices.assert_called_once_with(coingecko_ids=["ethereum"], vs_currency="usd")
-    mock_coingecko_details.assert_called_once_with(coingecko_id="ethereum")
+    mock_coingecko_markets.assert_called_once_with(coingecko_ids=["ethereum"])
 
     db_obj = crud_crypto.get_crypto(db_session, symbol="ETH")
     assert db_obj is not None
@@ -154,6 +153,28 @@ def test_read_cryptocurrencies_pagination(client: TestClient, test_crypto_btc: m
     assert len(data) == 2
 
 
+def test_read_cryptocurrencies_sorted_by_price(client: TestClient, db_session: Session,
+                                              test_crypto_btc: models.Cryptocurrency,
+                                              test_crypto_eth: models.Cryptocurrency):
+    """Test sorting and range-filtering the list by the typed price column, paging with its cursor."""
+    crud_crypto.create_crypto(db=db_session, symbol="ADA", name="Cardano", coingecko_id="cardano",
+                              coin_metadata={"current_price_usd": 0.5})
+    crud_crypto.create_crypto(db=db_session, symbol="NEW", name="New", coingecko_id="new", coin_metadata={})
+
+    first = client.get(CRYPTO_ENDPOINT + "/", params={"sort": "price_usd", "order": "desc", "limit": 2})
+    cursor = first.headers["X-Next-Cursor"]
+    rest = client.get(CRYPTO_ENDPOINT + "/", params={"sort": "price_usd", "order": "desc", "limit": 2,
+                                                     "cursor": cursor})
+    filtered = client.get(CRYPTO_ENDPOINT + "/", params={"min_price_usd": 1, "max_price_usd": 5000})
+
+    assert [row["symbol"] for row in first.json()] == ["BTC", "ETH"]
+    assert [row["symbol"] for row in rest.json()] == ["ADA"]
+    assert [row["symbol"] for row in filtered.json()] == ["ETH"]
+    assert client.get(CRYPTO_ENDPOINT + "/", params={"cursor": cursor}).status_code == status.HTTP_400_BAD_REQUEST
+    assert client.get(CRYPTO_ENDPOINT + "/", params={"min_price_usd": 2, "max_price_usd": 1}).status_code == \
+        status.HTTP_400_BAD_REQUEST
+
+
 def test_read_cryptocurrency_success(client: TestClient, test_crypto_btc: models.Cryptocurrency):
     """Test retrieving a specific cryptocurrency by symbol."""
     response = client.get(f"{CRYPTO_ENDPOINT}/{test_crypto_btc.symbol}")
@@ -171,6 +192,41 @@ def test_read_cryptocurrency_not_found(client: TestClient):
     assert "not found" in response.json()["detail"]
 
 
+def test_read_cryptocurrency_price_from_snapshot(client: TestClient, tmp_path):
+    """Test reading latest quotes from the published price snapshot, without touching the database."""
+    path = str(tmp_path / "prices.bin")
+    with patch.object(crypto_router, "price_snapshot", PriceSnapshot(path)):
+        assert client.get(f"{CRYPTO_ENDPOINT}/BTC/price").status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+
+    write(path, [SnapshotRow(id=1, symbol="BTC", updated_at=1700000000.0, prices={"usd": 50000.0})], ["usd", "eur"])
+    with patch.object(crypto_router, "price_snapshot", PriceSnapshot(path)):
+        response = client.get(f"{CRYPTO_ENDPOINT}/btc/price", params={"currency": "eur"})
+        missing = client.get(f"{CRYPTO_ENDPOINT}/ETH/price")
+
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert (data["symbol"], data["prices"], data["currency"], data["price"]) == ("BTC", {"usd": 50000.0}, "eur", None)
+    assert data["updated_at"] == "2023-11-14T22:13:20Z"
+    assert missing.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_read_price_of_coin_created_after_the_snapshot(client: TestClient, tmp_path):
+    """A coin created since the last published snapshot is quoted from its database row."""
+    path = str(tmp_path / "prices.bin")
+    write(path, [SnapshotRow(id=1, symbol="BTC", updated_at=1700000000.0, prices={"usd": 50000.0})], ["usd"])
+    assert client.post(CRYPTO_ENDPOINT + "/", json={"symbol": "ETH"}).status_code == status.HTTP_201_CREATED
+
+    with patch.object(crypto_router, "price_snapshot", PriceSnapshot(path)), \
+            patch.object(crypto_router.refresh_scheduler.read_buffer, "add") as add_read:
+        response = client.get(f"{CRYPTO_ENDPOINT}/eth/price", params={"currency": "usd"})
+
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert (data["symbol"], data["prices"]["usd"], data["price"]) == ("ETH", 2000.0, 2000.0)
+    assert data["snapshot_generated_at"] is None
+    add_read.assert_called_once_with("eth")
+
+
 def test_update_cryptocurrency_success(client: TestClient, test_crypto_btc: models.Cryptocurrency, db_session: Session):
     """Test successfully updating a cryptocurrency's note."""
     update_data = {"note": "Updated BTC note"}
@@ -210,3 +266,163 @@ def test_delete_cryptocurrency_not_found(client: TestClient):
     response = client.delete(f"{CRYPTO_ENDPOINT}/NONEXISTENT")
     assert response.status_code == status.HTTP_404_NOT_FOUND
     assert "not found" in response.json()["detail"]
+
+
+def test_create_cryptocurrencies_bulk(client: TestClient, db_session: Session, test_crypto_btc: models.Cryptocurrency):
+    """Test bulk creation reports a status per symbol and inserts only new coins."""
+    batch = coingecko.PriceBatchResult(prices={"ethereum": {"current_price_usd": 2000.0, "market_cap_rank": 2},
+                                               "ada_id": {"current_price_usd": 0.5}}, chunk_count=1)
+    with patch("app.api.routers.crypto.coingecko.get_markets_batched_async", new_callable=AsyncMock,
+               return_value=batch) as mock_batched:
+        response = client.post(CRYPTO_ENDPOINT + "/bulk", json={"items": [
+            {"symbol": "eth", "note": "Ether"}, {"symbol": "BTC"}, {"symbol": "UNKNOWN"},
+            {"symbol": "ADA"}, {"symbol": "ETH"},
+        ]})
+
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["created"] == 2
+    assert [item["status"] for item in data["results"]] == ["created", "exists", "not_found", "created", "duplicate"]
+    assert data["results"][0]["crypto"]["coin_metadata"]["current_price_usd"] == 2000.0
+    assert data["results"][0]["crypto"]["note"] == "Ether"
+    assert data["results"][0]["crypto"]["coin_metadata"]["market_cap_rank"] == 2
+    mock_batched.assert_called_once_with(["ethereum", "ada_id"])
+
+    assert crud_crypto.get_crypto(db_session, symbol="ADA") is not None
+
+
+def test_create_cryptocurrencies_bulk_survives_concurrent_insert(client: TestClient):
+    """Test rows claimed by a concurrent create between the check and the insert are reported as existing."""
+    batch = coingecko.PriceBatchResult(
+        prices={"bitcoin": {"current_price_usd": 1.0}}, chunk_count=2,
+        failed_chunks=[coingecko.ChunkFailure(coingecko_ids=["ethereum"], error="ReadTimeout()")])
+    eth = models.Cryptocurrency(id=7, symbol="ETH", name="Ethereum", coingecko_id="ethereum", coin_metadata={},
+                                note=None, last_updated_coingecko=datetime.now())
+    with patch("app.api.routers.crypto.coingecko.search_coins_async", new_callable=AsyncMock,
+               return_value={"ETH": ("ethereum", "Ethereum"), "BTC": ("bitcoin", "Bitcoin")}), \
+            patch("app.api.routers.crypto.coingecko.get_markets_batched_async", new_callable=AsyncMock,
+                  return_value=batch), \
+            patch("app.api.routers.crypto.crud_crypto.get_existing_symbols_and_coingecko_ids",
+                  side_effect=[(set(), {}), ({"BTC"}, {"bitcoin": "BTC"})]), \
+            patch("app.api.routers.crypto.crud_crypto.create_cryptos_bulk",
+                  side_effect=[IntegrityError("INSERT", {}, Exception("UNIQUE constraint failed")), [eth]]) as create:
+        response = client.post(CRYPTO_ENDPOINT + "/bulk", json={"items": [{"symbol": "ETH"}, {"symbol": "BTC"}]})
+
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["created"] == 1
+    assert [item["status"] for item in data["results"]] == ["created", "exists"]
+    assert "Market data could not be fetched" in data["results"][0]["detail"]
+    assert [row["symbol"] for row in create.call_args.kwargs["rows"]] == ["ETH"]
+
+
+def test_read_cryptocurrency_history(client: TestClient, db_session: Session, test_crypto_btc: models.Cryptocurrency):
+    """Test price history is returned as hourly OHLC candles."""
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    ticks = [(0, 10.0), (10, 14.0), (20, 9.0), (50, 12.0), (70, 20.0), (80, 18.0)]
+    for minutes, price in ticks:
+        crud_crypto.insert_price_history(db_session, {"bitcoin": price}, recorded_at=base + timedelta(minutes=minutes))
+
+    response = client.get(f"{CRYPTO_ENDPOINT}/BTC/history", params={
+        "interval": "1h", "start": base.isoformat(), "end": (base + timedelta(hours=2)).isoformat()})
+
+    assert response.status_code == status.HTTP_200_OK
+    candles = response.json()["candles"]
+    assert [(c["open"], c["high"], c["low"], c["close"], c["samples"]) for c in candles] == [
+        (10.0, 14.0, 9.0, 12.0, 4),
+        (20.0, 20.0, 18.0, 18.0, 2),
+    ]
+    assert candles[1]["bucket_start"].startswith("2024-01-01T01:00:00")
+
+
+def test_read_cryptocurrencies_cursor_pagination(client: TestClient, test_crypto_btc: models.Cryptocurrency,
+                                                 test_crypto_eth: models.Cryptocurrency):
+    """Test keyset pagination follows the X-Next-Cursor header without gaps or repeats."""
+    client.post(CRYPTO_ENDPOINT + "/", json={"symbol": "ADA"})
+
+    first = client.get(CRYPTO_ENDPOINT + "/?limit=2")
+    assert [item["symbol"] for item in first.json()] == ["BTC", "ETH"]
+    cursor = first.headers["X-Next-Cursor"]
+
+    second = client.get(CRYPTO_ENDPOINT + "/", params={"limit": 2, "cursor": cursor})
+    assert [item["symbol"] for item in second.json()] == ["ADA"]
+    assert "X-Next-Cursor" not in second.headers
+
+    assert client.get(CRYPTO_ENDPOINT + "/", params={"cursor": "not-a-cursor"}).status_code == 400
+
+
+def test_export_cryptocurrencies_ndjson(client: TestClient, test_crypto_btc: models.Cryptocurrency,
+                                        test_crypto_eth: models.Cryptocurrency):
+    """Test the export endpoint streams one JSON document per line."""
+    response = client.get(CRYPTO_ENDPOINT + "/export")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["symbol"] for line in lines] == ["BTC", "ETH"]
+
+
+def test_read_cryptocurrency_case_insensitive_without_wildcards(client: TestClient,
+                                                                 test_crypto_btc: models.Cryptocurrency):
+    """Test symbol lookup ignores case but treats % and _ literally."""
+    assert client.get(f"{CRYPTO_ENDPOINT}/btc").json()["symbol"] == "BTC"
+    assert client.get(f"{CRYPTO_ENDPOINT}/B%25").status_code == status.HTTP_404_NOT_FOUND
+    assert client.get(f"{CRYPTO_ENDPOINT}/B_C").status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_read_cryptocurrencies_in_quote_currency(client: TestClient, test_crypto_btc: models.Cryptocurrency,
+                                                 test_crypto_eth: models.Cryptocurrency):
+    """Test ?currency= adds the requested quote and rejects unsupported currencies."""
+    listing = client.get(f"{CRYPTO_ENDPOINT}/", params={"currency": "USD"}).json()
+    assert [(item["symbol"], item["currency"], item["price"]) for item in listing] == [
+        ("BTC", "usd", 100000.0), ("ETH", "usd", 2000.0)]
+
+    single = client.get(f"{CRYPTO_ENDPOINT}/BTC", params={"currency": "eur"}).json()
+    assert single["currency"] == "eur"
+    assert single["price"] is None
+    assert "price" not in client.get(f"{CRYPTO_ENDPOINT}/BTC").json()
+
+    response = client.get(f"{CRYPTO_ENDPOINT}/BTC", params={"currency": "xyz"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_concurrent_creates_of_same_symbol_share_one_resolution(db_session: Session, mock_coingecko_search: MagicMock,
+                                                                mock_coingecko_markets: MagicMock):
+    """Test duplicate creates in flight together resolve upstream once and the losers get a clean 400."""
+    async def slow_search(symbol):
+        await asyncio.sleep(0.05)
+        return ("ethereum", "Ethereum")
+
+    mock_coingecko_search.side_effect = slow_search
+
+    async def create_twice():
+        transport = httpx.ASGITransport(app=main_app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as async_client:
+            return await asyncio.gather(*(async_client.post(CRYPTO_ENDPOINT + "/", json={"symbol": "eth"})
+                                          for _ in range(3)))
+
+    responses = asyncio.run(create_twice())
+
+    assert sorted(response.status_code for response in responses) == [201, 400, 400]
+    mock_coingecko_search.assert_awaited_once()
+    mock_coingecko_markets.assert_awaited_once()
+
+
+def test_create_cryptocurrency_unique_violation_is_clean_400(client: TestClient, test_crypto_btc: models.Cryptocurrency,
+                                                              mock_coingecko_search: MagicMock):
+    """Test a row inserted by an uncoordinated concurrent create surfaces as 400, not an unhandled error."""
+    mock_coingecko_search.side_effect = lambda symbol: ("bitcoin-fork", "Bitcoin Fork")
+    with patch("app.api.routers.crypto.crud_crypto.get_crypto", return_value=None):
+        response = client.post(CRYPTO_ENDPOINT + "/", json={"symbol": "BTC"})
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "already exists" in response.json()["detail"]
+
+
+def test_create_cryptocurrency_flags_stale_market_data(client: TestClient, mock_coingecko_markets: MagicMock):
+    """Test a create served from last-known market data says so in X-Stale-Data-Age."""
+    mock_coingecko_markets.return_value = ({"ethereum": {"current_price_usd": 1900.0}}, {"ethereum": 125.7})
+    response = client.post(CRYPTO_ENDPOINT + "/", json={"symbol": "ETH"})
+
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.headers["X-Stale-Data-Age"] == "125"
+    assert response.json()["coin_metadata"] == {"current_price_usd": 1900.0}
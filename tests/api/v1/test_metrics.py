@@ -0,0 +1,50 @@
+from fastapi import status
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from app.core import metrics
+from app.core.config import settings
+
+CRYPTO_ENDPOINT = f"{settings.API_V1_STR}/cryptocurrencies"
+
+
+def _sample(name: str, labels: dict) -> float:
+    return metrics.REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_route_latency_is_labelled_with_route_template(client: TestClient):
+    labels = {"method": "GET", "route": f"{CRYPTO_ENDPOINT}/{{symbol}}", "status": "404"}
+    before = _sample("http_request_duration_seconds_count", labels)
+
+    assert client.get(f"{CRYPTO_ENDPOINT}/NOPE").status_code == status.HTTP_404_NOT_FOUND
+    assert client.get(f"{CRYPTO_ENDPOINT}/ALSONOPE").status_code == status.HTTP_404_NOT_FOUND
+
+    assert _sample("http_request_duration_seconds_count", labels) == before + 2
+    response = client.get("/metrics")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'route="/api/v1/cryptocurrencies/{symbol}"' in response.text
+
+
+def test_coingecko_details_paths_share_one_label():
+    assert metrics.coingecko_endpoint("/coins/bitcoin") == "/coins/{id}"
+    assert metrics.coingecko_endpoint("/coins/list") == "/coins/list"
+    assert metrics.coingecko_endpoint("/simple/price") == "/simple/price"
+
+
+def test_instrumented_engine_records_queries_and_checkouts():
+    engine = create_engine("sqlite://")
+    metrics.instrument_engine(engine)
+    selects = _sample("db_query_duration_seconds_count", {"operation": "SELECT"})
+    checkouts = _sample("db_pool_checkout_duration_seconds_count", {})
+
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+        try:
+            connection.execute(text("SELECT * FROM missing_table"))
+        except Exception:
+            pass
+        assert connection.info["query_started_at"] == []
+
+    assert _sample("db_query_duration_seconds_count", {"operation": "SELECT"}) == selects + 1
+    assert _sample("db_pool_checkout_duration_seconds_count", {}) == checkouts + 1
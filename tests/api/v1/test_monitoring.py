@@ -0,0 +1,13 @@
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+
+
+def test_read_circuit_breaker_reports_state(client: TestClient):
+    response = client.get(f"{settings.API_V1_STR}/monitoring/circuit-breaker")
+
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["name"] == "coingecko"
+    assert data["state"] in {"closed", "open", "half_open"}
@@ -1,30 +1,51 @@
 import sys
 import os
+import tempfile
 import pytest
 from typing import Generator, Any
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import NullPool, SingletonThreadPool
 
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'crypto_api'))
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
-from app.db.base import Base, get_db
+from app.db.base import Base, get_db, get_async_db
 from app.main import app as main_app
 from app.core.config import settings
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+# A named shared-cache in-memory database, so the async engine used by async routes sees the same tables.
+SQLALCHEMY_DATABASE_URL = "sqlite:///file:crypto_api_tests?mode=memory&cache=shared&uri=true"
+ASYNC_SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///file:crypto_api_tests?mode=memory&cache=shared&uri=true"
 
 os.environ["DATABASE_URL"] = SQLALCHEMY_DATABASE_URL
 settings.DATABASE_URL = SQLALCHEMY_DATABASE_URL
+settings.COINGECKO_RATE_LIMIT_ENABLED = False
+settings.RESPONSE_CACHE_ENABLED = False
+settings.REFRESH_TRACK_READS = False
+settings.PRICE_SNAPSHOT_PATH = os.path.join(tempfile.mkdtemp(prefix="crypto_api_tests_"), "price_snapshot.bin")
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False}
+    connect_args={"check_same_thread": False},
+    poolclass=SingletonThreadPool,
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# NullPool: TestClient runs each request on a fresh event loop, so async connections are never reused.
+async_engine = create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL, poolclass=NullPool)
+
+
+@event.listens_for(async_engine.sync_engine, "connect")
+def _read_uncommitted(dbapi_connection, connection_record):
+    """Lets async reads see rows written inside the (never committed) per-test transaction."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA read_uncommitted = 1")
+    cursor.close()
+
 
 @pytest.fixture(scope="session", autouse=True)
 def create_test_database():
@@ -52,7 +73,9 @@ def db_session() -> Generator[Session, Any, None]:
         yield db
     finally:
         db.close()
-        transaction.rollback()
+        # A rollback inside the test (e.g. after an IntegrityError) has already ended the transaction.
+        if transaction.is_active:
+            transaction.rollback()
         connection.close()
 
 
@@ -70,15 +93,25 @@ def override_get_db_dependency(db_session: Session):
 
             pass
 
+    async def _override_get_async_db():
+        async with AsyncSession(async_engine, expire_on_commit=False) as db:
+            yield db
+
     original_override = main_app.dependency_overrides.get(get_db)
+    original_async_override = main_app.dependency_overrides.get(get_async_db)
 
     main_app.dependency_overrides[get_db] = _override_get_db
+    main_app.dependency_overrides[get_async_db] = _override_get_async_db
     yield
 
     if original_override:
         main_app.dependency_overrides[get_db] = original_override
     else:
         main_app.dependency_overrides.pop(get_db, None)
+    if original_async_override:
+        main_app.dependency_overrides[get_async_db] = original_async_override
+    else:
+        main_app.dependency_overrides.pop(get_async_db, None)
 
 
 @pytest.fixture(scope="function")
@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.crud import crud_crypto
+
+
+def test_update_crypto_metadata_batch_merges_in_place(db_session: Session):
+    crud_crypto.create_crypto(db=db_session, symbol="BTC", name="Bitcoin", coingecko_id="bitcoin",
+                              coin_metadata={"current_price_usd": 1.0, "image": "btc.png"})
+    crud_crypto.create_crypto(db=db_session, symbol="ETH", name="Ethereum", coingecko_id="ethereum",
+                              coin_metadata=None)
+
+    updated = crud_crypto.update_crypto_metadata_batch(db_session, {
+        "bitcoin": {"current_price_usd": 2.0},
+        "ethereum": {"current_price_usd": 3.0},
+        "not-tracked": {"current_price_usd": 4.0},
+    })
+
+    assert updated == 2
+    assert crud_crypto.get_crypto(db_session, "BTC").coin_metadata == {"current_price_usd": 2.0, "image": "btc.png"}
+    assert crud_crypto.get_crypto(db_session, "ETH").coin_metadata == {"current_price_usd": 3.0}
+
+
+@pytest.mark.parametrize("set_based", [True, False])
+def test_update_crypto_metadata_batch_replaces_top_level_keys_and_keeps_nulls(db_session: Session, set_based: bool):
+    crud_crypto.create_crypto(db=db_session, symbol="BTC", name="Bitcoin", coingecko_id="bitcoin",
+                              coin_metadata={"current_price_usd": 1.0, "image": {"large": "a", "thumb": "b"},
+                                             "tags": ["pow"], "listed": True})
+
+    with patch.dict(crud_crypto.METADATA_MERGE_SQL, {} if set_based else {"sqlite": None}):
+        crud_crypto.update_crypto_metadata_batch(db_session, {
+            "bitcoin": {"current_price_usd": None, "image": {"large": "x"}, "listed": False},
+        })
+
+    assert crud_crypto.get_crypto(db_session, "BTC").coin_metadata == {
+        "current_price_usd": None, "image": {"large": "x"}, "tags": ["pow"], "listed": False}
+
+
+@pytest.mark.parametrize("set_based", [True, False])
+def test_update_crypto_metadata_batch_syncs_typed_columns(db_session: Session, set_based: bool):
+    crud_crypto.create_crypto(db=db_session, symbol="BTC", name="Bitcoin", coingecko_id="bitcoin",
+                              coin_metadata={"current_price_usd": 1.0, "market_cap_rank": 1})
+    crud_crypto.create_crypto(db=db_session, symbol="ETH", name="Ethereum", coingecko_id="ethereum",
+                              coin_metadata={"current_price_usd": 5.0, "market_cap_usd": 10.0})
+
+    with patch.dict(crud_crypto.METADATA_MERGE_SQL, {} if set_based else {"sqlite": None}):
+        crud_crypto.update_crypto_metadata_batch(db_session, {
+            "bitcoin": {"current_price_usd": 2},
+            "ethereum": {"market_cap_usd": None, "market_cap_rank": 2},
+        })
+
+    btc, eth = crud_crypto.get_crypto(db_session, "BTC"), crud_crypto.get_crypto(db_session, "ETH")
+    assert (btc.price_usd, btc.market_cap_usd, btc.market_cap_rank) == (2.0, None, 1)
+    assert (eth.price_usd, eth.market_cap_usd, eth.market_cap_rank) == (5.0, None, 2)
+
+
+def test_get_crypto_rows_sorts_and_filters_by_typed_columns(db_session: Session):
+    prices = {"A": 3.0, "B": 1.0, "C": 3.0, "D": None, "E": 10.0}
+    for symbol, price in prices.items():
+        crud_crypto.create_crypto(db=db_session, symbol=symbol, name=symbol, coingecko_id=symbol.lower(),
+                                  coin_metadata={"current_price_usd": price})
+
+    first = crud_crypto.get_crypto_rows(db_session, limit=2, sort_by="price_usd", descending=True,
+                                        ranges={"price_usd": (None, 5.0)})
+    last = first[-1]
+    rest = crud_crypto.get_crypto_rows(db_session, limit=2, sort_by="price_usd", descending=True,
+                                       ranges={"price_usd": (None, 5.0)},
+                                       after_id=last["id"], after_value=last["sort_value"])
+
+    assert [(row["symbol"], row["sort_value"]) for row in first] == [("C", 3.0), ("A", 3.0)]
+    assert [row["symbol"] for row in rest] == ["B"]
+
+
+def test_get_price_volatility_is_relative_range_within_window(db_session: Session):
+    crud_crypto.create_crypto(db=db_session, symbol="BTC", name="Bitcoin", coingecko_id="bitcoin", coin_metadata={})
+    crud_crypto.create_crypto(db=db_session, symbol="ETH", name="Ethereum", coingecko_id="ethereum", coin_metadata={})
+    now = datetime.now(timezone.utc)
+    crud_crypto.insert_price_history(db_session, {"bitcoin": 50.0, "ethereum": 10.0}, recorded_at=now - timedelta(hours=2))
+    crud_crypto.insert_price_history(db_session, {"bitcoin": 100.0}, recorded_at=now - timedelta(minutes=10))
+    crud_crypto.insert_price_history(db_session, {"bitcoin": 110.0}, recorded_at=now - timedelta(minutes=5))
+
+    volatility = crud_crypto.get_price_volatility(db_session, since=now - timedelta(hours=1))
+
+    assert volatility == {"bitcoin": pytest.approx(0.1)}
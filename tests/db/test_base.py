@@ -0,0 +1,18 @@
+from unittest.mock import patch
+
+from app.core.config import settings
+from app.db import base
+
+
+def test_async_database_url_defaults_to_asyncpg():
+    with patch.object(settings, "DATABASE_URL", "postgresql://user:secret@db:5432/crypto"), \
+            patch.object(settings, "ASYNC_DATABASE_URL", None):
+        assert base.async_database_url() == "postgresql+asyncpg://user:secret@db:5432/crypto"
+
+
+def test_engine_options_apply_pool_settings_except_on_sqlite():
+    with patch.object(settings, "DB_POOL_SIZE", 3), patch.object(settings, "DB_POOL_PRE_PING", False):
+        options = base.engine_options("postgresql+asyncpg://user:secret@db:5432/crypto")
+        assert options["pool_size"] == 3
+        assert options["pool_pre_ping"] is False
+        assert "pool_size" not in base.engine_options("sqlite+aiosqlite:///:memory:")
@@ -0,0 +1,44 @@
+from sqlalchemy import create_engine, text
+
+from app.db import models
+from app.db.migrations import run_migrations
+
+
+def test_run_migrations_normalizes_symbols_once():
+    engine = create_engine("sqlite:///:memory:")
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE cryptocurrencies (id INTEGER PRIMARY KEY, symbol VARCHAR UNIQUE, coin_metadata JSON)"))
+        connection.execute(text("INSERT INTO cryptocurrencies (symbol) VALUES ('btc'), ('Eth'), ('ADA')"))
+    models.SchemaMigration.__table__.create(engine)
+
+    run_migrations(engine)
+    run_migrations(engine)
+
+    with engine.connect() as connection:
+        symbols = connection.execute(text("SELECT symbol FROM cryptocurrencies ORDER BY id")).scalars().all()
+        applied = connection.execute(text("SELECT name FROM schema_migrations")).scalars().all()
+    assert symbols == ["BTC", "ETH", "ADA"]
+    assert applied == ["0001_normalize_symbols", "0002_add_metadata_columns"]
+
+
+def test_run_migrations_backfills_metadata_columns():
+    engine = create_engine("sqlite:///:memory:")
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE cryptocurrencies (id INTEGER PRIMARY KEY, symbol VARCHAR UNIQUE, coin_metadata JSON)"))
+        connection.execute(text(
+            "INSERT INTO cryptocurrencies (symbol, coin_metadata) VALUES "
+            "('BTC', '{\"current_price_usd\": 50000, \"market_cap_usd\": 1.0e12, \"market_cap_rank\": 1}'), "
+            "('ETH', '{\"current_price_usd\": \"n/a\", \"market_cap_rank\": null}'), ('ADA', NULL)"))
+    models.SchemaMigration.__table__.create(engine)
+
+    run_migrations(engine)
+
+    with engine.connect() as connection:
+        rows = connection.execute(text(
+            "SELECT price_usd, market_cap_usd, market_cap_rank FROM cryptocurrencies ORDER BY id")).all()
+        indexes = connection.execute(text(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'cryptocurrencies'")).scalars().all()
+    assert [tuple(row) for row in rows] == [(50000.0, 1.0e12, 1), (None, None, None), (None, None, None)]
+    assert "ix_cryptocurrencies_price_usd_id" in indexes
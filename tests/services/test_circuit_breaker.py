@@ -0,0 +1,45 @@
+from unittest.mock import patch
+
+import pytest
+
+from app.services.circuit_breaker import (CircuitBreaker, CircuitOpenError, STATE_CLOSED, STATE_HALF_OPEN,
+                                          STATE_OPEN)
+
+
+def make_breaker(**overrides) -> CircuitBreaker:
+    options = dict(window=10, min_calls=4, failure_rate=0.5, open_seconds=30.0, half_open_probes=1)
+    options.update(overrides)
+    return CircuitBreaker("test", **options)
+
+
+def test_breaker_opens_at_failure_rate_and_fails_fast():
+    breaker = make_breaker()
+    for ok in (True, False, True, False):
+        breaker.before_call()
+        breaker.record_success() if ok else breaker.record_failure()
+
+    assert breaker.snapshot()["state"] == STATE_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    assert breaker.snapshot()["rejected_calls"] == 1
+
+
+def test_breaker_half_open_probe_closes_or_reopens():
+    breaker = make_breaker(min_calls=1)
+    breaker.before_call()
+    breaker.record_failure()
+
+    with patch("app.services.circuit_breaker.time.monotonic", return_value=10 ** 9):
+        breaker.before_call()
+        assert breaker.snapshot()["state"] == STATE_HALF_OPEN
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+        breaker.record_failure()
+    assert breaker.snapshot()["state"] == STATE_OPEN
+
+    with patch("app.services.circuit_breaker.time.monotonic", return_value=2 * 10 ** 9):
+        breaker.before_call()
+        breaker.record_success()
+    assert breaker.snapshot()["state"] == STATE_CLOSED
+    breaker.before_call()
+
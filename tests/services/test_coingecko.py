@@ -0,0 +1,259 @@
+import asyncio
+
+import httpx
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from app.core.config import settings
+from app.services import coingecko
+from app.services.circuit_breaker import CircuitBreaker, STATE_OPEN
+
+
+@pytest.fixture
+def stub_sync_client():
+    """Replaces coingecko.sync_client with one served by an in-process handler."""
+    def install(handler):
+        client = httpx.Client(base_url=settings.COINGECKO_API_BASE_URL, transport=httpx.MockTransport(handler))
+        patcher = patch.object(coingecko, "sync_client", client)
+        patcher.start()
+        return patcher
+
+    patchers = []
+    yield lambda handler: patchers.append(install(handler))
+    for patcher in patchers:
+        patcher.stop()
+
+
+def test_chunk_ids_by_url_length_keeps_urls_under_limit():
+    ids = [f"coin-{i:05d}" for i in range(1000)]
+    chunks = coingecko.chunk_ids_by_url_length(ids, max_url_length=500)
+
+    assert len(chunks) > 1
+    assert [cg_id for chunk in chunks for cg_id in chunk] == ids
+    for chunk in chunks:
+        url = httpx.Request("GET", settings.COINGECKO_API_BASE_URL + "/simple/price",
+                            params={"ids": ",".join(chunk)}).url
+        assert len(str(url)) <= 500
+
+
+def test_get_prices_batched_reports_failed_chunks(stub_sync_client):
+    def handler(request: httpx.Request) -> httpx.Response:
+        ids = request.url.params["ids"].split(",")
+        if "coin-00000" in ids:
+            return httpx.Response(500)
+        return httpx.Response(200, json={cg_id: {"usd": 1.0} for cg_id in ids})
+
+    stub_sync_client(handler)
+    ids = [f"coin-{i:05d}" for i in range(300)]
+
+    with patch.object(settings, "COINGECKO_MAX_URL_LENGTH", 500):
+        result = coingecko.get_prices_batched(ids, vs_currency="usd", max_concurrency=3)
+
+    assert result.chunk_count > 1
+    assert len(result.failed_chunks) == 1
+    assert "coin-00000" in result.failed_ids
+    assert set(result.prices) == set(ids) - set(result.failed_ids)
+
+
+@pytest.fixture
+def fresh_cache():
+    """Gives each test an empty in-memory response cache."""
+    from app.services.cache import MemoryBackend, ResponseCache
+    cache = ResponseCache(MemoryBackend(max_size=2), ttls={coingecko.CACHE_SEARCH: 60, coingecko.CACHE_DETAILS: 60,
+                                                           coingecko.CACHE_MARKETS: 60},
+                          negative_ttl=1)
+    with patch.object(coingecko, "cache", cache):
+        yield cache
+
+
+def test_get_coin_details_caches_hits_and_unknown_ids(stub_sync_client, fresh_cache):
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        if request.url.path.endswith("/missing"):
+            return httpx.Response(404)
+        return httpx.Response(200, json={"image": {"large": "http://example.com/large.png"}})
+
+    stub_sync_client(handler)
+
+    for _ in range(3):
+        assert coingecko.get_coin_details("bitcoin") == {"image": "http://example.com/large.png"}
+        assert coingecko.get_coin_details("missing") is None
+
+    assert len(calls) == 2
+    stats = fresh_cache.stats()["endpoints"][coingecko.CACHE_DETAILS]
+    assert stats == {"hits": 2, "negative_hits": 2, "stale_hits": 0, "misses": 2}
+
+
+def test_memory_cache_evicts_least_recently_used(fresh_cache):
+    fresh_cache.set(coingecko.CACHE_DETAILS, "a", {"image": "a"})
+    fresh_cache.set(coingecko.CACHE_DETAILS, "b", {"image": "b"})
+    fresh_cache.get(coingecko.CACHE_DETAILS, "a")
+    fresh_cache.set(coingecko.CACHE_DETAILS, "c", {"image": "c"})
+
+    assert fresh_cache.get(coingecko.CACHE_DETAILS, "b") is coingecko.MISSING
+    assert fresh_cache.get(coingecko.CACHE_DETAILS, "a") == {"image": "a"}
+    assert fresh_cache.stats()["evictions"] == 1
+
+
+def test_get_retries_429_honoring_retry_after(stub_sync_client):
+    responses = iter([
+        httpx.Response(429, headers={"Retry-After": "7"}),
+        httpx.Response(200, json={"bitcoin": {"usd": 1.0}}),
+    ])
+    stub_sync_client(lambda request: next(responses))
+
+    with patch.object(coingecko.time, "sleep") as mock_sleep:
+        assert coingecko.get_prices(["bitcoin"]) == {"bitcoin": {"usd": 1.0}}
+
+    mock_sleep.assert_called_once()
+    assert mock_sleep.call_args.args[0] >= 7
+
+
+def test_interactive_get_does_not_sleep_past_its_maximum_wait():
+    calls = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(429, headers={"Retry-After": "60"})
+
+    client = httpx.AsyncClient(base_url=settings.COINGECKO_API_BASE_URL, transport=httpx.MockTransport(handler))
+    with patch.object(coingecko, "async_client", client), \
+            patch.object(settings, "COINGECKO_RATE_LIMIT_MAX_WAIT_INTERACTIVE", 5.0), \
+            patch.object(coingecko.asyncio, "sleep", new_callable=AsyncMock) as mock_sleep:
+        response = asyncio.run(coingecko._get_async("/coins/markets"))
+
+    assert response.status_code == 429
+    assert len(calls) == 1
+    mock_sleep.assert_not_awaited()
+
+
+def test_get_prices_requests_all_quote_currencies_in_one_call(stub_sync_client):
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        currencies = request.url.params["vs_currencies"].split(",")
+        return httpx.Response(200, json={"bitcoin": {currency: 1.0 for currency in currencies}})
+
+    stub_sync_client(handler)
+    prices = coingecko.get_prices(["bitcoin"], vs_currency=["usd", "eur", "btc"])
+
+    assert len(requests) == 1
+    assert coingecko.price_metadata(prices["bitcoin"]) == {
+        "current_price_usd": 1.0, "current_price_eur": 1.0, "current_price_btc": 1.0}
+
+
+def test_get_markets_batched_returns_market_metadata_per_page_of_ids(stub_sync_client, fresh_cache):
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        ids = request.url.params["ids"].split(",")
+        return httpx.Response(200, json=[
+            {"id": cg_id, "current_price": 1.0, "image": f"http://example.com/{cg_id}.png",
+             "market_cap": 10.0, "market_cap_rank": None}
+            for cg_id in ids
+        ])
+
+    stub_sync_client(handler)
+    coingecko_ids = [f"coin-{i}" for i in range(coingecko.MARKETS_PER_PAGE + 1)]
+    with patch.object(settings, "COINGECKO_MAX_URL_LENGTH", 100000):
+        batch = coingecko.get_markets_batched(coingecko_ids)
+
+    assert len(requests) == 2
+    assert requests[0].url.params["vs_currency"] == coingecko.MARKETS_VS_CURRENCY
+    assert len(batch.prices) == len(coingecko_ids)
+    assert batch.prices["coin-0"] == {"current_price_usd": 1.0, "image": "http://example.com/coin-0.png",
+                                      "market_cap_usd": 10.0}
+
+
+def test_open_breaker_skips_upstream_and_serves_stale_search(stub_sync_client, fresh_cache):
+    breaker = CircuitBreaker("test", window=10, min_calls=1, failure_rate=0.5, open_seconds=30.0)
+    fresh_cache.set(coingecko.CACHE_SEARCH, "btc", ["bitcoin", "Bitcoin"])
+    handler_calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        handler_calls.append(request)
+        return httpx.Response(503)
+
+    stub_sync_client(handler)
+    with patch.object(coingecko, "breaker", breaker), patch.object(settings, "COINGECKO_MAX_RETRIES", 0), \
+            patch.object(fresh_cache, "ttls", {**fresh_cache.ttls, coingecko.CACHE_SEARCH: 0}), \
+            patch.object(coingecko, "_lookup_symbol_index", return_value=(False, None)):
+        assert coingecko.search_coin("BTC") == ("bitcoin", "Bitcoin")
+        assert breaker.snapshot()["state"] == STATE_OPEN
+        assert coingecko.search_coin("BTC") == ("bitcoin", "Bitcoin")
+
+    assert len(handler_calls) == 1
+    assert fresh_cache.stats()["endpoints"][coingecko.CACHE_SEARCH]["stale_hits"] == 2
+
+
+def test_get_markets_or_stale_falls_back_to_last_known_rows(fresh_cache):
+    fresh_cache.set(coingecko.CACHE_MARKETS, "bitcoin", {"current_price_usd": 1.0})
+
+    with patch.object(fresh_cache, "ttls", {**fresh_cache.ttls, coingecko.CACHE_MARKETS: 0}), \
+            patch.object(coingecko, "get_markets_async", new_callable=AsyncMock, return_value={}) as fetch:
+        markets, stale = asyncio.run(coingecko.get_markets_or_stale_async(["bitcoin", "unknown"]))
+
+    fetch.assert_awaited_once_with(["bitcoin", "unknown"])
+    assert markets == {"bitcoin": {"current_price_usd": 1.0}}
+    assert set(stale) == {"bitcoin"}
+
+
+class FakeAsyncRedis:
+    """Just enough of redis.asyncio.Redis for the cache backend."""
+
+    def __init__(self):
+        self.data = {}
+
+    async def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    async def setex(self, key, ttl, value):
+        self.data[key] = value.encode()
+
+    def pipeline(self, transaction=True):
+        redis_client, calls = self, []
+
+        class Pipeline:
+            def setex(self, key, ttl, value):
+                calls.append((key, ttl, value))
+
+            async def execute(self):
+                for call in calls:
+                    await redis_client.setex(*call)
+
+        return Pipeline()
+
+
+def test_async_paths_use_the_async_redis_client(fresh_cache):
+    from app.services.cache import RedisBackend
+
+    def sync_client():
+        raise AssertionError("sync Redis client used on the event loop")
+
+    fake = FakeAsyncRedis()
+    fresh_cache.backend = RedisBackend(sync_client, "coingecko:", lambda: fake)
+    search = AsyncMock(return_value=("bitcoin", "Bitcoin"))
+    markets = [{"id": "bitcoin", "current_price": 2.0}]
+
+    async def scenario():
+        with patch.object(coingecko, "_lookup_symbol_index", return_value=(False, None)), \
+                patch.object(coingecko, "_search_async", search):
+            first = await coingecko.search_coin_async("BTC")
+            second = await coingecko.search_coin_async("btc")
+        response = httpx.Response(200, json=markets, request=httpx.Request("GET", "http://test/coins/markets"))
+        with patch.object(coingecko, "_get_async", new_callable=AsyncMock, return_value=response) as get:
+            fetched = await coingecko.get_markets_or_stale_async(["bitcoin"])
+            cached = await coingecko.get_markets_or_stale_async(["bitcoin"])
+        return first, second, fetched, cached, get.await_count
+
+    first, second, fetched, cached, upstream_calls = asyncio.run(scenario())
+
+    assert first == second == ("bitcoin", "Bitcoin")
+    search.assert_awaited_once()
+    assert fetched == cached == ({"bitcoin": {"current_price_usd": 2.0}}, {})
+    assert upstream_calls == 1
+    assert "coingecko:search:btc" in fake.data
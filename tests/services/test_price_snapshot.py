@@ -0,0 +1,45 @@
+import os
+import struct
+
+from app.services import price_snapshot
+from app.services.price_snapshot import PriceSnapshot, SnapshotRow
+
+
+def test_snapshot_round_trips_and_indexes_by_symbol(tmp_path):
+    path = str(tmp_path / "prices.bin")
+    rows = [SnapshotRow(id=i, symbol=f"c{i}", updated_at=1000.0 + i, prices={"usd": float(i), "eur": i / 2})
+            for i in range(1, 200)]
+    rows.append(SnapshotRow(id=500, symbol="NEW", updated_at=None, prices={}))
+    rows.append(SnapshotRow(id=501, symbol="X" * 17, updated_at=None, prices={"usd": 1.0}))
+    price_snapshot.write(path, rows, ["usd", "eur", "btc"])
+
+    reader = PriceSnapshot(path)
+    assert reader.is_loaded
+    quote = reader.lookup("C42")
+    assert (quote.symbol, quote.prices, quote.updated_at) == ("C42", {"usd": 42.0, "eur": 21.0}, 1042.0)
+    new = reader.lookup("new")
+    assert (new.prices, new.updated_at) == ({}, None)
+    assert reader.lookup("C0") is None
+    assert reader.lookup("X" * 17) is None
+    assert not [name for name in os.listdir(tmp_path) if name != "prices.bin"]
+
+
+def test_snapshot_columns_are_little_endian():
+    data = price_snapshot.encode([SnapshotRow(id=1, symbol="BTC", updated_at=2.0, prices={"usd": 3.0})], ["usd"],
+                                 generated_at=0.0)
+
+    assert data.endswith(b"\x01\x00\x00\x00" + struct.pack("<2d", 2.0, 3.0))
+
+
+def test_snapshot_reader_picks_up_replaced_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(price_snapshot.settings, "PRICE_SNAPSHOT_RELOAD_CHECK_SECONDS", 0.0)
+    path = str(tmp_path / "prices.bin")
+    reader = PriceSnapshot(path)
+    assert not reader.is_loaded
+    assert reader.lookup("BTC") is None
+
+    price_snapshot.write(path, [SnapshotRow(id=1, symbol="BTC", updated_at=1.0, prices={"usd": 100.0})], ["usd"])
+    assert reader.lookup("BTC").prices == {"usd": 100.0}
+
+    price_snapshot.write(path, [SnapshotRow(id=1, symbol="BTC", updated_at=2.0, prices={"usd": 101.0})], ["usd"])
+    assert reader.lookup("BTC").prices == {"usd": 101.0}
@@ -0,0 +1,23 @@
+import asyncio
+
+from app.services.price_stream import PriceHub
+
+
+def test_subscription_filters_and_coalesces_deltas():
+    async def scenario():
+        hub = PriceHub()
+        btc_only = hub.subscribe({"BTC"})
+        everything = hub.subscribe()
+
+        hub.dispatch({"BTC": {"usd": 1.0}, "ETH": {"usd": 2.0}})
+        hub.dispatch({"BTC": {"usd": 3.0}})
+
+        assert await btc_only.next_batch(timeout=1) == {"BTC": {"usd": 3.0}}
+        assert await everything.next_batch(timeout=1) == {"BTC": {"usd": 3.0}, "ETH": {"usd": 2.0}}
+        assert btc_only.coalesced == 1
+        assert await btc_only.next_batch(timeout=0.01) == {}
+
+        hub.unsubscribe(btc_only)
+        assert hub.subscriber_count == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,65 @@
+import asyncio
+from unittest.mock import patch
+
+import fakeredis
+
+import pytest
+
+from app.core.config import settings
+from app.services import refresh_scheduler
+from app.services.refresh_scheduler import TIER_COLD, TIER_HOT, TIER_WARM
+
+
+@pytest.mark.parametrize("reads, volatility, tier", [
+    (0, 0.0, TIER_COLD),
+    (settings.REFRESH_WARM_READS, 0.0, TIER_WARM),
+    (settings.REFRESH_HOT_READS, 0.0, TIER_HOT),
+    (0, settings.REFRESH_WARM_VOLATILITY, TIER_WARM),
+    (0, settings.REFRESH_HOT_VOLATILITY, TIER_HOT),
+    (settings.REFRESH_WARM_READS, settings.REFRESH_HOT_VOLATILITY, TIER_HOT),
+])
+def test_assign_tier_takes_hottest_of_popularity_and_volatility(reads, volatility, tier):
+    assert refresh_scheduler.assign_tier(reads, volatility) == tier
+
+
+def test_order_due_puts_hot_coins_first_then_most_overdue():
+    due = [("dormant", 100.0), ("bitcoin", 300.0), ("ethereum", 200.0), ("unplanned", 50.0), ("solana", 250.0)]
+    tiers = {"dormant": TIER_COLD, "bitcoin": TIER_HOT, "ethereum": TIER_HOT, "solana": TIER_WARM}
+
+    assert refresh_scheduler.order_due(due, tiers) == ["ethereum", "bitcoin", "solana", "unplanned", "dormant"]
+
+
+def test_requests_per_tick_follows_budget_and_spends_at_least_one():
+    with patch.object(settings, "REFRESH_REQUEST_BUDGET_PER_MINUTE", 24.0), \
+            patch.object(settings, "REFRESH_TICK_SECONDS", 5.0):
+        assert refresh_scheduler.requests_per_tick() == 2
+    with patch.object(settings, "REFRESH_REQUEST_BUDGET_PER_MINUTE", 6.0), \
+            patch.object(settings, "REFRESH_TICK_SECONDS", 5.0):
+        assert refresh_scheduler.requests_per_tick() == 1
+
+
+def test_record_read_fails_open_when_redis_is_down():
+    class DownRedis:
+        def zincrby(self, *args):
+            raise refresh_scheduler.redis.ConnectionError("down")
+
+    with patch.object(settings, "REFRESH_TRACK_READS", True), \
+            patch.object(refresh_scheduler, "get_redis", DownRedis):
+        refresh_scheduler.record_read("btc")
+
+
+def test_read_buffer_sends_counts_in_one_flush(monkeypatch):
+    redis_client = fakeredis.FakeAsyncRedis()
+    monkeypatch.setattr(refresh_scheduler, "get_async_redis", lambda: redis_client)
+    buffer = refresh_scheduler.ReadBuffer()
+
+    with patch.object(settings, "REFRESH_TRACK_READS", True):
+        for symbol in ("btc", "BTC", "eth"):
+            buffer.add(symbol)
+
+    async def flush_and_read():
+        await buffer.flush()
+        await buffer.flush()
+        return await redis_client.zrange(refresh_scheduler.READS_KEY, 0, -1, withscores=True)
+
+    assert asyncio.run(flush_and_read()) == [(b"ETH", 1.0), (b"BTC", 2.0)]
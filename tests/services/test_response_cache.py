@@ -0,0 +1,72 @@
+from unittest.mock import patch
+
+import fakeredis
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.crud import crud_crypto
+from app.services import response_cache
+
+CRYPTO_ENDPOINT = f"{settings.API_V1_STR}/cryptocurrencies"
+
+
+@pytest.fixture
+def redis_server(monkeypatch):
+    """Enables the response cache on an in-process Redis (Lua scripts included) shared by both clients."""
+    server = fakeredis.FakeServer()
+    sync_client = fakeredis.FakeRedis(server=server)
+    monkeypatch.setattr(settings, "RESPONSE_CACHE_ENABLED", True)
+    monkeypatch.setattr(response_cache, "get_redis", lambda: sync_client)
+    monkeypatch.setattr(response_cache, "get_async_redis", lambda: fakeredis.FakeAsyncRedis(server=server))
+    return sync_client
+
+
+@pytest.fixture
+def btc(db_session: Session):
+    return crud_crypto.create_crypto(db=db_session, symbol="BTC", name="Bitcoin", coingecko_id="bitcoin",
+                                     coin_metadata={"current_price_usd": 1.0}, note="first")
+
+
+def test_list_is_read_through_and_invalidated_by_create(client: TestClient, db_session: Session, redis_server, btc):
+    with patch.object(crud_crypto, "get_crypto_rows", wraps=crud_crypto.get_crypto_rows) as rows:
+        miss = client.get(CRYPTO_ENDPOINT + "/")
+        hit = client.get(CRYPTO_ENDPOINT + "/")
+        crud_crypto.create_crypto(db=db_session, symbol="ETH", name="Ethereum", coingecko_id="ethereum",
+                                  coin_metadata={})
+        after_create = client.get(CRYPTO_ENDPOINT + "/")
+
+    assert rows.call_count == 2
+    assert hit.content == miss.content
+    assert [row["symbol"] for row in after_create.json()] == ["BTC", "ETH"]
+
+
+def test_symbol_read_is_invalidated_by_update_metadata_batch_and_delete(client: TestClient, db_session: Session,
+                                                                         redis_server, btc):
+    assert client.get(f"{CRYPTO_ENDPOINT}/BTC").json()["note"] == "first"
+    assert redis_server.exists(response_cache.symbol_key("BTC"))
+
+    assert client.put(f"{CRYPTO_ENDPOINT}/BTC", json={"note": "second"}).status_code == status.HTTP_200_OK
+    assert client.get(f"{CRYPTO_ENDPOINT}/BTC").json()["note"] == "second"
+
+    crud_crypto.update_crypto_metadata_batch(db_session, {"bitcoin": {"current_price_usd": 2.0}})
+    assert client.get(f"{CRYPTO_ENDPOINT}/BTC", params={"currency": "usd"}).json()["price"] == 2.0
+
+    assert client.delete(f"{CRYPTO_ENDPOINT}/BTC").status_code == status.HTTP_200_OK
+    assert client.get(f"{CRYPTO_ENDPOINT}/BTC").status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_slow_reader_does_not_cache_data_read_before_a_write(redis_server):
+    key = response_cache.symbol_key("BTC")
+    cached, generation = response_cache.read(key)
+    assert cached is None
+
+    response_cache.invalidate(["ETH"])
+    response_cache.store(key, generation, {"body": "stale"})
+    assert response_cache.read(key)[0] is None
+
+    _, generation = response_cache.read(key)
+    response_cache.store(key, generation, {"body": "fresh"})
+    assert response_cache.read(key)[0] == {"body": b"fresh"}
@@ -0,0 +1,34 @@
+from unittest.mock import patch
+
+from sqlalchemy.orm import Session
+
+from app.crud import crud_crypto
+from app.services import seed_provider
+
+
+def _seed(db_session: Session, lock_acquired: bool):
+    with patch.object(seed_provider, "SessionLocal", lambda: db_session), \
+            patch.object(seed_provider.RedisLock, "acquire", return_value=lock_acquired), \
+            patch.object(seed_provider.RedisLock, "release", return_value=True) as release:
+        return seed_provider.seed_db(), release
+
+
+def test_seed_db_inserts_fixture_rows_once(db_session: Session):
+    status, release = _seed(db_session, lock_acquired=True)
+
+    assert status == seed_provider.SEED_DONE
+    release.assert_called_once()
+    assert crud_crypto.get_crypto(db_session, "BTC").coingecko_id == "bitcoin"
+    assert crud_crypto.get_crypto(db_session, "ETH").coingecko_id == "ethereum"
+
+    status, release = _seed(db_session, lock_acquired=True)
+    assert status == seed_provider.SEED_SKIPPED
+    release.assert_not_called()
+
+
+def test_seed_db_skips_while_another_process_holds_the_lock(db_session: Session):
+    status, release = _seed(db_session, lock_acquired=False)
+
+    assert status == seed_provider.SEED_LOCKED
+    release.assert_not_called()
+    assert crud_crypto.get_crypto(db_session, "BTC") is None
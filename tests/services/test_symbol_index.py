@@ -0,0 +1,59 @@
+import asyncio
+
+from app.services import symbol_index
+from app.services.symbol_index import SymbolIndex, build_entries
+
+
+def test_build_entries_prefers_best_market_cap_rank():
+    coins = [
+        {"id": "bitcoin", "symbol": "btc", "name": "Bitcoin"},
+        {"id": "batcat", "symbol": "btc", "name": "Batcat"},
+        {"id": "bitcoin-on-chain-x", "symbol": "btc", "name": "Bitcoin Clone"},
+        {"id": "zeta-unranked", "symbol": "zeta", "name": "Zeta B"},
+        {"id": "alpha-unranked", "symbol": "zeta", "name": "Zeta A"},
+    ]
+    ranks = {"bitcoin": 1, "batcat": 4000}
+
+    entries = build_entries(coins, ranks)
+
+    assert entries["btc"] == ("bitcoin", "Bitcoin")
+    assert entries["zeta"] == ("alpha-unranked", "Zeta A")
+
+
+def test_symbol_index_round_trips_through_disk(tmp_path):
+    path = str(tmp_path / "index.json")
+    writer = SymbolIndex(path)
+    writer.replace({"eth": ("ethereum", "Ethereum")})
+
+    reader = SymbolIndex(path)
+    assert not reader.is_loaded
+    assert reader.load()
+    assert reader.lookup("ETH") == ("ethereum", "Ethereum")
+    assert reader.lookup("NOPE") is None
+
+
+def test_lookup_reads_memory_only_until_reloaded(tmp_path, monkeypatch):
+    monkeypatch.setattr(symbol_index.settings, "SYMBOL_INDEX_RELOAD_CHECK_SECONDS", 0.0)
+    path = str(tmp_path / "index.json")
+    reader = SymbolIndex(path)
+    SymbolIndex(path).replace({"eth": ("ethereum", "Ethereum")})
+
+    assert reader.lookup("ETH") is None
+    assert reader.reload_if_changed()
+    assert reader.lookup("ETH") == ("ethereum", "Ethereum")
+    assert not reader.reload_if_changed()
+
+
+def test_start_loads_index_in_background(tmp_path):
+    path = str(tmp_path / "index.json")
+    SymbolIndex(path).replace({"eth": ("ethereum", "Ethereum")})
+    reader = SymbolIndex(path)
+
+    async def run():
+        await reader.start()
+        while not reader.is_loaded:
+            await asyncio.sleep(0.01)
+        await reader.stop()
+
+    asyncio.run(asyncio.wait_for(run(), timeout=5))
+    assert reader.lookup("eth") == ("ethereum", "Ethereum")
@@ -0,0 +1,99 @@
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.crud import crud_crypto
+from app.services import coingecko
+from app.services.price_snapshot import PriceSnapshot
+from app.worker import tasks
+from app.worker.celery_app import celery_app
+
+
+@pytest.fixture
+def eager_celery():
+    celery_app.conf.update(task_always_eager=True, task_eager_propagates=True)
+    yield
+    celery_app.conf.update(task_always_eager=False, task_eager_propagates=False)
+
+
+@pytest.fixture
+def tracked_coins(db_session: Session):
+    for i in range(30):
+        crud_crypto.create_crypto(db_session, symbol=f"C{i}", name=f"Coin {i}", coingecko_id=f"coin-{i:03d}",
+                                  coin_metadata={})
+    return db_session
+
+
+def test_price_refresh_fans_out_chunks_and_releases_lock(eager_celery, tracked_coins: Session, tmp_path):
+    def fetch_prices(coingecko_ids, vs_currency):
+        if "coin-000" in coingecko_ids:
+            raise RuntimeError("upstream down")
+        return {cg_id: {"usd": 2.0, "eur": 1.5} for cg_id in coingecko_ids}
+
+    snapshot_path = str(tmp_path / "price_snapshot.bin")
+    with patch.object(tasks, "SessionLocal", lambda: tracked_coins), \
+            patch.object(settings, "COINGECKO_MAX_URL_LENGTH", 200), \
+            patch.object(settings, "PRICE_SNAPSHOT_PATH", snapshot_path), \
+            patch.object(coingecko, "_fetch_prices", side_effect=fetch_prices), \
+            patch.object(tasks.price_stream, "publish_prices"), \
+            patch.object(tasks.RedisLock, "acquire", return_value=True), \
+            patch.object(tasks.RedisLock, "release", return_value=True) as release, \
+            patch.object(tasks.finalize_price_refresh, "run", wraps=tasks.finalize_price_refresh.run) as finalize:
+        result = tasks.update_all_crypto_prices.run()
+
+    assert result["chunks"] > 1
+    reports = finalize.call_args.args[0]
+    assert len(reports) == result["chunks"]
+    assert sum(report["updated"] for report in reports) == 30 - len(reports[0]["failed_ids"])
+    assert "coin-000" in reports[0]["failed_ids"]
+    release.assert_called_once()
+    assert crud_crypto.get_crypto(tracked_coins, "C29").coin_metadata == {
+        "current_price_usd": 2.0, "current_price_eur": 1.5}
+    quote = PriceSnapshot(snapshot_path).lookup("c29")
+    assert quote.prices == {"usd": 2.0, "eur": 1.5}
+    assert quote.updated_at is not None
+
+
+def test_price_refresh_skips_tick_while_previous_run_holds_lock(eager_celery):
+    with patch.object(tasks.RedisLock, "acquire", return_value=False), \
+            patch.object(tasks, "chord") as dispatch:
+        result = tasks.update_all_crypto_prices.run()
+
+    assert "skipped" in result["message"]
+    dispatch.assert_not_called()
+
+
+def test_due_refresh_dispatches_only_due_chunks_within_budget(eager_celery, tracked_coins: Session):
+    with patch.object(tasks, "SessionLocal", lambda: tracked_coins), \
+            patch.object(tasks.refresh_scheduler, "is_planned", return_value=True), \
+            patch.object(tasks.refresh_scheduler, "requests_per_tick", return_value=1), \
+            patch.object(tasks.refresh_scheduler, "take_due", return_value=[["coin-001", "coin-002"]]) as take_due, \
+            patch.object(coingecko, "_fetch_prices", return_value={"coin-001": {"usd": 5.0}, "coin-002": {"usd": 6.0}}), \
+            patch.object(tasks.price_stream, "publish_prices"), \
+            patch.object(tasks.RedisLock, "acquire", return_value=True), \
+            patch.object(tasks.RedisLock, "release", return_value=True) as release:
+        result = tasks.refresh_due_prices.run()
+
+    take_due.assert_called_once_with(1)
+    assert result["chunks"] == 1 and result["coins"] == 2
+    release.assert_called_once()
+    assert crud_crypto.get_crypto(tracked_coins, "C1").coin_metadata == {"current_price_usd": 5.0}
+    assert crud_crypto.get_crypto(tracked_coins, "C3").coin_metadata == {}
+
+
+def test_price_chunk_publishes_only_coins_whose_quotes_changed(db_session: Session):
+    crud_crypto.create_crypto(db_session, symbol="BTC", name="Bitcoin", coingecko_id="bitcoin",
+                              coin_metadata={"current_price_usd": 2.0, "current_price_eur": 1.5})
+    crud_crypto.create_crypto(db_session, symbol="ETH", name="Ethereum", coingecko_id="ethereum",
+                              coin_metadata={"current_price_usd": 2.0, "current_price_eur": 1.0})
+
+    with patch.object(tasks, "SessionLocal", lambda: db_session), \
+            patch.object(coingecko, "_fetch_prices",
+                         return_value={"bitcoin": {"usd": 2.0, "eur": 1.5}, "ethereum": {"usd": 2.0, "eur": 1.5}}), \
+            patch.object(tasks.price_stream, "publish_prices") as publish:
+        report = tasks.update_price_chunk.run({"bitcoin": "BTC", "ethereum": "ETH"})
+
+    assert report["updated"] == 2
+    publish.assert_called_once_with({"ETH": {"usd": 2.0, "eur": 1.5}})